@@ -2,10 +2,16 @@ import streamlit as st
 from src.ui.streamlitUI import StreamlitUI
 from src.pages import upload_page1, dashboard_page2
 from src.core.state import AppState  # <-- import this
+from src.services.prometheus_service import start_exporter
+from src.services.retention_service import start_retention
 
 # -----------------------------
 # App Setup
 # -----------------------------
+# Prometheus /metrics endpoint when PROMETHEUS_PORT is set (one per process)
+start_exporter()
+# Background retention of storage/ and the pipeline scratch dir (RETENTION_INTERVAL=0 disables)
+start_retention()
 
 
 # # -----------------------------
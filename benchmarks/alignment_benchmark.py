@@ -0,0 +1,75 @@
+# benchmarks/alignment_benchmark.py
+#
+# Order-invariant list alignment on synthetic bank statements of
+# 100 / 1k / 5k rows. The prediction drops a row near the top, misreads
+# some descriptions and amounts and swaps a few neighbouring rows, which
+# shifts every later row when lists are compared by index.
+#
+#   python -m benchmarks.alignment_benchmark [--sizes 100 1000 5000]
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from src.services.evaluation_service import Evaluator
+
+PAYEES = ["UPI/AMAZON PAY", "NEFT SALARY ACME LTD", "ATM WDL MG ROAD", "IMPS RENT", "POS SWIGGY",
+          "ACH LIC PREMIUM", "UPI/ZOMATO", "CHQ DEP 000412", "INT CREDIT", "BIL/BSES RAJDHANI"]
+
+
+def build_statement(n_rows, seed=0):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    rows = []
+    for i in range(n_rows):
+        rows.append({
+            "date": (start + timedelta(days=i // 8)).strftime("%d/%m/%Y"),
+            "description": f"{rng.choice(PAYEES)} REF{rng.randrange(10**6):06d}",
+            "amount": f"{rng.randrange(100, 500000) / 100:,.2f}",
+            "balance": f"{rng.randrange(10**5, 10**7) / 100:,.2f}",
+        })
+    gt = {"transactions": rows}
+
+    pred_rows = [dict(r) for r in rows]
+    del pred_rows[min(2, n_rows - 1)]
+    for r in pred_rows:
+        roll = rng.random()
+        if roll < 0.05:
+            r["description"] = r["description"].replace("REF", "RFF")
+        elif roll < 0.08:
+            r["amount"] = r["amount"][:-1] + "9"
+    for _ in range(n_rows // 50):
+        i = rng.randrange(len(pred_rows) - 1)
+        pred_rows[i], pred_rows[i + 1] = pred_rows[i + 1], pred_rows[i]
+    return gt, {"transactions": pred_rows}
+
+
+def _mean(result):
+    return sum(v["score"] for v in result.values()) / len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark order-invariant list alignment")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1_000, 5_000])
+    args = parser.parse_args()
+
+    by_index, aligned = Evaluator(align_items=False), Evaluator()
+    print(f"{'rows':>6} {'index (s)':>10} {'aligned (s)':>12} {'index score':>12} {'aligned score':>14}")
+
+    for size in args.sizes:
+        gt, pred = build_statement(size)
+
+        start = time.perf_counter()
+        res_index = by_index.evaluate(gt, pred)
+        t_index = time.perf_counter() - start
+
+        start = time.perf_counter()
+        res_aligned = aligned.evaluate(gt, pred)
+        t_aligned = time.perf_counter() - start
+
+        print(f"{size:>6} {t_index:>10.3f} {t_aligned:>12.3f} {_mean(res_index):>12.4f} {_mean(res_aligned):>14.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/crop_benchmark.py
+#
+# Payload bytes and image tokens per document with and without
+# content-aware cropping. With --model the full pipeline is run both ways
+# and mean field scores are compared, to confirm cropping does not cost accuracy.
+#
+#   python -m benchmarks.crop_benchmark [--tier fast] [--tile] [--model gemini-2.0-flash]
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.ocr_benchmark import load_dataset
+from src.core.pipeline import Pipeline, scratch_file
+from src.services.evaluation_service import Evaluator
+from src.services.localstorage_service import LocalStorage
+from src.services.metrics_service import Metrics
+from src.services.ocr_service import OCRProcessor, DEFAULT_TIER
+from src.services.upload_service import UploadHandle
+
+
+class _PayloadOnly:
+    """Stand-in LLM used when no model is given: payload is measured, nothing is sent."""
+
+    provider = "gemini"
+
+
+def _mean_score(result):
+    scores = [v["score"] for v in result.values() if isinstance(v, dict) and "score" in v]
+    return sum(scores) / len(scores) if scores else 0.0
+
+
+def _remove(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark content-aware cropping")
+    parser.add_argument("--tier", default=DEFAULT_TIER)
+    parser.add_argument("--tile", action="store_true")
+    parser.add_argument("--model", default=None, help="also run the LLM and compare field scores")
+    args = parser.parse_args()
+
+    ocr = OCRProcessor(tier=args.tier)
+    if args.model:
+        from src.services.llm_service import LLMImageParser
+        llm = LLMImageParser(args.model)
+    else:
+        llm = _PayloadOnly()
+    pipeline = Pipeline(llm, Evaluator(), None, Metrics(), ocr)
+
+    totals = {"bytes": [0, 0], "tokens": [0, 0], "score": [0.0, 0.0]}
+    docs = load_dataset()
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = LocalStorage(tmp, content_addressed=True)
+        print(f"{'file':<10} {'bytes':>10} {'cropped':>10} {'tokens':>8} {'cropped':>8}")
+
+        for name, data, gt in docs:
+            file = UploadHandle.from_bytes(name, data, storage)
+            # Uncropped single images are sent from here as-is (never written)
+            file_path = str(file.path)
+            lines = ocr.run_lines(data) or []
+
+            p0, b0, t0 = pipeline.prepare_images(file, file_path, lines, crop=False, tile=args.tile)
+            p1, b1, t1 = pipeline.prepare_images(file, file_path, lines, crop=True, tile=args.tile)
+            totals["bytes"][0] += b0
+            totals["bytes"][1] += b1
+            totals["tokens"][0] += t0
+            totals["tokens"][1] += t1
+            print(f"{name:<10} {b0:>10} {b1:>10} {t0:>8} {t1:>8}")
+
+            written = {p for paths in (p0, p1) for p in (paths if isinstance(paths, tuple) else (paths,))}
+            if args.model:
+                for i, crop in enumerate((False, True)):
+                    res = pipeline.process_document(file, gt, True, ocr_tier=args.tier, crop=crop, tile=args.tile)
+                    totals["score"][i] += _mean_score(res["result"])
+                # The pipeline's copy of the page; its crops / tiles have the same (content) names as above
+                written.add(scratch_file(data, file["digest"]))
+            # Scratch files are content-addressed: drop this document's once measured
+            _remove(written - {file_path})
+
+    n = len(docs)
+    print()
+    print(f"payload bytes/doc : {totals['bytes'][0] / n:,.0f} → {totals['bytes'][1] / n:,.0f}")
+    print(f"image tokens/doc  : {totals['tokens'][0] / n:,.0f} → {totals['tokens'][1] / n:,.0f}")
+    if args.model:
+        print(f"mean field score  : {totals['score'][0] / n:.4f} → {totals['score'][1] / n:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/evaluator_benchmark.py
+#
+# Evaluator.evaluate (per document, pure Python) vs Evaluator.evaluate_batch
+# (columnar, bulk-normalized, C edit-distance kernel) at 1k / 10k / 100k leaves.
+#
+#   python -m benchmarks.evaluator_benchmark [--sizes 1000 10000 100000]
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from src.services.evaluation_service import Evaluator
+
+GT_DIR = Path(__file__).resolve().parent.parent / "data" / "ground_truth_JSON"
+
+
+def _count_leaves(obj):
+    if isinstance(obj, dict):
+        return sum(_count_leaves(v) for v in obj.values())
+    if isinstance(obj, list):
+        return sum(_count_leaves(v) for v in obj)
+    return 1
+
+
+def _perturb(obj, rng):
+    """Simulate LLM noise: dropped words, typos, missing values."""
+    if isinstance(obj, dict):
+        return {k: _perturb(v, rng) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_perturb(v, rng) for v in obj]
+    if not isinstance(obj, str) or not obj:
+        return obj
+    roll = rng.random()
+    if roll < 0.05:
+        return None
+    words = obj.split()
+    if roll < 0.25 and words:
+        words.pop(rng.randrange(len(words)))
+    elif roll < 0.45 and words:
+        i = rng.randrange(len(words))
+        words[i] = words[i][:-1] + "x"
+    return " ".join(words)
+
+
+def build_pairs(n_leaves, seed=0):
+    rng = random.Random(seed)
+    gts = [json.loads(p.read_text(encoding="utf-8")) for p in sorted(GT_DIR.glob("*.json"))]
+    pairs, total = [], 0
+    while total < n_leaves:
+        gt = gts[len(pairs) % len(gts)]
+        pairs.append((gt, _perturb(gt, rng)))
+        total += _count_leaves(gt)
+    return pairs, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched evaluation")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    evaluator = Evaluator()
+    print(f"{'leaves':>8} {'docs':>6} {'evaluate (s)':>13} {'batch (s)':>10} {'speedup':>8} {'max |Δ|':>8}")
+
+    for size in args.sizes:
+        pairs, leaves = build_pairs(size)
+
+        start = time.perf_counter()
+        single = [evaluator.evaluate(gt, pred) for gt, pred in pairs]
+        t_single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = evaluator.evaluate_batch(pairs)
+        t_batch = time.perf_counter() - start
+
+        max_diff = max(
+            abs(a[k]["score"] - b[k]["score"]) for a, b in zip(single, batch) for k in a
+        )
+        print(f"{leaves:>8} {len(pairs):>6} {t_single:>13.3f} {t_batch:>10.3f} {t_single / t_batch:>7.1f}x {max_diff:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
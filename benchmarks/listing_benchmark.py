@@ -0,0 +1,69 @@
+# benchmarks/listing_benchmark.py
+#
+# Listing a large LocalStorage folder: the old glob("*") + is_file()
+# listing vs the scandir-based list_files / iter_files, and cursor pages
+# (first page, a page deep into the folder, a prefix filter) with and
+# without the persistent file index. Reports time and peak memory.
+#
+#   python -m benchmarks.listing_benchmark [--files 100000] [--page 1000]
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from src.services.localstorage_service import LocalStorage
+
+
+def measured(label, fn):
+    start = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - start
+    # Second run for memory: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<40} {elapsed * 1000:>9.1f} ms {peak / 1e6:>8.2f} MB peak")
+    return out
+
+
+def glob_listing(folder: Path):
+    """Previous list_files: every Path materialized, one stat per entry, then sorted."""
+    return sorted((p for p in folder.glob("*") if p.is_file()), key=lambda p: p.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LocalStorage listing")
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--page", type=int, default=1000)
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp()
+    storage = LocalStorage(base)
+    folder = storage.ensure_dir("artifacts")
+    for i in range(args.files):
+        (folder / f"{i:08d}.json").write_bytes(b"{}")
+    middle = f"{args.files // 2:08d}.json"
+    print(f"{args.files} files")
+
+    measured("glob + is_file (previous)", lambda: glob_listing(folder))
+    measured("list_files (scandir)", lambda: storage.list_files("artifacts"))
+    measured("iter_files, streamed count", lambda: sum(1 for _ in storage.iter_files("artifacts")))
+
+    indexed = LocalStorage(base, index_files=True)
+    measured("reindex (one-off)", lambda: indexed.reindex("artifacts"))
+
+    for label, store in (("scan", storage), ("index", indexed)):
+        first, cursor = measured(f"{label}: first page", lambda: store.list_page("artifacts", args.page))
+        deep, _ = measured(f"{label}: page after {middle}",
+                           lambda: store.list_page("artifacts", args.page, cursor=middle))
+        hits, _ = measured(f"{label}: prefix '0000' page", lambda: store.list_page("artifacts", args.page, prefix="0000"))
+        assert len(first) == min(args.page, args.files) and cursor == first[-1]["name"]
+        assert deep[0]["name"] > middle and all(e["name"].startswith("0000") for e in hits)
+    measured("index: iter_files, streamed count", lambda: sum(1 for _ in indexed.iter_files("artifacts")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/metrics_concurrency_benchmark.py
+#
+# Stress check for the sharded Metrics core: many threads record documents
+# while a reader keeps flushing deltas (as the upload page does). The folded
+# deltas must add up to exact counts; also reports update throughput. A
+# second phase runs one short-lived thread per "rerun" (as Streamlit does):
+# shards of exited threads must be retired, not accumulate. Exits non-zero
+# on any mismatch.
+#
+#   python -m benchmarks.metrics_concurrency_benchmark [--threads 64] [--docs 2000] [--reruns 1000]
+
+import argparse
+import threading
+import time
+
+from src.services.metrics_service import Metrics
+
+# 4 fields, 3 of them correct at the default threshold
+RESULT = {f"field_{i}": {"score": s} for i, s in enumerate((1.0, 0.9, 0.8, 0.2))}
+PREDICTION = {"field_0": "x"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress-test concurrent Metrics updates")
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--docs", type=int, default=2000, help="documents per thread")
+    parser.add_argument("--reruns", type=int, default=1000, help="short-lived threads in the rerun phase")
+    args = parser.parse_args()
+
+    metrics = Metrics()
+    start_barrier = threading.Barrier(args.threads + 1)
+    done = threading.Event()
+
+    def worker(i):
+        start_barrier.wait()
+        for d in range(args.docs):
+            # every 10th response is not JSON → LLM failure
+            metrics.update_metrics(PREDICTION if d % 10 else None, RESULT)
+            metrics.record_processing(0.001 * (d % 100 + 1))
+            metrics.record_llm_used(f"model-{i % 4}")
+            metrics.record_filename_parsed(f"{i}-{d}.jpg")
+
+    total, flushes = {}, 0
+
+    def reader():
+        nonlocal flushes
+        while not done.is_set():
+            Metrics.fold(total, metrics.flush())
+            flushes += 1
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    flusher = threading.Thread(target=reader)
+    flusher.start()
+
+    start_barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    flusher.join()
+    Metrics.fold(total, metrics.flush())
+
+    n = args.threads * args.docs
+    expected = {
+        "total_docs": n,
+        "correct_predictions": 3 * n,
+        "incorrect_predictions": n,
+        "llm_failures": len(range(0, args.docs, 10)) * args.threads,
+    }
+    got = {key: total.get(key, 0) for key in expected}
+    got["latency samples"] = total["latency"]["count"]
+    expected["latency samples"] = n
+    got["llm_used"] = sum(total["llm_used"].values())
+    expected["llm_used"] = n
+
+    # Only the ownerless shard that collects retired ones may outlive the writers
+    shards_left = len(metrics._all_shards())
+
+    # Reruns: each on a new thread, flushed in between; every 10th is not flushed
+    # before the next one starts, so its shard is retired when the next registers
+    reruns = Metrics()
+    rerun_total, peak_shards = {}, 0
+    for r in range(args.reruns):
+        t = threading.Thread(target=reruns.update_metrics, args=(PREDICTION, RESULT))
+        t.start()
+        t.join()
+        peak_shards = max(peak_shards, len(reruns._all_shards()))
+        if r % 10:
+            Metrics.fold(rerun_total, reruns.flush())
+    Metrics.fold(rerun_total, reruns.flush())
+    got["rerun total_docs"], expected["rerun total_docs"] = rerun_total.get("total_docs", 0), args.reruns
+
+    print(f"{args.threads} threads x {args.docs} docs, {flushes} concurrent flushes")
+    print(f"{n * 4 / elapsed:,.0f} metric updates/s ({elapsed:.2f}s)")
+    for key in expected:
+        status = "ok" if got[key] == expected[key] else "MISMATCH"
+        print(f"{key:<22} {got[key]:>10} {expected[key]:>10}  {status}")
+    bounds = {"shards after flush": (shards_left, 1), "rerun peak shards": (peak_shards, 2)}
+    for key, (value, bound) in bounds.items():
+        print(f"{key:<22} {value:>10} {'<= ' + str(bound):>10}  {'ok' if value <= bound else 'MISMATCH'}")
+
+    mismatches = [key for key in expected if got[key] != expected[key]]
+    mismatches += [key for key, (value, bound) in bounds.items() if value > bound]
+    if mismatches:
+        raise SystemExit(f"MISMATCH: {', '.join(mismatches)}")
+
+if __name__ == "__main__":
+    main()
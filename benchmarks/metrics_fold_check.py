@@ -0,0 +1,80 @@
+# benchmarks/metrics_fold_check.py
+#
+# Check for the per-document delta protocol: a 1,000-document run folds
+# one Metrics.flush() delta per document into the session metrics
+# (Metrics.fold directly and through AppState.update_metrics). Counts must
+# be exact (no cumulative re-adding) and the folded state must stay the
+# same size however many documents it covers (sketches, not lists).
+# Exits non-zero on any failure.
+#
+#   python -m benchmarks.metrics_fold_check [--docs 1000]
+
+import argparse
+import json
+import time
+
+from src.services.metrics_service import Metrics
+
+# 4 fields, 3 of them correct at the default threshold
+RESULT = {f"field_{i}": {"score": s} for i, s in enumerate((1.0, 0.9, 0.8, 0.2))}
+PREDICTION = {"field_0": "x"}
+
+
+def state_size(total) -> int:
+    return len(json.dumps(total, default=str))
+
+
+def run(docs, fold):
+    """Record `docs` documents, folding one delta per document; returns (total, size per checkpoint)."""
+    metrics = Metrics()
+    total, sizes = {}, {}
+    for d in range(1, docs + 1):
+        metrics.update_metrics(PREDICTION if d % 10 else None, RESULT)
+        metrics.record_processing(0.5 + (d % 97) / 10)
+        metrics.record_llm_used(f"model-{d % 3}")
+        metrics.record_filename_parsed(f"{d}.jpg")
+        metrics.record_group(f"model-{d % 3}", "INVOICE", 1.0, accuracy=0.75)
+        total = fold(total, metrics.flush())
+        if d in (100, docs):
+            sizes[d] = state_size(total)
+    return total, sizes
+
+
+def fold_through_app_state(total, delta):
+    from src.core.state import AppState
+    import streamlit as st
+
+    AppState.update_metrics(delta)
+    return st.session_state["metrics"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check Metrics.flush / fold over a long run")
+    parser.add_argument("--docs", type=int, default=1000)
+    args = parser.parse_args()
+    n = args.docs
+
+    for label, fold in (("Metrics.fold", Metrics.fold), ("AppState.update_metrics", fold_through_app_state)):
+        start = time.perf_counter()
+        total, sizes = run(n, fold)
+        elapsed = time.perf_counter() - start
+
+        expected = {
+            "total_docs": n,
+            "correct_predictions": 3 * n,
+            "incorrect_predictions": n,
+            "llm_failures": n // 10,
+        }
+        got = {key: total.get(key) for key in expected}
+        assert got == expected, f"{label}: counts {got} != {expected}"
+        assert total["latency"]["count"] == n and total["accuracy"]["count"] == n, f"{label}: sketch counts"
+        assert sum(total["llm_used"].values()) == n, f"{label}: llm_used"
+        assert sum(g["documents"] for g in total["groups"].values()) == n, f"{label}: groups"
+        # Sketches have bounded state: 10x the documents, (almost) the same size
+        assert sizes[n] <= sizes[100] * 1.25, f"{label}: state grew {sizes[100]} → {sizes[n]} bytes"
+
+        print(f"{label:<26} {n} docs in {elapsed * 1000:.0f} ms, state {sizes[100]} B @100 → {sizes[n]} B @{n}  ok")
+
+
+if __name__ == "__main__":
+    main()
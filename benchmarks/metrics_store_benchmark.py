@@ -0,0 +1,89 @@
+# benchmarks/metrics_store_benchmark.py
+#
+# Write throughput of the SQLite metrics store and latency of the
+# dashboard's history queries (incl. downsampled time series) on a
+# synthetic history of thousands of runs spread over --days.
+#
+#   python -m benchmarks.metrics_store_benchmark [--runs 2000] [--docs 20] [--fields 25] [--days 90]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.services.metrics_store_service import MetricsStore
+
+MODELS = ["gpt-4o", "gpt-4o-mini", "gemini-2.0-flash"]
+DOC_TYPES = ["LPG_CASH_MEMO", "FORM_16A", "BANK_STATEMENT", "INVOICE", "ELECTRICITY_BILL"]
+
+
+def fake_result(rng, i, n_fields):
+    return {
+        "file_name": f"{i}.jpg",
+        "document_type": rng.choice(DOC_TYPES),
+        "result": {f"field_{k}": {"score": rng.random()} for k in range(n_fields)},
+        "prediction": {"ok": True},
+        "llm_failed": rng.random() < 0.05,
+        "processing_time": rng.uniform(1, 8),
+        "stage_times": {"ocr": rng.uniform(0.2, 2), "llm": rng.uniform(1, 6), "evaluate": rng.uniform(0, 0.05)},
+        "input_tokens": rng.randrange(800, 3000),
+        "output_tokens": rng.randrange(100, 600),
+        "image_tokens": 258 * rng.randrange(1, 6),
+    }
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    out = fn()
+    print(f"{label:<40} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite metrics store")
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--fields", type=int, default=25)
+    parser.add_argument("--days", type=int, default=90, help="history span")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    db_path = os.path.join(tempfile.mkdtemp(), "metrics.db")
+    store = MetricsStore(db_path)
+
+    now = time.time()
+    span = args.days * 86400
+    start = time.perf_counter()
+    for r in range(args.runs):
+        run_id, model = f"run-{r:05d}", rng.choice(MODELS)
+        run_start = now - span + r * span / args.runs
+        store.start_run(run_id, model=model, mode="benchmark")
+        for d in range(args.docs):
+            store.record_document(run_id, model, fake_result(rng, d, args.fields), created_at=run_start + 5 * d)
+    store.flush()
+    elapsed = time.perf_counter() - start
+    n_docs = args.runs * args.docs
+    print(f"wrote {args.runs} runs / {n_docs} documents / {n_docs * args.fields} field scores "
+          f"in {elapsed:.1f}s ({n_docs / elapsed:,.0f} docs/s)\n")
+
+    week = {"start": now - 7 * 86400, "end": now + 1}
+    timed("summary (all history)", lambda: store.summary())
+    timed("summary (model + type filter)", lambda: store.summary(models=["gpt-4o"], document_types=["INVOICE"]))
+    timed("summary (last 7 days)", lambda: store.summary(**week))
+    timed("stage timings (all history)", lambda: store.stage_timings())
+    timed("recent runs (50)", lambda: store.runs())
+    timed("recent runs (model filter)", lambda: store.runs(models=["gemini-2.0-flash"]))
+    timed("filter options", lambda: (store.distinct("model"), store.distinct("document_type")))
+    timed("field scores of one run", lambda: store.field_scores("run-00042"))
+    for label, kwargs in [("all history, auto", {}), ("last 7 days, auto", week),
+                          ("all history, minute", {"granularity": "minute"})]:
+        points = timed(f"timeseries ({label})", lambda: store.timeseries(**kwargs))
+        print(f"{'':<4}{len(points)} points ({len(points) // len(MODELS)} per model)")
+    points = timed("run timeseries", lambda: store.run_timeseries("run-00042"))
+    print(f"{'':<4}{len(points)} points")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/ocr_benchmark.py
+#
+# Throughput (docs/sec) and character accuracy of each OCR tier on data/JPGs.
+#
+#   python -m benchmarks.ocr_benchmark [--tiers accurate fast fastest] [--repeat 3]
+
+import argparse
+import json
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+try:
+    from rapidfuzz import fuzz
+except ImportError:  # falls back to an anchored SequenceMatcher window
+    fuzz = None
+
+from src.services.ocr_service import OCRProcessor, OCR_TIERS, available_tiers
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def _leaf_strings(obj):
+    if isinstance(obj, dict):
+        for v in obj.values():
+            yield from _leaf_strings(v)
+    elif isinstance(obj, list):
+        for v in obj:
+            yield from _leaf_strings(v)
+    elif obj not in (None, ""):
+        yield str(obj)
+
+
+def _window_similarity(needle: str, haystack: str) -> float:
+    """Similarity (0-1) of `needle` to its best-matching window of `haystack`."""
+    if fuzz is not None:
+        return fuzz.partial_ratio(needle, haystack) / 100
+    # Anchor on the longest common block and score the needle-sized window around it
+    matcher = SequenceMatcher(None, needle, haystack, autojunk=False)
+    block = matcher.find_longest_match(0, len(needle), 0, len(haystack))
+    if not block.size:
+        return 0.0
+    start = max(0, block.b - block.a)
+    return SequenceMatcher(None, needle, haystack[start:start + len(needle)], autojunk=False).ratio()
+
+
+def character_accuracy(ocr_text: str, ground_truth: dict) -> float:
+    """
+    Share of ground-truth characters recovered by the OCR text.
+
+    Every GT leaf value is scored against its best-matching window of the
+    OCR text (partial alignment), weighted by its length, so field order on
+    the page does not matter. Matching against the whole page instead would
+    find most characters of any value somewhere and saturate near 100%.
+    """
+    haystack = " ".join(ocr_text.lower().split())
+    total = matched = 0.0
+    for value in _leaf_strings(ground_truth):
+        needle = " ".join(value.lower().split())
+        if not needle:
+            continue
+        total += len(needle)
+        if haystack:
+            matched += len(needle) * _window_similarity(needle, haystack)
+    return matched / total if total else 0.0
+
+
+def load_dataset():
+    docs = []
+    for jpg in sorted((DATA_DIR / "JPGs").glob("*.jpg")):
+        gt_path = DATA_DIR / "ground_truth_JSON" / f"{jpg.stem}.json"
+        gt = json.loads(gt_path.read_text(encoding="utf-8")) if gt_path.exists() else {}
+        docs.append((jpg.name, jpg.read_bytes(), gt))
+    return docs
+
+
+def benchmark_tier(processor, tier, docs, repeat):
+    # Warm-up: model load is a one-off cost, not part of throughput
+    processor.run(docs[0][1], tier=tier)
+
+    accuracies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, data, gt in docs:
+            text = processor.run(data, tier=tier) or ""
+            if gt:
+                accuracies.append(character_accuracy(text, gt))
+    elapsed = time.perf_counter() - start
+
+    n = len(docs) * repeat
+    return {
+        "tier": tier,
+        "engine": OCR_TIERS[tier].name,
+        "docs": n,
+        "docs_per_sec": round(n / elapsed, 3),
+        "char_accuracy": round(sum(accuracies) / len(accuracies), 4) if accuracies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR tiers on data/JPGs")
+    parser.add_argument("--tiers", nargs="+", default=available_tiers())
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    docs = load_dataset()
+    processor = OCRProcessor()
+
+    print(f"{'tier':<10} {'engine':<15} {'docs/sec':>10} {'char acc':>10}")
+    for tier in args.tiers:
+        row = benchmark_tier(processor, tier, docs, args.repeat)
+        acc = f"{row['char_accuracy']:.2%}" if row["char_accuracy"] is not None else "n/a"
+        print(f"{row['tier']:<10} {row['engine']:<15} {row['docs_per_sec']:>10} {acc:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/result_benchmark.py
+#
+# Dict vs columnar (EvaluationResult) evaluation results: memory held per
+# evaluated document and time to build the results DataFrame, on the
+# ground-truth dataset and on synthetic long statements.
+#
+#   python -m benchmarks.result_benchmark [--rows 1000 5000]
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.alignment_benchmark import build_statement
+from benchmarks.evaluator_benchmark import build_pairs
+from src.services.evaluation_service import Evaluator
+from src.utils.file_utils import convert_json_list_to_dataframes
+
+
+def _held_bytes(build):
+    """Bytes still allocated after `build()` returns (i.e. the result objects)."""
+    tracemalloc.start()
+    results = build()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return results, held
+
+
+def _dataframe_time(results, repeat=5):
+    # Bypass st.cache_data: time the conversion itself
+    convert = convert_json_list_to_dataframes.__wrapped__
+    items = [{"result": r} for r in results]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        convert(items)
+    return (time.perf_counter() - start) / repeat
+
+
+def run_case(label, pairs):
+    evaluator = Evaluator()
+    # Warm the parse caches so both sides measure steady state (path tables are per batch: counted)
+    evaluator.evaluate_batch(pairs, columnar=True)
+
+    row = [label]
+    for columnar in (False, True):
+        results, held = _held_bytes(lambda: evaluator.evaluate_batch(pairs, columnar=columnar))
+        row += [held / len(pairs) / 1024, _dataframe_time(results)]
+    print(f"{row[0]:<22} {row[1]:>10.1f} {row[3]:>10.1f} {row[2] * 1000:>10.2f} {row[4] * 1000:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark columnar evaluation results")
+    parser.add_argument("--rows", nargs="+", type=int, default=[1_000, 5_000])
+    args = parser.parse_args()
+
+    print(f"{'case':<22} {'dict KiB':>10} {'col KiB':>10} {'dict df ms':>10} {'col df ms':>10}")
+    pairs, _ = build_pairs(10_000)
+    run_case(f"dataset ({len(pairs)} docs)", pairs)
+    for rows in args.rows:
+        run_case(f"statement {rows} rows", [build_statement(rows)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/results_store_benchmark.py
+#
+# Results store: append throughput, JSONL → Parquet compaction, and a
+# dashboard-style query (one run, fields scoring below 0.5, three columns)
+# on JSONL segments vs Parquet, against loading the whole run from the
+# stored raw records. Reports time and peak memory per read.
+#
+#   python -m benchmarks.results_store_benchmark [--leaves 200000]
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.evaluator_benchmark import build_pairs
+from src.services.evaluation_service import Evaluator
+from src.services.localstorage_service import LocalStorage
+from src.services.replay_service import RunStore
+from src.services.results_store_service import ResultsStore
+
+COLUMNS = ["file_name", "field", "score"]
+FILTERS = [("run_id", "==", "run-0"), ("score", "<", 0.5)]
+
+
+def measured(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<36} {elapsed * 1000:>9.1f} ms {peak / 1e6:>9.1f} MB peak")
+    return out
+
+
+def whole_run(storage):
+    """Baseline: load every stored record of the run, then filter in Python."""
+    evaluator = Evaluator()
+    rows = []
+    for rec in RunStore.load(storage, "run-0"):
+        for field, info in evaluator.evaluate(rec["ground_truth"], rec["prediction"]).items():
+            if info["score"] is not None and info["score"] < 0.5:
+                rows.append((rec["file_name"], field, info["score"]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the append-only results store")
+    parser.add_argument("--leaves", type=int, default=200_000)
+    args = parser.parse_args()
+
+    pairs, leaves = build_pairs(args.leaves)
+    results = Evaluator().evaluate_batch(pairs)
+    base = tempfile.mkdtemp()
+    storage, store = LocalStorage(base), ResultsStore(base)
+    run_store = RunStore(storage, run_id="run-0")
+
+    start = time.perf_counter()
+    for i, ((gt, pred), result) in enumerate(zip(pairs, results)):
+        store.append("run-0", "gpt-4o", {"file_name": f"{i}.jpg", "result": result, "processing_time": 2.0})
+    elapsed = time.perf_counter() - start
+    print(f"appended {leaves} field rows ({len(pairs)} docs) in {elapsed:.2f}s ({leaves / elapsed:,.0f} rows/s)")
+    for i, (gt, pred) in enumerate(pairs):
+        run_store.record(f"{i}.jpg", pred, gt)
+
+    jsonl = measured("query, JSONL segments", lambda: store.query(COLUMNS, FILTERS))
+    measured("compact to Parquet", lambda: store.compact("run-0"))
+    parquet = measured("query, Parquet", lambda: store.query(COLUMNS, FILTERS))
+    measured("re-threshold (2 columns)", lambda: store.field_accuracy("run-0", 0.8))
+    baseline = measured("baseline: load + evaluate whole run", lambda: whole_run(storage))
+    assert len(jsonl) == len(parquet) == len(baseline)
+    print(f"{len(parquet)} matching fields")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/session_memory_benchmark.py
+#
+# Memory held in session state by uploads: the previous layout
+# ({"name", "bytes"} dicts + a PIL image per upload) vs UploadHandle
+# (spilled once to the blob store, bytes read on demand).
+# Simulates --sessions users each uploading --uploads distinct scans.
+#
+#   python -m benchmarks.session_memory_benchmark [--sessions 10] [--uploads 200]
+
+import argparse
+import io
+import tempfile
+import time
+import tracemalloc
+
+from PIL import Image
+
+from benchmarks.storage_benchmark import JPG_DIR
+from src.services.localstorage_service import LocalStorage
+from src.services.upload_service import spill
+
+
+class Uploaded(io.BytesIO):
+    """Stand-in for a Streamlit UploadedFile (name, file_id, getbuffer / getvalue)."""
+
+    def __init__(self, name, data, file_id):
+        super().__init__(data)
+        self.name, self.file_id = name, file_id
+
+
+def uploads(sessions, per_session):
+    scans = [p.read_bytes() for p in sorted(JPG_DIR.glob("*.jpg"))]
+    for s in range(sessions):
+        # Trailing bytes keep the JPEG valid and make every scan distinct (no dedup)
+        yield [Uploaded(f"{i}.jpg", scans[i % len(scans)] + f"{s}-{i}".encode(), f"{s}-{i}")
+               for i in range(per_session)]
+
+
+def previous_state(files):
+    state = {"uploaded_files": [], "uploaded_images": []}
+    for f in files:
+        file = {"name": f.name, "bytes": f.getvalue()}
+        state["uploaded_files"].append(file)
+        state["uploaded_images"].append({"img": Image.open(io.BytesIO(file["bytes"])), "name": file["name"]})
+    return state
+
+
+def handle_state(files, storage):
+    return {"uploaded_files": [spill(f, storage) for f in files]}
+
+
+def measure(label, build, batches):
+    tracemalloc.start()
+    start = time.perf_counter()
+    # Streamlit drops each UploadedFile after the run; only session state stays
+    states = [build(list(files)) for files in batches()]
+    elapsed = time.perf_counter() - start
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = sum(len(s["uploaded_files"]) for s in states)
+    print(f"{label:<28} {held / 1e6:>9.2f} MB held {held / len(states) / 1e3:>9.1f} KB/session "
+          f"{elapsed:>7.2f}s to ingest {n} uploads")
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark upload memory in session state")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--uploads", type=int, default=200)
+    args = parser.parse_args()
+
+    batches = lambda: uploads(args.sessions, args.uploads)
+    measure("bytes + PIL (previous)", previous_state, batches)
+    storage = LocalStorage(tempfile.mkdtemp(), content_addressed=True)
+    states = measure("UploadHandle (spilled)", lambda files: handle_state(files, storage), batches)
+
+    # Lazy access: one page view per session
+    start = time.perf_counter()
+    for state in states:
+        handle = state["uploaded_files"][0]
+        assert handle.read().startswith(b"\xff\xd8") and handle.image().size
+    print(f"lazy read + image header: {(time.perf_counter() - start) / len(states) * 1000:.2f} ms per view")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/storage_benchmark.py
+#
+# Disk used by repeated runs over the same dataset: plain LocalStorage
+# (uuid names, indented JSON) vs content-addressed storage (dedup +
+# compression), plus write time and lookup-by-hash latency.
+#
+#   python -m benchmarks.storage_benchmark [--docs 1000] [--runs 3] [--compression gzip]
+
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.evaluator_benchmark import GT_DIR, _perturb
+from src.services.localstorage_service import LocalStorage, blob_digest
+from src.services.replay_service import RunStore
+
+JPG_DIR = GT_DIR.parent / "JPGs"
+
+
+class Upload(io.BytesIO):
+    """Stand-in for an uploaded file (name + getbuffer)."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+def load_dataset(n_docs):
+    import json
+
+    gts = {p.stem: json.loads(p.read_text(encoding="utf-8")) for p in sorted(GT_DIR.glob("*.json"))}
+    jpgs = {p.stem: p.read_bytes() for p in sorted(JPG_DIR.glob("*.jpg")) if p.stem in gts}
+    stems = sorted(jpgs)
+    return [(f"{i}.jpg", jpgs[stems[i % len(stems)]], gts[stems[i % len(stems)]]) for i in range(n_docs)]
+
+
+def disk_bytes(folder: Path) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(folder) for f in files)
+
+
+def one_run(storage, dataset, run_no):
+    rng = random.Random(run_no)
+    run_store = RunStore(storage, run_id=f"run-{run_no}", model="gemini-2.0-flash")
+    for name, jpg, gt in dataset:
+        storage.save_file(Upload(name, jpg))
+        storage.save_text(" ".join(str(v) for v in gt.values()), subfolder="ocr")
+        # Same document → same (cached) prediction in every run
+        prediction = _perturb(gt, random.Random(name))
+        run_store.record(name, prediction, gt, processing_time=rng.uniform(1, 5))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark content-addressed storage")
+    parser.add_argument("--docs", type=int, default=1000, help="documents per run")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--compression", default="gzip", choices=["gzip", "zstd", "none"])
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.docs)
+    compression = None if args.compression == "none" else args.compression
+    modes = {
+        "plain": lambda d: LocalStorage(d),
+        "content-addressed": lambda d: LocalStorage(d, content_addressed=True, compression=compression),
+    }
+
+    for label, make in modes.items():
+        base = tempfile.mkdtemp()
+        storage = make(base)
+        print(f"{label}:")
+        for run_no in range(args.runs):
+            start = time.perf_counter()
+            one_run(storage, dataset, run_no)
+            elapsed = time.perf_counter() - start
+            print(f"  run {run_no + 1}: {disk_bytes(Path(base)) / 1e6:>8.2f} MB on disk, "
+                  f"{args.docs / elapsed:>7,.0f} docs/s")
+        records = RunStore.load(storage, "run-0")
+        assert len(records) == args.docs and records[0]["ground_truth"] == dataset[0][2]
+
+    digests = [blob_digest(p) for p in storage.list_files("uploads")]
+    start = time.perf_counter()
+    for digest in digests * 10:
+        storage.get_blob(digest)
+    print(f"lookup by hash: {(time.perf_counter() - start) / (len(digests) * 10) * 1e6:.0f} us per blob read")
+
+
+if __name__ == "__main__":
+    main()
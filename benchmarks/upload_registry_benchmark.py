@@ -0,0 +1,86 @@
+# benchmarks/upload_registry_benchmark.py
+#
+# Cost of the upload bookkeeping Streamlit re-runs on every click, as
+# files arrive in batches: the previous lists (widget name list rebuilt
+# per file, `f not in existing` comparing {"name", "bytes"} dicts, JPG ↔
+# JSON sort per rerun) vs UploadRegistry (name / hash lookups, pairing
+# kept on add). The last line is one click with everything uploaded.
+#
+#   python -m benchmarks.upload_registry_benchmark [--files 1000] [--batch 50] [--kb 300]
+
+import argparse
+import os
+import tempfile
+import time
+
+from src.services.localstorage_service import LocalStorage
+from src.services.upload_service import UploadHandle, UploadRegistry
+from src.utils.file_utils import sort_gt_files_by_jpg
+
+
+def previous_rerun(state, jpgs, jsons):
+    """One rerun of the previous upload_page1 / FileUploadWidget logic."""
+    widget = []
+    for f in jpgs:
+        if f["name"] not in [fi["name"] for fi in widget]:
+            # UploadedFile.getvalue(): a fresh copy of the bytes on every rerun
+            widget.append({"name": f["name"], "bytes": memoryview(f["bytes"]).tobytes()})
+    for f in widget:
+        if f not in state["jpgs"]:
+            state["jpgs"].append(f)
+    for f in jsons:
+        if f not in state["jsons"]:
+            state["jsons"].append(f)
+    return sort_gt_files_by_jpg(state["jpgs"], state["jsons"])
+
+
+def registry_rerun(registry, jpgs, jsons):
+    """One rerun with the registry (the widget's name set + ingest)."""
+    names, widget = set(), []
+    for f in jpgs:
+        if f["name"] not in names:
+            names.add(f["name"])
+            widget.append(f)
+    registry.ingest(widget)
+    registry.ingest(jsons, ground_truth=True)
+    return registry.unpaired()
+
+
+def simulate(label, rerun, state, jpgs, jsons, batch):
+    start = time.perf_counter()
+    for n in range(batch, len(jpgs) + 1, batch):
+        rerun(state, jpgs[:n], jsons[:n])
+    total = time.perf_counter() - start
+    start = time.perf_counter()
+    rerun(state, jpgs, jsons)
+    click = time.perf_counter() - start
+    print(f"{label:<28} {total:>8.2f}s over {len(jpgs) // batch} upload batches   "
+          f"{click * 1000:>9.2f} ms per click afterwards")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark upload bookkeeping per rerun")
+    parser.add_argument("--files", type=int, default=1000, help="JPGs (and as many JSONs)")
+    parser.add_argument("--batch", type=int, default=50, help="files added per upload")
+    parser.add_argument("--kb", type=int, default=300, help="JPG size")
+    args = parser.parse_args()
+
+    # Same prefix, different tail: byte comparisons scan nearly the whole image
+    body = os.urandom(args.kb * 1000)
+    raw = [(f"{i:05d}.jpg", body + i.to_bytes(4, "big"), f"{i:05d}.json", b'{"total": "%d"}' % i)
+           for i in range(args.files)]
+
+    jpgs = [{"name": j, "bytes": b} for j, b, _, _ in raw]
+    jsons = [{"name": g, "bytes": b} for _, _, g, b in raw]
+    simulate("lists (previous)", previous_rerun, {"jpgs": [], "jsons": []}, jpgs, jsons, args.batch)
+
+    storage = LocalStorage(tempfile.mkdtemp(), content_addressed=True)
+    jpgs = [UploadHandle.from_bytes(j, b, storage) for j, b, _, _ in raw]
+    jsons = [UploadHandle.from_bytes(g, b, storage) for _, _, g, b in raw]
+    registry = UploadRegistry()
+    simulate("UploadRegistry", registry_rerun, registry, jpgs, jsons, args.batch)
+    assert len(registry) == args.files and not registry.unpaired()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/viewer_benchmark.py
+#
+# Paging through uploads in the book viewer: the previous path (decode
+# the full-resolution scan and hand it to st.image, which re-encodes it)
+# vs RenditionCache (viewer-sized JPEGs, LRU by content hash, next /
+# previous page prefetched while the current one is viewed).
+# Scans are A4 at 300 dpi; --think-ms is the time spent on each page.
+#
+#   python -m benchmarks.viewer_benchmark [--pages 500] [--think-ms 100]
+
+import argparse
+import io
+import statistics
+import tempfile
+import time
+
+from PIL import Image
+
+from benchmarks.storage_benchmark import JPG_DIR
+from src.services.image_service import VIEWER_WIDTH, RenditionCache, _encode_jpeg
+from src.services.localstorage_service import LocalStorage
+from src.services.upload_service import UploadHandle
+
+A4_300DPI = (2480, 3508)
+
+
+def make_pages(n_pages, storage):
+    scans = []
+    for path in sorted(JPG_DIR.glob("*.jpg")):
+        with Image.open(path) as img:
+            scans.append(_encode_jpeg(img.resize(A4_300DPI), 90))
+    # Trailing bytes keep the JPEG valid and give every page its own digest
+    return [UploadHandle.from_bytes(f"{i}.jpg", scans[i % len(scans)] + str(i).encode(), storage)
+            for i in range(n_pages)]
+
+
+def previous_view(handle):
+    img = Image.open(io.BytesIO(handle.read()))
+    # st.image re-encodes a PIL image before sending it to the browser
+    return _encode_jpeg(img, 90)
+
+
+def page_through(pages, view, think, prefetch=None):
+    latencies = []
+    for i, page in enumerate(pages):
+        start = time.perf_counter()
+        view(page)
+        latencies.append(time.perf_counter() - start)
+        if prefetch is not None:
+            prefetch([pages[(i + 1) % len(pages)], pages[i - 1]])
+        time.sleep(think)
+    latencies.sort()
+    return statistics.mean(latencies) * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark viewer renditions")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--think-ms", type=float, default=100.0, help="time spent looking at each page")
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, LocalStorage(tempfile.mkdtemp(), content_addressed=True))
+    think = args.think_ms / 1000
+    print(f"{args.pages} pages of {A4_300DPI[0]}x{A4_300DPI[1]}, {pages[0]['size'] / 1e3:.0f} KB each")
+
+    mean, p95 = page_through(pages, previous_view, think)
+    print(f"{'full resolution (previous)':<32} {mean:>8.1f} ms mean {p95:>8.1f} ms p95")
+
+    cache = RenditionCache(max_bytes=16 * 2**20)
+    mean, p95 = page_through(pages, lambda p: cache.get(p, VIEWER_WIDTH), think)
+    print(f"{'renditions, no prefetch':<32} {mean:>8.1f} ms mean {p95:>8.1f} ms p95")
+
+    cache = RenditionCache(max_bytes=16 * 2**20)
+    mean, p95 = page_through(pages, lambda p: cache.get(p, VIEWER_WIDTH), think,
+                             prefetch=lambda ps: cache.prefetch(ps, VIEWER_WIDTH))
+    print(f"{'renditions + prefetch':<32} {mean:>8.1f} ms mean {p95:>8.1f} ms p95  "
+          f"(hit rate {cache.hits / (cache.hits + cache.misses):.0%})")
+
+    mean, p95 = page_through(list(reversed(pages))[:len(cache)], lambda p: cache.get(p, VIEWER_WIDTH), 0)
+    print(f"{'paging back (cached)':<32} {mean:>8.1f} ms mean {p95:>8.1f} ms p95")
+    print(f"cache: {len(cache)} renditions, {cache.size / 2**20:.1f} MB (bound 16 MB)")
+
+
+if __name__ == "__main__":
+    main()
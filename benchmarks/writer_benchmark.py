@@ -0,0 +1,90 @@
+# benchmarks/writer_benchmark.py
+#
+# Per-document persistence cost seen by the processing loop: synchronous
+# writes vs the write-behind BackgroundWriter, on a simulated slow disk
+# (--disk-ms per write), plus a briefly "full" disk (ENOSPC for the first
+# writes) to check that nothing is lost and the loop does not stall.
+#
+#   python -m benchmarks.writer_benchmark [--docs 500] [--disk-ms 5]
+
+import argparse
+import errno
+import statistics
+import tempfile
+import time
+
+from benchmarks.evaluator_benchmark import build_pairs
+from src.services.evaluation_service import Evaluator
+from src.services.localstorage_service import LocalStorage
+from src.services.replay_service import RunStore
+from src.services.results_store_service import ResultsStore
+from src.services.writer_service import BackgroundWriter
+
+
+class SlowDisk:
+    """Wraps a write: sleeps `delay` per call; the first `full_for` calls fail with ENOSPC."""
+
+    def __init__(self, fn, delay, full_for=0):
+        self.fn, self.delay, self.full_for = fn, delay, full_for
+
+    def __call__(self, *args, **kwargs):
+        time.sleep(self.delay)
+        if self.full_for > 0:
+            self.full_for -= 1
+            raise OSError(errno.ENOSPC, "No space left on device")
+        return self.fn(*args, **kwargs)
+
+
+def run(docs, delay, writer=None, full_for=0):
+    base = tempfile.mkdtemp()
+    run_store, results = RunStore(LocalStorage(base), run_id="bench"), ResultsStore(base)
+    record, append = SlowDisk(run_store.record, delay, full_for), SlowDisk(results.append, delay)
+
+    per_doc = []
+    start = time.perf_counter()
+    for name, gt, pred, result in docs:
+        t = time.perf_counter()
+        res = {"file_name": name, "result": result, "processing_time": 1.0}
+        if writer is None:
+            record(name, pred, gt)
+            append("bench", "gpt-4o", res)
+        else:
+            writer.submit(record, name, pred, gt)
+            writer.submit(append, "bench", "gpt-4o", res)
+        per_doc.append(time.perf_counter() - t)
+    loop = time.perf_counter() - start
+    if writer is not None:
+        writer.close()
+    total = time.perf_counter() - start
+
+    stored = len(RunStore.load(LocalStorage(base), "bench"))
+    p99 = sorted(per_doc)[int(len(per_doc) * 0.99)]
+    return statistics.mean(per_doc) * 1000, p99 * 1000, loop, total, stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark write-behind persistence")
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--disk-ms", type=float, default=5.0, help="simulated latency per write")
+    args = parser.parse_args()
+
+    pairs, _ = build_pairs(10**9 if args.docs > 10**6 else args.docs * 30)
+    pairs = pairs[:args.docs]
+    results = Evaluator().evaluate_batch(pairs)
+    docs = [(f"{i}.jpg", gt, pred, r) for i, ((gt, pred), r) in enumerate(zip(pairs, results))]
+    delay = args.disk_ms / 1000
+
+    print(f"{'mode':<34} {'mean ms/doc':>11} {'p99 ms':>8} {'loop s':>7} {'drained s':>9} {'stored':>7}")
+    cases = [
+        ("synchronous", None, 0),
+        ("write-behind", BackgroundWriter(), 0),
+        ("write-behind, queue 64", BackgroundWriter(max_queue=64), 0),
+        ("write-behind, disk full x20", BackgroundWriter(retry_delay=0.01, max_retry_delay=0.05), 20),
+    ]
+    for label, writer, full_for in cases:
+        mean, p99, loop, total, stored = run(docs, delay, writer, full_for)
+        print(f"{label:<34} {mean:>11.3f} {p99:>8.3f} {loop:>7.2f} {total:>9.2f} {stored:>7}")
+
+
+if __name__ == "__main__":
+    main()
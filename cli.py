@@ -0,0 +1,149 @@
+# cli.py
+#
+# Command-line tools that work on stored runs (no LLM calls).
+#
+#   python cli.py runs
+#   python cli.py rescore <run_id> [--threshold 0.8] [--workers 8] [--no-align] [--output out.json]
+#   python cli.py --metrics-port 9108 rescore <run_id>   (Prometheus /metrics while running)
+#   python cli.py results <run_id> [--threshold 0.8] [--below 0.5] [--csv fields.csv] [--compact]
+#   python cli.py cleanup   (one retention pass: quotas / max age, see RETENTION_* variables)
+#   python cli.py train-classifier data/JPGs data/ground_truth_JSON [--tier fast]   (runs OCR)
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from src.services.classifier_service import train_from_folder
+from src.services.localstorage_service import LocalStorage
+from src.services.metrics_service import Metrics
+from src.services.prometheus_service import DOCUMENTS, start_exporter
+from src.services.replay_service import RUNS_SUBFOLDER, RunStore, rescore_run, summarize
+from src.services.results_store_service import ResultsStore
+from src.services.retention_service import RetentionManager, default_policies
+
+
+def cmd_runs(args):
+    storage = LocalStorage(args.storage)
+    runs = RunStore.list_runs(storage)
+    if not runs:
+        print("No stored runs.")
+        return
+    for run_id in runs:
+        n_docs = storage.count_files(f"{RUNS_SUBFOLDER}/{run_id}")
+        print(f"{run_id:<40} {n_docs:>6} docs")
+
+
+def cmd_rescore(args):
+    storage = LocalStorage(args.storage)
+    start = time.perf_counter()
+    metrics, rows = rescore_run(
+        storage,
+        args.run_id,
+        threshold=args.threshold,
+        workers=args.workers,
+        evaluator_options={"align_items": not args.no_align},
+    )
+    elapsed = time.perf_counter() - start
+    for row in rows:
+        DOCUMENTS.labels(row["model"] or "unknown", "rescored").inc()
+
+    summary = summarize(metrics)
+    summary["threshold"] = args.threshold
+    summary["seconds"] = round(elapsed, 2)
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"run_id": args.run_id, "summary": summary, "documents": rows}, f, indent=2)
+        print(f"Written to {args.output}")
+
+
+def cmd_results(args):
+    store = ResultsStore(args.storage)
+    if args.run_id not in store.runs():
+        raise FileNotFoundError(f"No stored results for run: {args.run_id}")
+    if args.compact:
+        print(f"Compacted {store.compact(args.run_id)} rows")
+
+    # Re-threshold from stored field scores (no re-evaluation)
+    summary = store.field_accuracy(args.run_id, args.threshold)
+    summary["threshold"] = args.threshold
+    print(json.dumps(summary, indent=2))
+
+    if args.csv:
+        filters = [("run_id", "==", args.run_id)]
+        if args.below is not None:
+            filters.append(("score", "<", args.below))
+        columns = ["file_name", "model", "document_type", "field", "gt_text", "llm_text", "score", "latency"]
+        store.to_csv(columns, filters, args.csv)
+        print(f"Written to {args.csv}")
+
+
+def cmd_cleanup(args):
+    manager = RetentionManager(default_policies(args.storage), storage=LocalStorage(args.storage))
+    reports = manager.run_once()
+    for name, report in reports.items():
+        print(f"{name:<10} {report['files']:>8} files {report['bytes'] / 1e6:>10.1f} MB   "
+              f"evicted {report['evicted']:>6} ({report['reclaimed_bytes'] / 1e6:.1f} MB)")
+    print(f"Reclaimed {sum(r['reclaimed_bytes'] for r in reports.values()) / 1e6:.1f} MB")
+
+
+def cmd_train_classifier(args):
+    # Only this command needs the OCR engines
+    from src.services.ocr_service import OCRProcessor
+
+    classifier = train_from_folder(args.jpg_dir, args.gt_dir, OCRProcessor(tier=args.tier), args.model_path)
+    print(f"Trained on {', '.join(classifier.model.classes_)}; saved to {classifier.model_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM-Parsing-Images command-line tools")
+    parser.add_argument("--storage", default="storage", help="storage base directory")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics on this port (default: $PROMETHEUS_PORT)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_runs = sub.add_parser("runs", help="list stored runs")
+    p_runs.set_defaults(func=cmd_runs)
+
+    p_rescore = sub.add_parser("rescore", help="re-score a stored run without calling the LLM")
+    p_rescore.add_argument("run_id")
+    p_rescore.add_argument("--threshold", type=float, default=Metrics.SCORE_THRESHOLD,
+                           help="field score counted as correct")
+    p_rescore.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    p_rescore.add_argument("--no-align", action="store_true", help="compare list items by index")
+    p_rescore.add_argument("--output", default=None, help="write summary + per-document rows as JSON")
+    p_rescore.set_defaults(func=cmd_rescore)
+
+    p_results = sub.add_parser("results", help="field results of a run from the results store")
+    p_results.add_argument("run_id")
+    p_results.add_argument("--threshold", type=float, default=Metrics.SCORE_THRESHOLD,
+                           help="field score counted as correct")
+    p_results.add_argument("--below", type=float, default=None, help="export only fields scoring below this")
+    p_results.add_argument("--csv", default=None, help="write the fields as CSV")
+    p_results.add_argument("--compact", action="store_true", help="compact JSONL segments to Parquet first")
+    p_results.set_defaults(func=cmd_results)
+
+    p_cleanup = sub.add_parser("cleanup", help="apply storage quotas / max age once (LRU eviction)")
+    p_cleanup.set_defaults(func=cmd_cleanup)
+
+    p_train = sub.add_parser("train-classifier", help="train the local document-type classifier from JPGs + GT JSONs")
+    p_train.add_argument("jpg_dir")
+    p_train.add_argument("gt_dir")
+    p_train.add_argument("--tier", default=os.environ.get("OCR_TIER", "fast"), help="OCR tier used for the texts")
+    p_train.add_argument("--model-path", default="storage/models/doc_classifier.pkl")
+    p_train.set_defaults(func=cmd_train_classifier)
+
+    args = parser.parse_args()
+    start_exporter(args.metrics_port)
+    try:
+        args.func(args)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
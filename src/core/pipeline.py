@@ -1,12 +1,21 @@
 # core/pipeline.py
 
 import time
+import hashlib
 import logging
 import tempfile
 import os
 import json
+import io
 import streamlit as st
+from PIL import Image
 
+from src.services.extraction_service import merge_predictions
+from src.services.image_service import crop_to_text, tile_image, estimate_image_tokens
+from src.services.schema_service import merge_schemas
+from src.services.prometheus_service import DOCUMENTS, DOCUMENT_LATENCY, IN_FLIGHT, LLM_FAILURES, STAGE_LATENCY
+from src.services.retention_service import SCRATCH_DIR
+from src.utils.json_checker import is_json
 
 
 logger = logging.getLogger(__name__)
@@ -18,23 +27,52 @@ class PipelineError(Exception):
     pass
 
 
+def scratch_file(data: bytes, digest=None) -> str:
+    """
+    Content-addressed scratch copy of an image (`<SCRATCH_DIR>/<sha256>.jpg`).
+
+    Sessions sending the same content share one file and different content
+    never shares a name, so the LLM response cache (keyed by path) cannot
+    mix documents up. Files are immutable and written atomically; reusing
+    one refreshes its last use, and the retention manager evicts them.
+    """
+    SCRATCH_DIR.mkdir(parents=True, exist_ok=True)
+    path = SCRATCH_DIR / f"{digest or hashlib.sha256(data).hexdigest()}.jpg"
+    try:
+        os.utime(path)
+        return str(path)
+    except FileNotFoundError:
+        pass
+    fd, tmp = tempfile.mkstemp(dir=SCRATCH_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return str(path)
+
+
 class Pipeline:
     """
     End-to-end document processing pipeline:
     1. Validate input files
-    2. Generate schema from ground-truth JSON
-    3. Run LLM parsing
-    4. Evaluate predictions
-    5. Save results
-    6. Update metrics
+    2. Generate schema from ground-truth JSON (or the schema registry in inference mode)
+    3. Optional OCR, local document-type classification and rule extraction (fast path)
+    4. Optional crop to OCR text regions (and tiling of tall pages)
+    5. Run LLM parsing for the fields still missing
+    6. Evaluate predictions (skipped in inference mode)
+    7. Save results
+    8. Update metrics
     """
 
-    def __init__(self, llm_service, evaluator, storage, metrics, ocr):
+    def __init__(self, llm_service, evaluator, storage, metrics, ocr, extractor=None,
+                 classifier=None, registry=None):
         self.llm = llm_service
         self.evaluator = evaluator
         self.storage = storage
         self.metrics = metrics
         self.ocr = ocr
+        self.extractor = extractor
+        self.classifier = classifier
+        self.registry = registry
 
 
     # -----------------------------
@@ -68,21 +106,132 @@ class Pipeline:
 
         return _extract(ground_truth)
 
+    # -----------------------------
+    # Schema without ground truth (inference mode)
+    # -----------------------------
+    def schema_for_inference(self, doc_type=None):
+        """
+        Pick the schema from the per-type registry.
+
+        Returns:
+            (document_type or None, schema); an unknown type gets the union of
+            all registered schemas and the LLM classifies the document.
+        """
+        if self.registry is None or not self.registry.document_types():
+            raise PipelineError("Inference mode needs a schema registry. Process a labelled batch first.")
+
+        if doc_type in self.registry:
+            schema, _ = self.registry.get(doc_type)
+            return doc_type, {k: v for k, v in schema.items() if k != "document_type"}
+
+        schema = {}
+        for registered in self.registry.document_types():
+            schema = merge_schemas(schema, self.registry.get(registered)[0])
+        return None, schema
+
+    # -----------------------------
+    # Local document-type pre-classification
+    # -----------------------------
+    def classify(self, ocr, default_schema, ground_truth=None):
+        """
+        Predict document_type from OCR text and select its registered schema.
+
+        Returns:
+            (document_type or None, schema without the document_type field)
+        """
+        start = time.time()
+        doc_type, confidence = self.classifier.predict(ocr)
+        actual = ground_truth.get("document_type") if isinstance(ground_truth, dict) else None
+        self.metrics.record_classification(doc_type, actual, time.time() - start)
+
+        if doc_type is None:
+            return None, default_schema
+
+        logger.info(f"Pre-classified as {doc_type} ({confidence:.2f})")
+        schema = default_schema
+        if self.registry is not None and doc_type in self.registry:
+            schema, _ = self.registry.get(doc_type)
+        return doc_type, {k: v for k, v in schema.items() if k != "document_type"}
+
+    # -----------------------------
+    # Prompt
+    # -----------------------------
+    def build_prompt(self, schema_description, ocr, doc_type=None):
+        if doc_type is not None and self.registry is not None:
+            return self.registry.build_prompt(doc_type, schema_description, ocr)
+
+        return (
+            f"You are an exert Image extractor.\n"
+            f"Analyze the image and extract data according to this schema.\n"
+            f"From the options shown below also classify the document_type and fill it in the JSON field appropriately.\n"
+            f"The options are: INVOICE, RECEIPT, GAS BILL, ELECTRICITY BILL, WATER BILL, BANK STATEMENT, SALARY SLIP, PAYSLIP, ITR FORM 16, CHECK, other (use your judgement).\n"
+            f"I have also tried providing a OCR extract for cross checking or for more help, OCR Extracted Text (ignore if empty): {ocr}."
+            f"Return ONLY valid JSON.\n\nSchema Description:\n{schema_description}\n"
+        )
+
+    # -----------------------------
+    # Prepare image payload for the LLM
+    # -----------------------------
+    def prepare_images(self, file, file_path, ocr_lines, crop=False, tile=False, data=None):
+        """
+        Crop the image to the union of OCR text boxes and optionally tile tall pages.
+        `data` is the image content when already read (default: `file.read()`).
+
+        Returns:
+            (paths, payload_bytes, image_tokens): path (or tuple of tile paths)
+            to send to the LLM plus payload size and estimated image tokens.
+        """
+        original = data = file.read() if data is None else data
+        if crop and ocr_lines:
+            data, _ = crop_to_text(data, [line.box for line in ocr_lines])
+
+        tiles = tile_image(data) if tile else [data]
+
+        paths = []
+        if len(tiles) == 1 and data is original:
+            paths.append(file_path)
+        else:
+            paths.extend(scratch_file(tile_bytes) for tile_bytes in tiles)
+
+        provider = getattr(self.llm, "provider", "gemini")
+        # Image.open only parses the header here, no full decode
+        tokens = sum(
+            estimate_image_tokens(*Image.open(io.BytesIO(t)).size, provider=provider) for t in tiles
+        )
+
+        payload = sum(len(t) for t in tiles)
+        return (paths[0] if len(paths) == 1 else tuple(paths)), payload, tokens
+
 
     @st.cache_resource
-    def process_document(_self, file, ground_truth, ocr_use):
+    def process_document(_self, file, ground_truth, ocr_use, rule_extract=False, ocr_tier=None,
+                         crop=False, tile=False, classify=False, document_type=None):
         """
         Process a single JPG document with its corresponding ground-truth JSON.
 
         Args:
             file: uploaded JPG file object
-            ground_truth: corresponding ground-truth JSON (dict)
+            ground_truth: corresponding ground-truth JSON (dict), or None for
+                          inference mode (registry schema, no evaluation)
+            ocr_use: run OCR and pass the text to the LLM
+            rule_extract: fill fields from OCR lines first; the LLM only
+                          sees the fields the extractor could not fill
+            ocr_tier: OCR speed/accuracy tier ("accurate", "fast", "fastest")
+            crop: crop the image to OCR text regions before upload (needs OCR)
+            tile: split very tall pages into overlapping tiles
+            classify: predict document_type locally from OCR and use the
+                      per-type schema/prompt from the registry
+            document_type: known document type (inference mode), skips classification
 
         Returns:
             dict: structured result for UI/metrics
         """
-        schema_description = json.dumps(_self.extract_schema_from_gt(ground_truth))
+        inference = ground_truth is None
         start_time = time.time()
+        stage_times = {}
+        model = getattr(_self.llm, "model", "unknown")
+        in_flight = IN_FLIGHT.labels("document")
+        in_flight.inc()
 
         try:
             # Validate file
@@ -94,45 +243,98 @@ class Pipeline:
             # with open(file_path, "wb") as f:
             #     f.write(file.getbuffer())
 
-            # Save temporarily
-            temp_dir = tempfile.gettempdir()
-            file_path = os.path.join(temp_dir, file["name"])
-
-            with open(file_path, "wb") as f:
-                f.write(file["bytes"])                
+            # Uploads are handles: the bytes are read once here, not per use
+            image_bytes = file.read()
+            # Named by content digest: concurrent sessions never overwrite each other's image
+            file_path = scratch_file(image_bytes, file.get("digest"))
 
-            ocr = ""
+            ocr, ocr_lines = "", []
             if ocr_use:
-                ocr = _self.ocr.run(file["bytes"])
-
-
-            prompt = (
-                f"You are an exert Image extractor.\n"
-                f"Analyze the image and extract data according to this schema.\n"
-                f"From the options shown below also classify the document_type and fill it in the JSON field appropriately.\n"
-                f"The options are: INVOICE, RECEIPT, GAS BILL, ELECTRICITY BILL, WATER BILL, BANK STATEMENT, SALARY SLIP, PAYSLIP, ITR FORM 16, CHECK, other (use your judgement).\n"
-                f"I have also tried providing a OCR extract for cross checking or for more help, OCR Extracted Text (ignore if empty): {ocr}."
-                f"Return ONLY valid JSON.\n\nSchema Description:\n{schema_description}\n"
-            )
+                stage_start = time.time()
+                ocr_lines = _self.ocr.run_lines(image_bytes, tier=ocr_tier) or []
+                ocr = "\n".join(line.text for line in ocr_lines)
+                stage_times["ocr"] = time.time() - stage_start
+
+            # Schema: from ground truth (benchmark) or the registry (inference)
+            if inference:
+                doc_type, schema = _self.schema_for_inference(document_type)
+            else:
+                doc_type, schema = None, _self.extract_schema_from_gt(ground_truth)
+
+            # Local pre-classifier: pick the per-type schema before the LLM
+            if doc_type is None and classify and ocr and _self.classifier is not None:
+                stage_start = time.time()
+                doc_type, schema = _self.classify(ocr, schema, ground_truth)
+                stage_times["classify"] = time.time() - stage_start
+
+            # OCR-only fast path: fill what the rules can, shrink the schema for the LLM
+            extracted, remaining = {}, schema
+            if rule_extract and ocr and _self.extractor is not None:
+                extracted, remaining = _self.extractor.extract(ocr, schema)
+
+            payload_bytes, image_tokens, usage, llm_failed = 0, 0, {}, False
+            if remaining:
+                image_input, payload_bytes, image_tokens = _self.prepare_images(
+                    file, file_path, ocr_lines, crop=crop, tile=tile, data=image_bytes
+                )
+                schema_description = json.dumps(remaining)
+                prompt = _self.build_prompt(schema_description, ocr, doc_type)
+                if isinstance(image_input, tuple):
+                    prompt += f"The page is split into {len(image_input)} overlapping vertical parts, in reading order; return one JSON for the whole page.\n"
+
+                # LLM parsing
+                logger.info(f"Running LLM parser for {file["name"]}...")
+                stage_start = time.time()
+                prediction, usage = _self.llm.parse_image(image_input, prompt)
+                stage_times["llm"] = time.time() - stage_start
+                llm_failed = not prediction or not is_json(prediction)
+                if llm_failed:
+                    LLM_FAILURES.labels(model).inc()
+                if extracted:
+                    prediction = merge_predictions(prediction, extracted)
+            else:
+                logger.info(f"All fields filled from OCR for {file["name"]}, skipping LLM.")
+                prediction = extracted
+                _self.metrics.mark_llm_skipped()
 
-            # LLM parsing
-            logger.info(f"Running LLM parser for {file["name"]}...")
-            prediction = _self.llm.parse_image(file_path, prompt)
+            # Benchmark mode scores the LLM's own document_type: the local guess only fills a gap
+            if doc_type is not None and isinstance(prediction, dict) and (inference or not prediction.get("document_type")):
+                prediction["document_type"] = doc_type
 
 
             # st.write(ground_truth)
 
 
-            # Evaluation
-            result = _self.evaluator.evaluate(ground_truth, prediction)
+            stage_start = time.time()
+            accuracy = None
+            if inference:
+                # No ground truth: flat view of the prediction, no scoring
+                result = _self.evaluator.flatten_prediction(prediction)
+                _self.metrics.record_inference(prediction)
+            else:
+                # Evaluation
+                result = _self.evaluator.evaluate(ground_truth, prediction)
 
-            # st.write(print("DEBUG: Type of metrics inside pipeline:", type(_self.metrics)))
+                # st.write(print("DEBUG: Type of metrics inside pipeline:", type(_self.metrics)))
 
-            # Update metrics
-            _self.metrics.update_metrics(prediction, result)
+                # Update metrics
+                accuracy = _self.metrics.update_metrics(prediction, result)
+            stage_times["evaluate"] = time.time() - stage_start
             elapsed = time.time() - start_time
             _self.metrics.record_processing(elapsed)
-            
+            document_type = prediction.get("document_type") if isinstance(prediction, dict) else None
+            _self.metrics.record_group(
+                model, document_type, elapsed, accuracy=accuracy, llm_failed=llm_failed,
+                llm_skipped=not remaining, input_tokens=usage.get("input_tokens"),
+                output_tokens=usage.get("output_tokens"),
+            )
+
+            # Exporter: per-stage / per-model latency and throughput
+            for stage, seconds in stage_times.items():
+                STAGE_LATENCY.labels(stage, model).observe(seconds)
+            DOCUMENT_LATENCY.labels(model).observe(elapsed)
+            DOCUMENTS.labels(model, "ok").inc()
+
             # # Save results
             # _self.storage.save(
             #     file_name=file["name"],
@@ -146,9 +348,24 @@ class Pipeline:
             return {
                 "file_name": file["name"],
                 "result": result,
+                # Raw prediction, persisted per run (RunStore) for re-scoring
+                "prediction": prediction,
                 "processing_time": round(elapsed, 2),
+                "llm_skipped": not remaining,
+                # The LLM's own answer was empty / not JSON (OCR-extracted fields may still fill `prediction`)
+                "llm_failed": llm_failed,
+                "document_type": document_type,
+                "payload_bytes": payload_bytes,
+                "image_tokens": image_tokens,
+                "input_tokens": usage.get("input_tokens"),
+                "output_tokens": usage.get("output_tokens"),
+                "stage_times": stage_times,
             }
 
         except Exception as e:
+            DOCUMENTS.labels(model, "error").inc()
             logger.exception(f"Pipeline failed for {file["name"]}")
-            raise PipelineError(f"{file["name"]} → Pipeline error → {e}")
\ No newline at end of file
+            raise PipelineError(f"{file["name"]} → Pipeline error → {e}")
+
+        finally:
+            in_flight.dec()
\ No newline at end of file
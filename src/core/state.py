@@ -1,8 +1,6 @@
 # core/state.py
 
 import streamlit as st
-from PIL import Image
-import io
 
 class AppState:
     """
@@ -77,31 +75,38 @@ class AppState:
     # ---------------------------------------------------------
     # File & Image helpers
     # ---------------------------------------------------------
+    @classmethod
+    def get_uploads(cls):
+        """The session's UploadRegistry (images + ground-truth JSONs, indexed by name / hash)."""
+        if st.session_state.get("uploads") is None:
+            from src.services.upload_service import UploadRegistry
+            st.session_state["uploads"] = UploadRegistry()
+        return st.session_state["uploads"]
+
     @classmethod
     def add_uploaded_file(cls, file):
-        cls.append("uploaded_files", file)
-        # convert to PIL and store
-        img = Image.open(io.BytesIO(file["bytes"]))
-        cls.append("uploaded_images", {"img": img, "name": file["name"]})
+        # UploadHandle: bytes stay in the blob store, images are opened on demand
+        return cls.get_uploads().add_image(file)
 
     @classmethod
     def get_current_image(cls):
-        images = cls.get("uploaded_images", [])
+        """Handle of the upload shown in the book view (`.image()` opens it)."""
+        images = cls.get_uploads()
         idx = cls.get("current_image_index", 0)
-        if images:
-            return images[idx]
+        if len(images):
+            return images.image_at(idx % len(images))
         return None
 
     @classmethod
     def next_image(cls):
-        images = cls.get("uploaded_images", [])
-        if images:
+        images = cls.get_uploads()
+        if len(images):
             st.session_state["current_image_index"] = (st.session_state["current_image_index"] + 1) % len(images)
 
     @classmethod
     def prev_image(cls):
-        images = cls.get("uploaded_images", [])
-        if images:
+        images = cls.get_uploads()
+        if len(images):
             st.session_state["current_image_index"] = (st.session_state["current_image_index"] - 1) % len(images)
 
     # ---------------------------------------------------------
@@ -134,30 +139,18 @@ class AppState:
 
 
     @classmethod
-    def update_metrics(cls, new_data: dict):
+    def update_metrics(cls, delta: dict):
         """
-        Update existing metrics dict in session_state with new_data.
-        - Adds numerical values field-wise.
-        - Appends lists if the existing value is a list.
+        Fold a per-document metrics delta (`Metrics.flush()`) into the
+        metrics dict in session_state: counters add, sketches merge.
+        Pass deltas, not cumulative `to_dict()` totals, or counts inflate.
         """
+        from src.services.metrics_service import Metrics
+
         if "metrics" not in st.session_state or st.session_state["metrics"] is None:
             st.session_state["metrics"] = {}
 
-        metrics = st.session_state["metrics"]
-
-        for key, value in new_data.items():
-            if key in metrics:
-                if isinstance(value, (int, float)) and isinstance(metrics[key], (int, float)):
-                    metrics[key] += value  # add numbers
-                elif isinstance(value, list) and isinstance(metrics[key], list):
-                    metrics[key].extend(value)  # append lists
-                else:
-                    # fallback: overwrite if types mismatch
-                    metrics[key] = value
-            else:
-                metrics[key] = value  # new key
-
-        st.session_state["metrics"] = metrics
+        st.session_state["metrics"] = Metrics.fold(st.session_state["metrics"], delta)
 
     # ---------------------------------------------------------
     # Page Navigation
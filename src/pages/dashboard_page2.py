@@ -1,5 +1,21 @@
+from datetime import date, datetime, time as dt_time, timedelta
+
+import altair as alt
+import pandas as pd
 import streamlit as st
 
+from src.core.state import AppState
+from src.services.llm_service import LLMImageParser
+from src.services.localstorage_service import LocalStorage
+from src.services.metrics_service import GroupStats, LogHistogram, Metrics, RunningMoments, split_group_key
+from src.services.replay_service import RunStore, rescore_run, summarize
+from src.services.metrics_store_service import GRANULARITIES, STAGES, get_store
+from src.services.results_store_service import ResultsStore
+
+# Field rows shown per run (the CSV export has all of them)
+MAX_FIELD_ROWS = 1000
+
+
 def colored_metric(label, value, color):
     st.markdown(f"""
         <div style="
@@ -24,6 +40,252 @@ def colored_metric(label, value, color):
 
 
 
+def breakdown_frame(groups: dict) -> pd.DataFrame:
+    """One row per (model, document_type) from the incremental group aggregates."""
+    rows = []
+    for key, state in groups.items():
+        model, document_type = split_group_key(key)
+        stats = GroupStats.from_dict(state)
+        p = stats.latency.percentiles()
+        cost = LLMImageParser.estimate_cost(model, stats.input_tokens, stats.output_tokens)
+        rows.append({
+            "model": model,
+            "document_type": document_type,
+            "documents": stats.documents,
+            "p50_sec": round(p["p50"], 2),
+            "p95_sec": round(p["p95"], 2),
+            "accuracy": round(stats.accuracy.mean, 4) if stats.accuracy.count else None,
+            "failure_rate": round(stats.failure_rate, 4),
+            "tokens_per_doc": round((stats.input_tokens + stats.output_tokens) / stats.documents),
+            "cost_per_doc_usd": round(cost / stats.documents, 6) if cost is not None else None,
+        })
+    return pd.DataFrame(rows)
+
+
+def render_breakdown(m):
+    """Model × document type comparison, and the fastest model per type meeting an accuracy bar."""
+    df = breakdown_frame(m.get("groups") or {})
+    if df.empty:
+        return
+
+    st.subheader("🧮 Model × Document Type")
+    st.dataframe(df.sort_values(["document_type", "p95_sec"]), use_container_width=True, hide_index=True)
+
+    col_p95, col_acc = st.columns(2)
+    with col_p95:
+        st.caption("p95 processing time (sec)")
+        st.dataframe(df.pivot(index="document_type", columns="model", values="p95_sec"), use_container_width=True)
+    with col_acc:
+        st.caption("Avg document accuracy")
+        st.dataframe(df.pivot(index="document_type", columns="model", values="accuracy"), use_container_width=True)
+
+    bars = alt.Chart(df).mark_bar().encode(
+        x=alt.X("document_type:N", title=None),
+        xOffset="model:N",
+        y=alt.Y("p95_sec:Q", title="p95 sec"),
+        color="model:N",
+        tooltip=list(df.columns),
+    )
+    scatter = alt.Chart(df).mark_circle(size=120).encode(
+        x=alt.X("p95_sec:Q", title="p95 sec"),
+        y=alt.Y("accuracy:Q", title="accuracy", scale=alt.Scale(domain=[0, 1])),
+        color="model:N",
+        shape="document_type:N",
+        tooltip=list(df.columns),
+    )
+    col_bars, col_scatter = st.columns(2)
+    with col_bars:
+        st.altair_chart(bars, use_container_width=True)
+    with col_scatter:
+        st.altair_chart(scatter, use_container_width=True)
+
+    # Routing: fastest (p95) model per document type that meets the accuracy bar
+    bar = st.slider("Accuracy bar for routing", 0.0, 1.0, 0.9, 0.01)
+    eligible = df[df["accuracy"].fillna(0) >= bar]
+    if eligible.empty:
+        st.info("No model meets this accuracy bar for any document type yet.")
+        return
+    best = eligible.loc[eligible.groupby("document_type")["p95_sec"].idxmin()]
+    st.caption("Suggested routing")
+    st.dataframe(best[["document_type", "model", "p95_sec", "accuracy", "cost_per_doc_usd"]],
+                 use_container_width=True, hide_index=True)
+
+
+def render_field_results(ui):
+    """Per-field results of a run, read from the results store (only the needed columns / rows)."""
+    st.subheader("🔎 Field Results")
+    store = ResultsStore()
+    runs = store.runs()
+    if not runs:
+        st.info("No stored field results yet.")
+        return
+
+    last = AppState.get("last_run_id")
+    col_run, col_below, col_threshold = st.columns([2, 1, 1])
+    with col_run:
+        run_id = st.selectbox("Run", runs, index=runs.index(last) if last in runs else 0, key="results_run")
+    with col_below:
+        below = st.slider("Score below", 0.0, 1.01, 1.01, 0.01, help="1.01 shows every field")
+    with col_threshold:
+        threshold = st.slider("Correct at", 0.5, 1.0, Metrics.SCORE_THRESHOLD, 0.05, key="results_threshold")
+
+    filters = [("run_id", "==", run_id)]
+    if below <= 1.0:
+        filters.append(("score", "<", below))
+    columns = ["file_name", "document_type", "field", "gt_text", "llm_text", "score"]
+
+    # Re-threshold from stored scores: streams two columns, no re-evaluation
+    summary = store.field_accuracy(run_id, threshold)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        colored_metric("Documents", summary["documents"], "#0ea5e9")
+    with col2:
+        colored_metric("Field Accuracy %", round(summary["field_accuracy"] * 100, 1), "#16a34a")
+    with col3:
+        colored_metric("Avg Document Accuracy %", round(summary["avg_document_accuracy"] * 100, 1), "#0ea5e9")
+
+    # Unscored fields (inference runs) pass the score filter; rows are sorted / limited in the scan
+    if summary["documents"]:
+        df, total = store.smallest("score", MAX_FIELD_ROWS, columns, filters, keep_nulls=("score",))
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.caption(f"{total} fields (showing the lowest {len(df)})")
+    else:
+        batches = list(store.iter_batches(columns, filters, limit=MAX_FIELD_ROWS, keep_nulls=("score",)))
+        df = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame(columns=columns)
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.caption(f"Unscored run (showing the first {len(df)} fields)")
+    # Built only when clicked, batch by batch
+    st.download_button("Download CSV", lambda: store.csv_file(columns, filters, keep_nulls=("score",)),
+                       file_name=f"{run_id}_fields.csv", mime="text/csv")
+
+
+def render_rescore(ui):
+    """Re-score a stored run with another threshold / evaluator settings (no LLM calls)."""
+    st.subheader("🔁 Re-score a Stored Run")
+    storage = LocalStorage()
+    runs = RunStore.list_runs(storage)
+    if not runs:
+        st.info("No stored runs yet. Every Parse stores its raw predictions for re-scoring.")
+        return
+
+    last = AppState.get("last_run_id")
+    col_run, col_threshold, col_align = st.columns([2, 1, 1])
+    with col_run:
+        run_id = st.selectbox("Run", runs, index=runs.index(last) if last in runs else 0)
+    with col_threshold:
+        threshold = st.slider("Field score threshold", 0.5, 1.0, Metrics.SCORE_THRESHOLD, 0.05)
+    with col_align:
+        align = st.checkbox("Align list items by content", value=True)
+
+    if ui.button("Re-score", key="rescore"):
+        with st.spinner("Re-scoring stored predictions..."):
+            metrics, rows = rescore_run(
+                storage, run_id, threshold=threshold, evaluator_options={"align_items": align}
+            )
+        AppState.set("rescore", {"run_id": run_id, "summary": summarize(metrics), "rows": rows})
+
+    rescored = AppState.get("rescore")
+    if rescored and rescored["run_id"] == run_id:
+        summary = rescored["summary"]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            colored_metric("Documents", summary["documents"], "#0ea5e9")
+        with col2:
+            colored_metric("Field Accuracy %", round(summary["field_accuracy"] * 100, 1), "#16a34a")
+        with col3:
+            colored_metric("Avg Document Accuracy %", round(summary["avg_document_accuracy"] * 100, 1), "#0ea5e9")
+        if rescored["rows"]:
+            st.dataframe(pd.DataFrame(rescored["rows"]), use_container_width=True)
+
+
+def render_history(ui):
+    """Run history across sessions, from the SQLite metrics store."""
+    st.subheader("🗂 Run History")
+    store = get_store()
+
+    col_dates, col_models, col_types = st.columns([1, 1, 1])
+    with col_dates:
+        today = date.today()
+        date_range = st.date_input("Date range", (today - timedelta(days=30), today))
+    with col_models:
+        models = st.multiselect("Model", store.distinct("model"))
+    with col_types:
+        document_types = st.multiselect("Document type", store.distinct("document_type"))
+
+    filters = {"models": models, "document_types": document_types}
+    if isinstance(date_range, (tuple, list)) and len(date_range) == 2:
+        filters["start"] = datetime.combine(date_range[0], dt_time.min).timestamp()
+        filters["end"] = datetime.combine(date_range[1] + timedelta(days=1), dt_time.min).timestamp()
+
+    summary = store.summary(**filters)
+    if not summary["documents"]:
+        st.info("No stored documents match these filters.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        colored_metric("Documents", summary["documents"], "#0ea5e9")
+    with col2:
+        colored_metric("Runs", summary["runs"], "#0ea5e9")
+    with col3:
+        colored_metric("Avg Accuracy %", round((summary["avg_accuracy"] or 0) * 100, 1), "#16a34a")
+    with col4:
+        colored_metric("Tokens", (summary["input_tokens"] or 0) + (summary["output_tokens"] or 0), "#f59e0b")
+
+    timings = store.stage_timings(**filters)
+    st.caption("Avg stage time (sec): " + " · ".join(
+        f"{stage} {timings[stage]:.2f}" for stage in STAGES if timings[stage] is not None
+    ))
+
+    runs = store.runs(**filters)
+    if runs:
+        df = pd.DataFrame(runs)
+        df["started_at"] = pd.to_datetime(df["started_at"], unit="s")
+        st.dataframe(df, use_container_width=True)
+
+    render_trends(store, filters, [r["run_id"] for r in runs])
+
+
+def trend_charts(df: pd.DataFrame, x: str, color=None) -> alt.Chart:
+    """Avg / max latency, accuracy and volume over time, stacked vertically."""
+    base = alt.Chart(df).encode(x=alt.X(f"{x}:T", title=None))
+    series = {"color": f"{color}:N"} if color else {}
+    latency = base.mark_line().encode(y=alt.Y("avg_time:Q", title="avg sec"), tooltip=list(df.columns), **series)
+    peak = base.mark_line(strokeDash=[4, 3], opacity=0.5).encode(y="max_time:Q", **series)
+    accuracy = base.mark_line().encode(
+        y=alt.Y("avg_accuracy:Q", title="accuracy", scale=alt.Scale(domain=[0, 1])), **series
+    )
+    volume = base.mark_bar().encode(y=alt.Y("documents:Q", title="documents"), **series)
+    return alt.vconcat((latency + peak).properties(height=180), accuracy.properties(height=140),
+                       volume.properties(height=100))
+
+
+def render_trends(store, filters, run_ids):
+    """Time series from the minute / hour / day rollups, downsampled in SQL."""
+    st.subheader("📈 Trends")
+    col_granularity, col_run = st.columns([1, 2])
+    with col_granularity:
+        choice = st.selectbox("Granularity", ["auto", *GRANULARITIES])
+    with col_run:
+        run_id = st.selectbox("Within run", ["— all runs —", *run_ids])
+
+    if run_id in run_ids:
+        points = store.run_timeseries(run_id)
+        if points:
+            df = pd.DataFrame(points)
+            df["time"] = pd.to_datetime(df["time"], unit="s")
+            st.altair_chart(trend_charts(df, "time"), use_container_width=True)
+        return
+
+    points = store.timeseries(None if choice == "auto" else choice, **filters)
+    if not points:
+        st.info("No history in this range yet.")
+        return
+    df = pd.DataFrame(points)
+    df["bucket"] = pd.to_datetime(df["bucket"], unit="s")
+    st.altair_chart(trend_charts(df, "bucket", color="model"), use_container_width=True)
+
+
 def run(ui):
 
 
@@ -36,6 +298,9 @@ def run(ui):
     # -------------------------
     if "metrics" not in st.session_state or not st.session_state.metrics:
         ui.warning("No metrics available yet. Please upload and process JPG files first.")
+        render_history(ui)
+        render_field_results(ui)
+        render_rescore(ui)
         st.stop()
 
     m = st.session_state.metrics
@@ -69,18 +334,63 @@ def run(ui):
     with col6:
         colored_metric("Incorrect Predictions", m["incorrect_predictions"], "#dc2626")
 
-    processing_times = m["processing_times"]
-    avg_time = round(sum(processing_times) / len(processing_times), 2) if processing_times else 0
+    latency = LogHistogram.from_dict(m["latency"]) if m.get("latency") else LogHistogram()
+    avg_time = round(latency.mean, 2)
 
-    accuracy = m["accuracy"]
-    avg_accuracy = round(sum(accuracy) / len(accuracy), 2)*100 if accuracy else 0
+    accuracy = RunningMoments.from_dict(m["accuracy"]) if m.get("accuracy") else RunningMoments()
+    avg_accuracy = round(accuracy.mean, 2)*100
 
 
-    col7, col8, _ = st.columns(3)
+    col7, col8, col9 = st.columns(3)
     with col7:
         colored_metric("Avg Processing Time (sec)", avg_time, "#0ea5e9")
     with col8:
         colored_metric("Avg Accuracy %", avg_accuracy, "#0ea5e9")
+    with col9:
+        colored_metric("LLM Calls Skipped (OCR)", m.get("llm_skipped", 0), "#16a34a")
+
+    # -------------------------
+    # Latency percentiles (streaming histogram)
+    # -------------------------
+    if latency.count:
+        p = latency.percentiles()
+        col_p50, col_p95, col_p99 = st.columns(3)
+        with col_p50:
+            colored_metric("p50 Processing Time (sec)", round(p["p50"], 2), "#0ea5e9")
+        with col_p95:
+            colored_metric("p95 Processing Time (sec)", round(p["p95"], 2), "#f59e0b")
+        with col_p99:
+            colored_metric("p99 Processing Time (sec)", round(p["p99"], 2), "#dc2626")
+        if accuracy.count > 1:
+            st.caption(f"Document accuracy: {accuracy.mean:.2%} ± {accuracy.std:.2%} "
+                       f"(min {accuracy.min:.2%}, max {accuracy.max:.2%})")
+
+    # -------------------------
+    # Local pre-classifier
+    # -------------------------
+    classifier_latency = LogHistogram.from_dict(m["classifier_latency"]) if m.get("classifier_latency") else None
+    if classifier_latency is not None and classifier_latency.count:
+        judged = m.get("classifier_correct", 0) + m.get("classifier_incorrect", 0)
+        classifier_acc = round(m.get("classifier_correct", 0) / judged * 100, 1) if judged else 0
+        avg_classifier_ms = round(classifier_latency.mean * 1000, 1)
+
+        col10, col11, _ = st.columns(3)
+        with col10:
+            colored_metric("Pre-classifier Accuracy %", classifier_acc, "#16a34a")
+        with col11:
+            colored_metric("Pre-classifier Time (ms)", avg_classifier_ms, "#0ea5e9")
+
+    # -------------------------
+    # Per model × document type
+    # -------------------------
+    render_breakdown(m)
+
+    # -------------------------
+    # History (SQLite) and re-scoring
+    # -------------------------
+    render_history(ui)
+    render_field_results(ui)
+    render_rescore(ui)
     # st.subheader("Raw Metrics Data")
     # #st.dataframe(m.to_dict())  # Use to_dict() to convert to dataframe-friendly dict
 
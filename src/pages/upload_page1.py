@@ -9,12 +9,20 @@ from src.core.handlers import RequestHandler
 from src.ui.widgets import FileUploadWidget
 from src.core.state import AppState
 from src.core.pipeline import Pipeline
-from src.services.ocr_service import OCRProcessor
+from src.services.ocr_service import OCRProcessor, available_tiers, DEFAULT_TIER
+from src.services.extraction_service import RuleExtractor
+from src.services.classifier_service import DocumentClassifier
+from src.services.schema_service import SchemaRegistry
 from src.services.llm_service import LLMImageParser
 from src.services.evaluation_service import Evaluator as GroundTruthEvaluator
-from src.services.localstorage_service import LocalStorage
+from src.services.localstorage_service import DEFAULT_COMPRESSION, LocalStorage
 from src.services.metrics_service import Metrics
+from src.services.replay_service import RunStore
+from src.services.metrics_store_service import get_store
+from src.services.results_store_service import ResultsStore
+from src.services.writer_service import get_writer
 from src.services.highlight_service import render_boxes_component
+from src.services.image_service import THUMB_WIDTH, VIEWER_WIDTH, get_renditions
 from src.utils.file_utils import *
 from st_aggrid import AgGrid, GridOptionsBuilder
 
@@ -43,6 +51,8 @@ def run(ui):
 
     # Ensure upload_counter exists
     upload_counter = AppState.get("upload_counter") or 0
+    # Uploads indexed by name / content hash: reruns only touch new files
+    uploads = AppState.get_uploads()
 
     # -----------------------------
     # Columns for Uploads
@@ -64,18 +74,13 @@ def run(ui):
         uploader.render()
 
         # Persist uploaded files safely
-        existing_jpgs = AppState.get("uploaded_files") or []
-        if uploader.files:
-            for f in uploader.files:
-                if f is not None and f not in existing_jpgs:
-                    AppState.add_uploaded_file(f)
-
-        uploaded_files = AppState.get("uploaded_files") or []
-        st.write(f"No. of JPGs uploaded: {len(uploaded_files)}")
+        uploads.ingest(uploader.files)
+        st.write(f"No. of JPGs uploaded: {len(uploads)}")
 
         if ui.button("Clear All JPG Uploads", key="clear_jpg_uploads"):
             AppState.reset()
             AppState.set("upload_counter", upload_counter + 1)
+            uploads = AppState.get_uploads()
             
 
     # -----------------------------
@@ -92,19 +97,14 @@ def run(ui):
         )
         uploader_json.render()
 
-        existing_jsons = AppState.get("groundtruth_json") or []
-        if uploader_json.files:
-            for f in uploader_json.files:
-                if f is not None and f not in existing_jsons:
-                    existing_jsons.append(f)
-        AppState.set("groundtruth_json", existing_jsons)
-
-        uploaded_jsons = AppState.get("groundtruth_json") or []
-        st.write(f"No. of JSONs uploaded: {len(uploaded_jsons)}")
+        # Paired with the JPGs by file name as they arrive
+        uploads.ingest(uploader_json.files, ground_truth=True)
+        st.write(f"No. of JSONs uploaded: {len(uploads.ground_truths)}")
 
         if ui.button("Clear All JSON Uploads", key="clear_json_uploads"):
             AppState.reset()
             AppState.set("upload_counter", upload_counter + 1)
+            uploads = AppState.get_uploads()
             
 
     ui.divider()
@@ -113,14 +113,20 @@ def run(ui):
     # Load Model & Files
     # -----------------------------
     saved_model = AppState.get("selected_model", "gemini-2.0-flash")
-    uploaded_jpg_files = AppState.get("uploaded_files") or []
-    uploaded_gt_files = AppState.get("groundtruth_json") or []
 
-    if uploaded_jpg_files and uploaded_gt_files:
+    # Inference mode: no ground truth, schema from the registry, no evaluation
+    mode_options = ["Benchmark (with ground truth)", "Inference (no ground truth)"]
+    mode = st.radio("Mode", mode_options, index=1 if AppState.get("inference_mode") else 0, horizontal=True)
+    inference = mode == mode_options[1]
+    AppState.set("inference_mode", inference)
+
+    if len(uploads) and (uploads.ground_truths or inference):
 
-        # Sort GT JSONs according to uploaded JPGs
-        sorted_gt_files, _ = handle.handle(sort_gt_files_by_jpg, uploaded_jpg_files, uploaded_gt_files)
-        AppState.set("groundtruth_jsons", sorted_gt_files)
+        # JPGs without a ground-truth JSON can't be benchmarked
+        if not inference and uploads.unpaired():
+            ui.warning(f"No matching JSON found for: {', '.join(uploads.unpaired())} (skipped)")
+
+        registry = SchemaRegistry()
 
         # -----------------------------
         # MODEL SELECTION (Persistent)
@@ -143,31 +149,74 @@ def run(ui):
             if model_choice != saved_model:
                 AppState.set("selected_model", model_choice)
 
+            document_type = None
+            if inference:
+                type_options = ["Auto (classify)"] + registry.document_types()
+                type_choice = st.selectbox("Document type", type_options)
+                document_type = None if type_choice == type_options[0] else type_choice
+
         with col_ocr:
             use_ocr = st.checkbox("Enable OCR", value=AppState.get("use_ocr", False))
             AppState.set("use_ocr", use_ocr)
+            rule_extract = st.checkbox(
+                "OCR fast path (skip LLM for rule-extracted fields)",
+                value=AppState.get("rule_extract", False),
+                disabled=not use_ocr,
+            )
+            AppState.set("rule_extract", rule_extract and use_ocr)
+            tiers = available_tiers()
+            saved_tier = AppState.get("ocr_tier", DEFAULT_TIER)
+            ocr_tier = st.selectbox(
+                "OCR tier",
+                tiers,
+                index=tiers.index(saved_tier) if saved_tier in tiers else 0,
+                disabled=not use_ocr,
+                help="accurate: PaddleOCR server models · fast: PaddleOCR mobile models · fastest: Tesseract",
+            )
+            AppState.set("ocr_tier", ocr_tier)
+            crop = st.checkbox(
+                "Crop to text regions before upload",
+                value=AppState.get("crop_to_text", False),
+                disabled=not use_ocr,
+            )
+            AppState.set("crop_to_text", crop and use_ocr)
+            tile = st.checkbox("Tile very tall pages", value=AppState.get("tile_pages", False))
+            AppState.set("tile_pages", tile)
+            classify = st.checkbox(
+                "Pre-classify document type locally",
+                value=AppState.get("classify", False),
+                disabled=not use_ocr,
+            )
+            AppState.set("classify", classify and use_ocr)
 
 
         # -----------------------------
         # LOAD GROUND TRUTH JSONS
         # -----------------------------
         ground_truth_map = {}
-        if model_choice != "— Select Model —":
-            for jpg_file, gt_file in zip(uploaded_jpg_files, sorted_gt_files):
+        if not inference and model_choice != "— Select Model —":
+            for jpg_file in uploads.paired():
                 try:
-                    gt_data = json.loads(gt_file["bytes"].decode("utf-8"))
-                    ground_truth_map[jpg_file["name"]] = gt_data
+                    # Parsed once per JSON content, not on every rerun
+                    ground_truth_map[jpg_file["name"]] = uploads.ground_truth(jpg_file["name"])
                 except Exception as e:
-                    ui.error(f"Failed to load JSON {gt_file['name']}: {e}")
+                    ui.error(f"Failed to load JSON {uploads.ground_truth_for(jpg_file['name'])['name']}: {e}")
                     continue
 
+        # Keep per-type schemas in the registry so inference can run without GT
+        if ground_truth_map and registry.register_from_ground_truth(list(ground_truth_map.values())):
+            registry.save()
+
         llm_service = LLMImageParser(saved_model)
-        evaluator = GroundTruthEvaluator()
-        storage = LocalStorage()
+        evaluator = GroundTruthEvaluator(columnar=True)
+        # Content-addressed: repeated runs over the same dataset store each artifact once
+        storage = LocalStorage(content_addressed=True, compression=DEFAULT_COMPRESSION)
         # Load persistent metrics
         metrics = Metrics()
         ocr = OCRProcessor()
-        pipeline = Pipeline(llm_service, evaluator, storage, metrics, ocr)
+        extractor = RuleExtractor()
+        classifier = DocumentClassifier()
+        pipeline = Pipeline(llm_service, evaluator, storage, metrics, ocr, extractor, classifier, registry)
 
         _, col, _ = st.columns([1, 0.25, 1])
         with col:
@@ -177,19 +226,66 @@ def run(ui):
             if ui.button("🚀 Parse", key="processor") and not AppState.get("process_all_clicked"):
 
 
+                # Raw predictions of this run are kept for re-scoring (Dashboard / cli.py)
+                run_store = RunStore(storage, model=saved_model)
+                AppState.set("last_run_id", run_store.run_id)
+                metrics_store = get_store()
+                results_store = ResultsStore(storage.base_dir)
+                # Persistence runs write-behind: storage I/O stays off the per-document path
+                writer = get_writer()
+                metrics_store.start_run(
+                    run_store.run_id,
+                    model=saved_model,
+                    mode="inference" if inference else "benchmark",
+                    settings={
+                        "use_ocr": AppState.get("use_ocr"),
+                        "ocr_tier": AppState.get("ocr_tier", DEFAULT_TIER),
+                        "rule_extract": AppState.get("rule_extract", False),
+                        "crop": AppState.get("crop_to_text", False),
+                        "tile": AppState.get("tile_pages", False),
+                        "classify": AppState.get("classify", False),
+                    },
+                )
+
                 results = []
-                for file in uploaded_jpg_files:
-                    gt_data = ground_truth_map[file["name"]]
+                documents = uploads.image_list() if inference else [uploads.images[n] for n in ground_truth_map]
+                for file in documents:
+                    gt_data = None if inference else ground_truth_map[file["name"]]
 
 
                     # st.write(file)
                     use_ocr = AppState.get("use_ocr")
-                    res = ui.run_with_stopwatch(pipeline.process_document, file=file, ground_truth=gt_data, ocr_use=use_ocr)
+                    rule_extract = AppState.get("rule_extract", False)
+                    ocr_tier = AppState.get("ocr_tier", DEFAULT_TIER)
+                    res = ui.run_with_stopwatch(
+                        pipeline.process_document,
+                        file=file,
+                        ground_truth=gt_data,
+                        ocr_use=use_ocr,
+                        rule_extract=rule_extract,
+                        ocr_tier=ocr_tier,
+                        crop=AppState.get("crop_to_text", False),
+                        tile=AppState.get("tile_pages", False),
+                        classify=AppState.get("classify", False),
+                        document_type=document_type,
+                    )
                     results.append(res)
+                    writer.submit(
+                        run_store.record,
+                        res["file_name"],
+                        res.get("prediction"),
+                        gt_data,
+                        document_type=res.get("document_type"),
+                        processing_time=res.get("processing_time"),
+                    )
+                    writer.submit(metrics_store.record_document, run_store.run_id, saved_model, res)
+                    writer.submit(results_store.append, run_store.run_id, saved_model, res)
                     #st.write(metrics.to_dict())    
-                    AppState.update_metrics(metrics.to_dict())
+                    AppState.update_metrics(metrics.flush())
                     #AppState.set("metrics", metrics.to_dict())
 
+                writer.submit(metrics_store.flush)
+                writer.submit(results_store.compact, run_store.run_id)
                 AppState.set("pipeline_results", results)
                 AppState.set("process_all_clicked", True)
 
@@ -199,11 +295,23 @@ def run(ui):
     ui.header("Output")
     c1, c2 = st.columns([1, 1])
     with c1:
-        uploaded_images = AppState.get("uploaded_images") or []
-
         current = AppState.get_current_image()
         if current:
-            st.image(current["img"], caption=current["name"])
+            # Viewer-sized renditions from the shared LRU, never the full-resolution scan
+            renditions = get_renditions()
+            st.image(renditions.get(current, VIEWER_WIDTH), caption=current["name"])
+
+            n, idx = len(uploads), AppState.get("current_image_index", 0) % len(uploads)
+            neighbour = lambda offset: uploads.image_at((idx + offset) % n)
+            # Next / previous pages (and the strip's next thumbnails) render in the background
+            renditions.prefetch([neighbour(1), neighbour(-1)], VIEWER_WIDTH)
+            renditions.prefetch([neighbour(3), neighbour(-3)], THUMB_WIDTH)
+            if n > 1:
+                # Thumbnail strip: up to two pages either side
+                window = [neighbour(offset) for offset in range(-min(2, (n - 1) // 2), min(2, n // 2) + 1)]
+                for col, page in zip(st.columns(len(window)), window):
+                    col.image(renditions.get(page, THUMB_WIDTH), caption=page["name"])
+
             col_prev, _, col_next = st.columns([1, 2, 1])
             with col_prev:
                 if ui.button("⬅ Previous", key="prev_image"):
@@ -249,13 +357,22 @@ def run(ui):
                     AppState.set("dict_page", min(idx + 1, len(dfs) - 1))
                     
             with col2_btn:
-                csv_buffer = io.StringIO()
-                dfs[idx].to_csv(csv_buffer, index=False)
+                # Exported from the results store, built only when clicked (after pending writes land)
+                run_id, file_name = AppState.get("last_run_id"), results[idx].get("file_name")
+
+                def export_page():
+                    get_writer().flush()
+                    return ResultsStore().csv_file(
+                        ["file_name", "document_type", "field", "gt_text", "llm_text", "score"],
+                        [("run_id", "==", run_id), ("file_name", "==", file_name)],
+                    )
+
                 st.download_button(
                     label="Download CSV",
-                    data=csv_buffer.getvalue(),
+                    data=export_page,
                     file_name=f"results_page_{idx+1}.csv",
-                    mime="text/csv"
+                    mime="text/csv",
+                    disabled=run_id is None,
                 )
     else:
         st.info("No results to display yet.")
@@ -0,0 +1,118 @@
+import json
+import pickle
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.services.extraction_service import DOCUMENT_TYPE_KEYWORDS, RuleExtractor
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+except ImportError:  # keyword-only classification without scikit-learn
+    make_pipeline = None
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentClassifier:
+    """
+    Cheap local document-type classifier run on OCR text before the LLM.
+
+    Combines OCR keyword votes with an optional TF-IDF + logistic regression
+    model (scikit-learn). Without a trained model it falls back to keywords.
+    """
+
+    KEYWORD_WEIGHT = 0.3
+    # Pseudo-count added to the keyword hits: one stray keyword gives 0.5, not 1.0
+    KEYWORD_PRIOR = 1.0
+
+    def __init__(self, model_path: str = "storage/models/doc_classifier.pkl", min_confidence: float = 0.6):
+        self.model_path = Path(model_path)
+        self.min_confidence = min_confidence
+        self.model = None
+
+        if self.model_path.exists():
+            try:
+                with open(self.model_path, "rb") as f:
+                    self.model = pickle.load(f)
+                logger.info(f"Document classifier loaded from {self.model_path}")
+            except Exception as e:
+                logger.warning(f"Could not load document classifier: {e}")
+
+    # -------------------------------------------------
+    # Training
+    # -------------------------------------------------
+    def fit(self, texts: List[str], labels: List[str], save: bool = True):
+        """Train the TF-IDF / logistic regression model on OCR texts."""
+        if make_pipeline is None:
+            raise ImportError("scikit-learn is required to train the document classifier.")
+
+        self.model = make_pipeline(
+            TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=1),
+            LogisticRegression(max_iter=1000, class_weight="balanced"),
+        )
+        self.model.fit(texts, labels)
+
+        if save:
+            self.model_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.model_path, "wb") as f:
+                pickle.dump(self.model, f)
+            logger.info(f"Document classifier saved to {self.model_path}")
+        return self
+
+    # -------------------------------------------------
+    # Prediction
+    # -------------------------------------------------
+    def _keyword_distribution(self, text: str) -> Dict[str, float]:
+        scores = RuleExtractor.keyword_scores(text)
+        total = sum(scores.values())
+        if not total:
+            return {}
+        return {doc_type: hits / (total + self.KEYWORD_PRIOR) for doc_type, hits in scores.items() if hits}
+
+    def predict(self, ocr_text: str) -> Tuple[Optional[str], float]:
+        """
+        Predict the document type of an OCR text.
+
+        Returns:
+            (document_type, confidence); document_type is None when below min_confidence
+        """
+        if not ocr_text:
+            return None, 0.0
+
+        combined = dict(self._keyword_distribution(ocr_text))
+
+        if self.model is not None:
+            probs = self.model.predict_proba([ocr_text])[0]
+            combined = {
+                label: (1 - self.KEYWORD_WEIGHT) * p + self.KEYWORD_WEIGHT * combined.get(label, 0.0)
+                for label, p in zip(self.model.classes_, probs)
+            }
+
+        if not combined:
+            return None, 0.0
+
+        label, confidence = max(combined.items(), key=lambda kv: kv[1])
+        if confidence < self.min_confidence:
+            return None, confidence
+        return label, confidence
+
+
+def train_from_folder(jpg_dir: str, gt_dir: str, ocr, model_path: str = "storage/models/doc_classifier.pkl"):
+    """Train a classifier from JPGs + ground-truth JSONs (label = GT document_type); see `cli.py train-classifier`."""
+    texts, labels = [], []
+    for jpg in sorted(Path(jpg_dir).glob("*.jp*g")):
+        gt_path = Path(gt_dir) / f"{jpg.stem}.json"
+        if not gt_path.exists():
+            continue
+        label = json.loads(gt_path.read_text(encoding="utf-8")).get("document_type")
+        text = ocr.run(jpg.read_bytes())
+        if label and text:
+            texts.append(text)
+            labels.append(label)
+
+    if len(set(labels)) < 2:
+        raise ValueError("Need at least two document types to train the classifier.")
+    return DocumentClassifier(model_path).fit(texts, labels)
@@ -1,9 +1,346 @@
 import json
-from typing import Any, Dict
+import threading
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 import re
+from datetime import datetime
 from difflib import SequenceMatcher
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+try:
+    from rapidfuzz.distance import Indel
+    from rapidfuzz import process as rf_process
+except ImportError:  # falls back to SequenceMatcher
+    Indel = None
+    rf_process = None
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # greedy assignment instead
+    linear_sum_assignment = None
+
+
+# Precompiled normalization patterns (shared by single and batch paths)
+SEPARATOR_PATTERN = re.compile(r"[\/,;|]")
+NON_ALNUM_PATTERN = re.compile(r"[^a-z0-9\s]")
+SPACES_PATTERN = re.compile(r"\s+")
+
+# Batch normalization joins all values with NUL, so NUL must survive the passes
+BATCH_SEPARATOR = "\x00"
+BATCH_NON_ALNUM_PATTERN = re.compile(r"[^a-z0-9\s\x00]")
+BATCH_SPACES_PATTERN = re.compile(r"[^\S\x00]+")
+
+
+# ------------------------------------------------------
+# Type-aware comparators
+# ------------------------------------------------------
+NUMBER_VALUE_PATTERN = re.compile(
+    r"^(?:rs\.?|inr|₹|\$|usd)?\s*([-+]?(?:\d{1,3}(?:,\d{2,3})+|\d+)(?:\.\d+)?)\s*(?:/-)?$",
+    re.IGNORECASE,
+)
+DATE_FORMATS = (
+    "%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%d-%m-%y", "%d.%m.%Y", "%d.%m.%y",
+    "%Y-%m-%d", "%Y/%m/%d", "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%d-%b-%y",
+    "%b %d, %Y", "%B %d, %Y", "%d %b, %Y", "%d %B, %Y",
+)
+# An ID key ends in one of these segments: invoice_no, accountNumber, pan, ifsc_code (not invoice_date, company_name)
+ID_KEY_PATTERN = re.compile(r"(?:^|[^a-z0-9])(?:number|num|no|id|code|gstin|ifsc|pan|account|invoice)$")
+KEY_CAMEL_PATTERN = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+ID_VALUE_PATTERN = re.compile(r"^(?=.*\d)[A-Za-z0-9\-/]+$")
+ALNUM_PATTERN = re.compile(r"[^a-z0-9]")
+PATH_INDEX_PATTERN = re.compile(r"\[\d+\]")
+
+NUMBER_ABS_TOLERANCE = 0.005
+
+
+@lru_cache(maxsize=65536)
+def parse_number(value: str) -> Optional[float]:
+    """'1,234.50', 'Rs. 677.50', '1234.5/-' → float; None if not a plain amount."""
+    match = NUMBER_VALUE_PATTERN.match(value.strip())
+    if not match:
+        return None
+    return float(match.group(1).replace(",", ""))
+
+
+@lru_cache(maxsize=65536)
+def parse_date(value: str):
+    """Parse a date in common (day-first) formats; None if it is not a bare date."""
+    value = " ".join(value.strip().split())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _as_number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return parse_number(value)
+    return None
+
+
+def compare_number(gt, pred) -> Optional[float]:
+    gt_num, pred_num = _as_number(gt), _as_number(pred)
+    if gt_num is None or pred_num is None:
+        return None
+    tolerance = max(NUMBER_ABS_TOLERANCE, abs(gt_num) * 1e-6)
+    return 1.0 if abs(gt_num - pred_num) <= tolerance else 0.0
+
+
+def compare_date(gt, pred) -> Optional[float]:
+    if not isinstance(gt, str) or not isinstance(pred, str):
+        return None
+    gt_date, pred_date = parse_date(gt), parse_date(pred)
+    if gt_date is None or pred_date is None:
+        return None
+    return 1.0 if gt_date == pred_date else 0.0
+
+
+def compare_id(gt, pred) -> Optional[float]:
+    gt_id = ALNUM_PATTERN.sub("", str(gt).lower())
+    pred_id = ALNUM_PATTERN.sub("", str(pred).lower())
+    return 1.0 if gt_id == pred_id else 0.0
+
+
+# name → comparator(gt, pred) returning a score, or None to fall back to fuzzy text
+COMPARATORS: Dict[str, Optional[Callable[[Any, Any], Optional[float]]]] = {
+    "id": compare_id,
+    "date": compare_date,
+    "number": compare_number,
+    "text": None,
+}
+
+
+@lru_cache(maxsize=65536)
+def _infer_leaf_type(key: str, gt_value: str) -> str:
+    # Dates first: "05/03/2024" also looks like an ID. Numbers after IDs, so long
+    # account numbers are not compared as (rounded) floats.
+    if parse_date(gt_value) is not None:
+        return "date"
+    key = KEY_CAMEL_PATTERN.sub("_", key).lower()
+    if ID_KEY_PATTERN.search(key) and ID_VALUE_PATTERN.match(gt_value):
+        return "id"
+    if parse_number(gt_value) is not None:
+        return "number"
+    return "text"
+
+
+# ------------------------------------------------------
+# Order-invariant list alignment
+# ------------------------------------------------------
+def _greedy_assignment(sim: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Highest-similarity-first matching; fallback when scipy is missing."""
+    order = np.argsort(-sim, axis=None, kind="stable")
+    rows, cols = np.unravel_index(order, sim.shape)
+    used_rows = np.zeros(sim.shape[0], dtype=bool)
+    used_cols = np.zeros(sim.shape[1], dtype=bool)
+    out_rows, out_cols = [], []
+    limit = min(sim.shape)
+    for r, c in zip(rows.tolist(), cols.tolist()):
+        if used_rows[r] or used_cols[c]:
+            continue
+        used_rows[r] = used_cols[c] = True
+        out_rows.append(r)
+        out_cols.append(c)
+        if len(out_rows) == limit:
+            break
+    return np.asarray(out_rows, dtype=np.intp), np.asarray(out_cols, dtype=np.intp)
+
+
+def solve_assignment(sim: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Maximum-similarity one-to-one assignment (Hungarian via scipy, else greedy)."""
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(sim, maximize=True)
+    return _greedy_assignment(sim)
+
+
+def similarity_matrix(gt_texts: List[str], pred_texts: List[str], workers: int = -1) -> np.ndarray:
+    """Pairwise normalized similarity of item signatures (rows: GT, columns: prediction)."""
+    if rf_process is not None:
+        return rf_process.cdist(
+            gt_texts, pred_texts, scorer=Indel.normalized_similarity, dtype=np.float32, workers=workers
+        )
+    sim = np.zeros((len(gt_texts), len(pred_texts)), dtype=np.float32)
+    for i, g in enumerate(gt_texts):
+        for j, p in enumerate(pred_texts):
+            sim[i, j] = SequenceMatcher(None, g, p).ratio()
+    return sim
+
+
+# ------------------------------------------------------
+# Columnar evaluation results
+# ------------------------------------------------------
+class PathTable:
+    """
+    Interned field paths: each dotted path is stored once and referenced by id.
+
+    A table is scoped to one evaluation (a document, or every document of an
+    `evaluate_batch` call) and shared by its results, so it holds only the
+    paths of that batch and is freed with them.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.paths: List[str] = []
+        self._lock = threading.Lock()
+        self._index = None
+
+    def intern_many(self, paths: Iterable[str]) -> np.ndarray:
+        ids = self.ids
+        out = []
+        for path in paths:
+            path_id = ids.get(path)
+            if path_id is None:
+                with self._lock:
+                    path_id = ids.get(path)
+                    if path_id is None:
+                        path_id = len(self.paths)
+                        self.paths.append(path)
+                        ids[path] = path_id
+            out.append(path_id)
+        return np.asarray(out, dtype=np.int32)
+
+    def categories(self) -> pd.Index:
+        """The table's paths as a pandas Index (cached until the table grows)."""
+        index = self._index
+        if index is None or len(index) != len(self.paths):
+            index = self._index = pd.Index(self.paths[:], dtype=object)
+        return index
+
+
+class EvaluationResult(Mapping):
+    """
+    Columnar evaluation result.
+
+    Parallel arrays instead of one dict per leaf: path ids interned in the
+    batch's `PathTable`, float scores (NaN = unscored) and offsets into a
+    de-duplicated value pool for the GT / predicted text (-1 = None). It reads like the dict returned by
+    `Evaluator.evaluate` (`result[path]["score"]`, `.items()`, ...) and
+    converts to a DataFrame without copying the path and score columns.
+    """
+
+    __slots__ = ("table", "path_ids", "scores", "pool", "gt_index", "llm_index", "_rows")
+
+    def __init__(self, table: PathTable, path_ids: np.ndarray, scores: np.ndarray, pool: List[Any],
+                 gt_index: np.ndarray, llm_index: np.ndarray):
+        self.table = table
+        self.path_ids = path_ids
+        self.scores = scores
+        self.pool = pool
+        self.gt_index = gt_index
+        self.llm_index = llm_index
+        self._rows = None
+
+    @classmethod
+    def from_columns(cls, paths: List[str], gts: List[Any], preds: List[Any], scores,
+                     table: Optional[PathTable] = None) -> "EvaluationResult":
+        """Build from parallel columns; `table` is shared by the results of one batch (new one if omitted)."""
+        table = PathTable() if table is None else table
+        values: List[Any] = []
+        pool: Dict[Any, int] = {}
+
+        def offsets(column):
+            out = np.empty(len(column), dtype=np.int32)
+            for i, value in enumerate(column):
+                if value is None:
+                    out[i] = -1
+                    continue
+                try:
+                    key = (type(value), value)
+                    offset = pool.get(key)
+                    if offset is None:
+                        offset = pool[key] = len(values)
+                        values.append(value)
+                except TypeError:  # unhashable leaf (e.g. list predicted for a scalar)
+                    offset = len(values)
+                    values.append(value)
+                out[i] = offset
+            return out
+
+        scores = np.asarray([np.nan if s is None else s for s in scores], dtype=np.float64) \
+            if isinstance(scores, list) else np.asarray(scores, dtype=np.float64)
+        return cls(table, table.intern_many(paths), scores, values, offsets(gts), offsets(preds))
+
+    @classmethod
+    def from_dict(cls, result: Dict[str, dict]) -> "EvaluationResult":
+        rows = [(k, v) for k, v in result.items() if isinstance(v, dict)]
+        return cls.from_columns(
+            [k for k, _ in rows],
+            [v.get("gt_text") for _, v in rows],
+            [v.get("llm_text") for _, v in rows],
+            [v.get("score") for _, v in rows],
+        )
+
+    # ---- dict view ----
+    def _value(self, offset: int):
+        return self.pool[offset] if offset >= 0 else None
+
+    def row(self, i: int) -> dict:
+        score = self.scores[i]
+        return {
+            "llm_text": self._value(int(self.llm_index[i])),
+            "gt_text": self._value(int(self.gt_index[i])),
+            "score": None if np.isnan(score) else float(score),
+        }
+
+    def __getitem__(self, path: str) -> dict:
+        if self._rows is None:
+            self._rows = {self.table.paths[p]: i for i, p in enumerate(self.path_ids.tolist())}
+        return self.row(self._rows[path])
+
+    def __iter__(self):
+        paths = self.table.paths
+        return (paths[p] for p in self.path_ids.tolist())
+
+    def __len__(self):
+        return len(self.path_ids)
+
+    def items(self):
+        paths = self.table.paths
+        return ((paths[p], self.row(i)) for i, p in enumerate(self.path_ids.tolist()))
+
+    def as_dict(self) -> Dict[str, dict]:
+        """Same structure as `Evaluator.evaluate`."""
+        return dict(self.items())
+
+    # ---- DataFrame ----
+    def to_dataframe(self, missing: Any = None) -> pd.DataFrame:
+        """
+        Columns field / gt_text / llm_text / score. `field` is categorical over
+        the batch's path table and `score` wraps the score array (no copies).
+        Absent texts are filled with `missing`.
+        """
+        pool = np.empty(len(self.pool) + 1, dtype=object)
+        pool[:-1] = self.pool
+        pool[-1] = missing  # offset -1
+        return pd.DataFrame({
+            "field": pd.Categorical.from_codes(self.path_ids, dtype=pd.CategoricalDtype(self.table.categories())),
+            "gt_text": pool[self.gt_index],
+            "llm_text": pool[self.llm_index],
+            "score": self.scores,
+        }, copy=False)
+
+    # ---- pickling (Streamlit caches, process pools) ----
+    def __getstate__(self):
+        paths = self.table.paths
+        return ([paths[p] for p in self.path_ids.tolist()], self.scores, self.pool, self.gt_index, self.llm_index)
+
+    def __setstate__(self, state):
+        paths, self.scores, self.pool, self.gt_index, self.llm_index = state
+        self.table = PathTable()
+        self.path_ids = self.table.intern_many(paths)
+        self._rows = None
+
+    def __repr__(self):
+        return f"EvaluationResult({len(self)} fields)"
 
 
 class Evaluator:
@@ -17,14 +354,179 @@ class Evaluator:
             "score": 0.82
         }
     }
+
+    Leaves are compared by type: numbers (parse + tolerance), dates (parsed,
+    cached), IDs (exact) and free text (token fuzzy match). Types come from
+    `field_types` (regex on the dotted path → comparator name) or are
+    inferred from the leaf key and ground-truth value.
+
+    Lists of objects (line items, statement rows) are aligned by content
+    rather than by index, so one missing row does not shift every later one.
+
+    With `columnar=True` results are `EvaluationResult` objects (same
+    mapping interface, parallel arrays underneath).
     """
 
+    def __init__(self, field_types: Optional[Dict[str, str]] = None, align_items: bool = True,
+                 min_item_similarity: float = 0.5, columnar: bool = False):
+        self.field_types = [(re.compile(pattern), kind) for pattern, kind in (field_types or {}).items()]
+        self.align_items = align_items
+        self.min_item_similarity = min_item_similarity
+        self.columnar = columnar
+        for _, kind in self.field_types:
+            if kind not in COMPARATORS:
+                raise ValueError(f"Unknown comparator: {kind}. Options: {list(COMPARATORS)}")
+
+    @staticmethod
+    def register_comparator(name: str, comparator: Callable[[Any, Any], Optional[float]]):
+        """Add or replace a comparator usable in `field_types`."""
+        COMPARATORS[name] = comparator
+
+    def infer_type(self, path: Optional[str], gt) -> str:
+        """Comparator name for a leaf: explicit field mapping first, then inference."""
+        if path:
+            for pattern, kind in self.field_types:
+                if pattern.search(path):
+                    return kind
+
+        if isinstance(gt, bool) or gt is None:
+            return "text"
+        if isinstance(gt, (int, float)):
+            return "number"
+        if not isinstance(gt, str) or not gt:
+            return "text"
+
+        key = PATH_INDEX_PATTERN.sub("", path.rsplit(".", 1)[-1]) if path else ""
+        return _infer_leaf_type(key, gt)
+
+    def _typed_score(self, gt, pred, path) -> Optional[float]:
+        comparator = COMPARATORS.get(self.infer_type(path, gt))
+        return comparator(gt, pred) if comparator is not None else None
+
     # ------------------------------------------------------
-    def evaluate(self, ground_truth: Dict[str, Any], llm_output: Dict[str, Any]):
+    def _item_signature(self, item, fields: List[str]) -> str:
+        if not isinstance(item, dict):
+            return self.normalize_text(item)
+        parts = []
+        for field in fields:
+            value = item.get(field)
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, sort_keys=True)
+            parts.append(self.normalize_text(value))
+        return " | ".join(parts)
+
+    def _block_key(self, item, key_fields: List[Tuple[str, str]]):
+        """Cheap exact key (amounts, dates) used to block the similarity matrix."""
+        if not isinstance(item, dict) or not key_fields:
+            return None
+        key = []
+        for field, kind in key_fields:
+            value = item.get(field)
+            if kind == "number":
+                parsed = _as_number(value)
+                parsed = round(parsed, 2) if parsed is not None else None
+            else:
+                parsed = parse_date(value) if isinstance(value, str) else None
+            if parsed is None:
+                return None
+            key.append(parsed)
+        return tuple(key)
+
+    def align_lists(self, gt_items: List[Any], pred_items: List[Any], prefix: str = "",
+                    workers: int = -1) -> List[Optional[int]]:
+        """
+        Match GT list items to predicted items regardless of order.
+
+        1. identical items (after normalization) are paired in O(n) via a hash map;
+        2. the rest is blocked by amount/date fields, and each block is scored
+           with a vectorized similarity matrix and solved as an assignment;
+        3. rows left over from their block are matched together in a final pass.
+
+        Returns, for each GT index, the matched prediction index (or None).
+        """
+        n_gt, n_pred = len(gt_items), len(pred_items)
+        matches: List[Optional[int]] = [None] * n_gt
+        if not n_gt or not n_pred:
+            return matches
+
+        fields = list(dict.fromkeys(k for item in gt_items if isinstance(item, dict) for k in item))
+        gt_sig = [self._item_signature(item, fields) for item in gt_items]
+        pred_sig = [self._item_signature(item, fields) for item in pred_items]
+
+        # ---- 1. identical items ----
+        by_sig: Dict[str, List[int]] = {}
+        for j in range(n_pred - 1, -1, -1):
+            by_sig.setdefault(pred_sig[j], []).append(j)
+        gt_left = []
+        for i, sig in enumerate(gt_sig):
+            bucket = by_sig.get(sig)
+            if bucket:
+                matches[i] = bucket.pop()
+            else:
+                gt_left.append(i)
+
+        matched = set(matches)
+        pred_left = [j for j in range(n_pred) if j not in matched]
+        if not gt_left or not pred_left:
+            return matches
+
+        # ---- 2. blocked assignment ----
+        sample = next((item for item in gt_items if isinstance(item, dict)), {})
+        key_fields = []
+        for field in fields:
+            kind = self.infer_type(f"{prefix}[0].{field}", sample.get(field))
+            if kind in ("number", "date"):
+                key_fields.append((field, kind))
+
+        gt_blocks: Dict[Any, List[int]] = {}
+        pred_blocks: Dict[Any, List[int]] = {}
+        for i in gt_left:
+            gt_blocks.setdefault(self._block_key(gt_items[i], key_fields), []).append(i)
+        for j in pred_left:
+            pred_blocks.setdefault(self._block_key(pred_items[j], key_fields), []).append(j)
+
+        leftover_gt = gt_blocks.pop(None, [])
+        for key, rows in gt_blocks.items():
+            leftover_gt.extend(self._assign(rows, pred_blocks.get(key, []), gt_sig, pred_sig, matches, workers))
+
+        # ---- 3. leftovers, across blocks ----
+        if leftover_gt:
+            matched = set(matches)
+            leftover_pred = [j for j in pred_left if j not in matched]
+            self._assign(sorted(leftover_gt), leftover_pred, gt_sig, pred_sig, matches, workers)
+        return matches
+
+    def _assign(self, rows, cols, gt_sig, pred_sig, matches, workers) -> List[int]:
+        """Solve one block in place; returns the GT rows left unmatched."""
+        if not rows or not cols:
+            return list(rows)
+        sim = similarity_matrix([gt_sig[i] for i in rows], [pred_sig[j] for j in cols], workers)
+        # Tiny position penalty: among equally similar rows keep the original order
+        distance = np.abs(np.asarray(rows, dtype=np.float32)[:, None] - np.asarray(cols, dtype=np.float32)[None, :])
+        sim -= 1e-6 * distance / max(len(gt_sig), len(pred_sig))
+
+        assigned = set()
+        for a, b in zip(*(idx.tolist() for idx in solve_assignment(sim))):
+            if sim[a, b] >= self.min_item_similarity:
+                matches[rows[a]] = cols[b]
+                assigned.add(a)
+        return [row for a, row in enumerate(rows) if a not in assigned]
+
+    def _aligned_items(self, gt_items, pred, prefix: str) -> List[Any]:
+        """Predicted item for each GT item: content-aligned for lists of objects, else by index."""
+        if not isinstance(pred, (list, tuple)):
+            return [None] * len(gt_items)
+        if self.align_items and len(gt_items) > 1 and any(isinstance(item, dict) for item in gt_items):
+            return [pred[j] if j is not None else None for j in self.align_lists(gt_items, pred, prefix)]
+        return [pred[idx] if idx < len(pred) else None for idx in range(len(gt_items))]
+
+    # ------------------------------------------------------
+    def evaluate(self, ground_truth: Dict[str, Any], llm_output: Dict[str, Any], columnar: Optional[bool] = None):
         results = {}
 
+        if self.columnar if columnar is None else columnar:
+            return self._evaluate_columnar(ground_truth, llm_output)
 
-        
         try:
             self._compare_recursive(
                 gt=ground_truth,
@@ -37,6 +539,197 @@ class Evaluator:
         except Exception as e:
             return {"evaluate error": str(e)}
 
+    def _evaluate_columnar(self, ground_truth, llm_output):
+        doc_ids, paths, gts, preds = [], [], [], []
+        try:
+            self._leaf_collector(doc_ids, paths, gts, preds)(ground_truth, llm_output, "", 0)
+            scores = [round(self._compute_score(g, p, path), 4) for path, g, p in zip(paths, gts, preds)]
+            return EvaluationResult.from_columns(paths, gts, preds, scores)
+        except Exception as e:
+            return {"evaluate error": str(e)}
+
+    # ------------------------------------------------------
+    def evaluate_batch(self, pairs: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]], workers: int = -1,
+                       columnar: Optional[bool] = None) -> List[dict]:
+        """
+        Evaluate many (ground_truth, llm_output) pairs at once.
+
+        All leaves are flattened into columns, normalized in bulk and scored
+        with a C edit-distance kernel (rapidfuzz Indel similarity on tokens).
+        Returns one result dict per pair, in the same format as `evaluate`.
+        Scores equal `_compute_score` when token order is preserved; with
+        reordered tokens the LCS-based kernel can score slightly higher than
+        SequenceMatcher's greedy block matching.
+
+        With `columnar` each document is an `EvaluationResult` sliced from
+        the shared columns.
+        """
+        doc_ids: List[int] = []
+        paths: List[str] = []
+        gts: List[Any] = []
+        preds: List[Any] = []
+        errors = {}
+
+        collect = self._leaf_collector(doc_ids, paths, gts, preds)
+        n_docs = 0
+        for doc_id, (gt, pred) in enumerate(pairs):
+            n_docs += 1
+            start = len(paths)
+            try:
+                collect(gt, pred, "", doc_id)
+            except Exception as e:
+                del doc_ids[start:], paths[start:], gts[start:], preds[start:]
+                errors[doc_id] = {"evaluate error": str(e)}
+
+        scores = self.score_columns(gts, preds, paths=paths, workers=workers)
+
+        if self.columnar if columnar is None else columnar:
+            bounds = np.searchsorted(np.asarray(doc_ids, dtype=np.intp), np.arange(n_docs + 1))
+            table = PathTable()
+            results = []
+            for doc_id in range(n_docs):
+                if doc_id in errors:
+                    results.append(errors[doc_id])
+                    continue
+                lo, hi = int(bounds[doc_id]), int(bounds[doc_id + 1])
+                results.append(EvaluationResult.from_columns(paths[lo:hi], gts[lo:hi], preds[lo:hi], scores[lo:hi],
+                                                             table))
+            return results
+
+        results = [{} for _ in range(n_docs)]
+        for doc_id, path, gt, pred, score in zip(doc_ids, paths, gts, preds, scores.tolist()):
+            results[doc_id][path] = {
+                "llm_text": pred,
+                "gt_text": gt,
+                "score": score
+            }
+        for doc_id, error in errors.items():
+            results[doc_id] = error
+        return results
+
+    def _leaf_collector(self, doc_ids, paths, gts, preds):
+        """Same traversal as `_compare_recursive`, appending leaves to the given columns."""
+        add_doc, add_path, add_gt, add_pred = doc_ids.append, paths.append, gts.append, preds.append
+
+        def collect(gt, pred, prefix, doc_id):
+            if isinstance(gt, dict):
+                pred_dict = pred if isinstance(pred, dict) else None
+                for key, value in gt.items():
+                    collect(
+                        value,
+                        pred_dict.get(key) if pred_dict is not None else None,
+                        f"{prefix}.{key}" if prefix else key,
+                        doc_id,
+                    )
+            elif isinstance(gt, (list, tuple)):
+                for idx, (item, pred_item) in enumerate(zip(gt, self._aligned_items(gt, pred, prefix))):
+                    collect(item, pred_item, f"{prefix}[{idx}]", doc_id)
+            elif isinstance(gt, set):
+                pred_list = sorted(pred) if isinstance(pred, set) else (list(pred) if pred else [])
+                collect(sorted(gt), pred_list, prefix, doc_id)
+            else:
+                add_doc(doc_id)
+                add_path(prefix)
+                add_gt(gt)
+                add_pred(pred)
+
+        return collect
+
+    # ------------------------------------------------------
+    @staticmethod
+    def normalize_many(texts: List[Any]) -> List[str]:
+        """Vectorized `normalize_text`: one regex pass per pattern over all values."""
+        if not texts:
+            return []
+        texts = [(t if isinstance(t, str) else str(t)) if t else "" for t in texts]
+        blob = BATCH_SEPARATOR.join(texts)
+        if blob.count(BATCH_SEPARATOR) != len(texts) - 1:
+            # A value contains NUL itself: neutralize it before splitting back
+            blob = BATCH_SEPARATOR.join(t.replace(BATCH_SEPARATOR, " ") for t in texts)
+        blob = blob.lower()
+        blob = SEPARATOR_PATTERN.sub(" ", blob)
+        blob = BATCH_NON_ALNUM_PATTERN.sub("", blob)
+        blob = BATCH_SPACES_PATTERN.sub(" ", blob)
+        return [part.strip() for part in blob.split(BATCH_SEPARATOR)]
+
+    def score_columns(self, gts: List[Any], preds: List[Any], paths: Optional[List[str]] = None,
+                      workers: int = -1) -> np.ndarray:
+        """Score parallel GT / prediction columns; returns a float array rounded to 4 places."""
+        n = len(gts)
+        scores = np.zeros(n, dtype=np.float64)
+        if n == 0:
+            return scores
+
+        # Empty prediction → 0.0
+        live = np.flatnonzero(np.fromiter((bool(p) for p in preds), dtype=bool, count=n))
+        if live.size == 0:
+            return scores
+
+        # Typed leaves (numbers, dates, IDs) are resolved directly
+        if paths is not None:
+            untyped = []
+            for i in live.tolist():
+                typed = self._typed_score(gts[i], preds[i], paths[i])
+                if typed is None:
+                    untyped.append(i)
+                else:
+                    scores[i] = typed
+            live = np.asarray(untyped, dtype=np.intp)
+            if live.size == 0:
+                return np.round(scores, 4)
+
+        gt_norm = self.normalize_many([gts[i] for i in live])
+        pred_norm = self.normalize_many([preds[i] for i in live])
+
+        # Exact after normalization → 1.0; empty GT with non-empty prediction → 0.0
+        equal = np.fromiter((g == p for g, p in zip(gt_norm, pred_norm)), dtype=bool, count=live.size)
+        gt_empty = np.fromiter((not g for g in gt_norm), dtype=bool, count=live.size)
+        scores[live[equal]] = 1.0
+
+        fuzzy = np.flatnonzero(~equal & ~gt_empty)
+        if fuzzy.size:
+            gt_tokens = [gt_norm[i].split() for i in fuzzy]
+            pred_tokens = [pred_norm[i].split() for i in fuzzy]
+            scores[live[fuzzy]] = self._token_similarity(gt_tokens, pred_tokens, workers)
+
+        return np.round(scores, 4)
+
+    @staticmethod
+    def _token_similarity(gt_tokens, pred_tokens, workers=-1) -> np.ndarray:
+        if rf_process is not None and hasattr(rf_process, "cpdist"):
+            return rf_process.cpdist(gt_tokens, pred_tokens, scorer=Indel.normalized_similarity, workers=workers)
+        if Indel is not None:
+            return np.fromiter(
+                (Indel.normalized_similarity(g, p) for g, p in zip(gt_tokens, pred_tokens)),
+                dtype=np.float64, count=len(gt_tokens)
+            )
+        return np.fromiter(
+            (SequenceMatcher(None, g, p).ratio() for g, p in zip(gt_tokens, pred_tokens)),
+            dtype=np.float64, count=len(gt_tokens)
+        )
+
+    # ------------------------------------------------------
+    def flatten_prediction(self, llm_output: Dict[str, Any], prefix: str = "", results: dict = None):
+        """
+        Inference mode: flatten a prediction to the same dotted-path format
+        as `evaluate`, without ground truth (gt_text / score are None).
+        """
+        results = {} if results is None else results
+
+        if isinstance(llm_output, dict):
+            for key, value in llm_output.items():
+                self.flatten_prediction(value, f"{prefix}.{key}" if prefix else key, results)
+        elif isinstance(llm_output, (list, tuple)):
+            for idx, item in enumerate(llm_output):
+                self.flatten_prediction(item, f"{prefix}[{idx}]", results)
+        else:
+            results[prefix] = {
+                "llm_text": llm_output,
+                "gt_text": None,
+                "score": None
+            }
+        return results
+
     # ------------------------------------------------------
     def _compare_recursive(self, gt, pred, prefix: str, results: dict):
         """
@@ -52,10 +745,10 @@ class Evaluator:
 
         # ---- LIST OR TUPLE ----
         elif isinstance(gt, (list, tuple)):
+            pred_items = self._aligned_items(gt, pred, prefix)
             for idx, item in enumerate(gt):
                 new_prefix = f"{prefix}[{idx}]"
-                pred_item = pred[idx] if isinstance(pred, (list, tuple)) and idx < len(pred) else None
-                self._compare_recursive(item, pred_item, new_prefix, results)
+                self._compare_recursive(item, pred_items[idx], new_prefix, results)
 
         # ---- SET ----
         elif isinstance(gt, set):
@@ -66,7 +759,7 @@ class Evaluator:
 
         # ---- LEAF NODE ----
         else:
-            score = self._compute_score(gt, pred)
+            score = self._compute_score(gt, pred, prefix)
             results[prefix] = {
                 "llm_text": pred,
                 "gt_text": gt,
@@ -80,24 +773,29 @@ class Evaluator:
         """Lowercase, remove punctuation, standardize spaces."""
         if not text:
             return ""
-        text = text.lower()
+        text = str(text).lower()
         # Replace common separators with space
-        text = re.sub(r"[\/,;|]", " ", text)
+        text = SEPARATOR_PATTERN.sub(" ", text)
         # Remove any remaining non-alphanumeric chars except spaces
-        text = re.sub(r"[^a-z0-9\s]", "", text)
+        text = NON_ALNUM_PATTERN.sub("", text)
         # Collapse multiple spaces
-        text = re.sub(r"\s+", " ", text).strip()
+        text = SPACES_PATTERN.sub(" ", text).strip()
         return text
 
-    def _compute_score(self, gt: str, pred: str) -> float:
+    def _compute_score(self, gt: str, pred: str, path: Optional[str] = None) -> float:
         """
         Robust similarity score between ground truth and predicted strings.
-        Uses tokenization and SequenceMatcher to handle missing/extra words and separators.
+        Numbers, dates and IDs take an O(1) typed comparison; free text uses
+        tokenization and SequenceMatcher to handle missing/extra words and separators.
         Returns score between 0.0 and 1.0.
         """
         if not pred:
             return 0.0
 
+        typed = self._typed_score(gt, pred, path)
+        if typed is not None:
+            return typed
+
         gt_norm = self.normalize_text(gt)
         pred_norm = self.normalize_text(pred)
 
@@ -0,0 +1,230 @@
+import re
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------------------------
+# Value patterns
+# -------------------------------------------------
+AMOUNT_PATTERN = re.compile(
+    r"(?:rs\.?|inr|₹|\$)?\s*((?:\d{1,3}(?:,\d{2,3})+|\d+)\.\d{1,2}|\d{1,3}(?:,\d{2,3})+)",
+    re.IGNORECASE,
+)
+DATE_PATTERN = re.compile(
+    r"\b(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4}(?:\s+\d{1,2}:\d{2}(?::\d{2})?)?|\d{4}-\d{2}-\d{2})\b"
+)
+PHONE_PATTERN = re.compile(r"(\(?\+?\d[\d\s\-()]{7,}\d)")
+ID_PATTERN = re.compile(r"\b((?=[A-Z0-9\-/]*\d)[A-Z0-9][A-Z0-9\-/]{3,})\b", re.IGNORECASE)
+
+TOKEN_SPLIT = re.compile(r"[^a-z0-9]+")
+
+# Label words that carry no meaning on their own
+LABEL_STOPWORDS = {"and", "of", "the", "details", "info", "rs", "kg"}
+
+# Common abbreviations printed on bills for a schema key token
+LABEL_ALIASES = {
+    "number": ("no", "num"),
+    "account": ("a/c", "ac", "acct"),
+    "amount": ("amt",),
+    "date": ("dt",),
+    "consumer": ("cons",),
+}
+
+
+# -------------------------------------------------
+# Document type keywords (shared with the classifier)
+# -------------------------------------------------
+DOCUMENT_TYPE_KEYWORDS = {
+    "GAS BILL": ("lpg", "gas agency", "cylinder", "cash memo", "dgcc", "refill"),
+    "ELECTRICITY BILL": ("electricity", "kwh", "units consumed", "meter reading", "power"),
+    "WATER BILL": ("water", "sewerage", "kilolitre", "water supply"),
+    "BANK STATEMENT": ("statement of account", "opening balance", "closing balance", "ifsc", "withdrawal"),
+    "SALARY SLIP": ("salary slip", "basic pay", "net pay", "earnings", "deductions"),
+    "PAYSLIP": ("payslip", "pay slip", "net salary", "gross earnings"),
+    "ITR FORM 16": ("form 16", "form no. 16", "tds", "assessment year", "deductor"),
+    "INVOICE": ("invoice", "gstin", "hsn", "tax invoice", "bill to"),
+    "RECEIPT": ("receipt", "received with thanks", "amount received", "paid"),
+    "CHECK": ("cheque", "pay to", "or bearer", "a/c payee"),
+}
+
+
+class ExtractionRule:
+    """
+    Maps schema keys (by regex on the leaf key) to a value pattern.
+    """
+
+    def __init__(self, name: str, key_pattern: str, value_pattern: re.Pattern):
+        self.name = name
+        self.key_pattern = re.compile(key_pattern, re.IGNORECASE)
+        self.value_pattern = value_pattern
+
+    def applies_to(self, key: str) -> bool:
+        return bool(self.key_pattern.search(key))
+
+    def find_value(self, text: str) -> Optional[str]:
+        match = self.value_pattern.search(text)
+        return match.group(1).strip() if match else None
+
+
+DEFAULT_RULES = [
+    ExtractionRule("date", r"date|dated|_dt$|period", DATE_PATTERN),
+    ExtractionRule("amount", r"amount|total|price|balance|due|tax|charge|fare|_rs$|rs_|payable", AMOUNT_PATTERN),
+    ExtractionRule("phone", r"phone|mobile|emergency|complaint|office|contact|tel", PHONE_PATTERN),
+    ExtractionRule("id", r"number|_no$|^no_|_id$|account|gstin|vat|pan|ifsc|invoice|memo|consumer", ID_PATTERN),
+]
+
+
+class RuleExtractor:
+    """
+    OCR-only fast path for fixed-layout documents.
+
+    Fills schema leaves straight from OCR lines using label matching plus
+    per-field regex rules. Only fields filled with confidence >= min_confidence
+    are returned; everything else is handed back as a reduced schema for the LLM.
+    """
+
+    def __init__(self, rules: Optional[List[ExtractionRule]] = None, min_confidence: float = 0.75):
+        self.rules = rules or DEFAULT_RULES
+        self.min_confidence = min_confidence
+
+    # -------------------------------------------------
+    # Public API
+    # -------------------------------------------------
+    def extract(self, ocr_text: str, schema: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Fill schema fields from OCR text.
+
+        Args:
+            ocr_text: OCR output, one recognized line per row
+            schema: schema dict as produced by Pipeline.extract_schema_from_gt
+
+        Returns:
+            (filled, remaining): partial prediction and the schema of unfilled fields
+        """
+        if not ocr_text or not isinstance(schema, dict):
+            return {}, schema
+
+        lines = [line.strip() for line in ocr_text.splitlines() if line.strip()]
+        lowered = [line.lower() for line in lines]
+        return self._extract_dict(schema, lines, lowered)
+
+    # -------------------------------------------------
+    # Recursive walk over the schema
+    # -------------------------------------------------
+    def _extract_dict(self, schema, lines, lowered):
+        filled, remaining = {}, {}
+
+        for key, sub in schema.items():
+            if isinstance(sub, dict):
+                sub_filled, sub_remaining = self._extract_dict(sub, lines, lowered)
+                if sub_filled:
+                    filled[key] = sub_filled
+                if sub_remaining:
+                    remaining[key] = sub_remaining
+            elif isinstance(sub, list):
+                # Repeating groups (line items) are left to the LLM
+                remaining[key] = sub
+            else:
+                value = self._extract_leaf(key, lines, lowered)
+                if value is None:
+                    remaining[key] = sub
+                else:
+                    filled[key] = value
+
+        return filled, remaining
+
+    def _extract_leaf(self, key: str, lines, lowered) -> Optional[str]:
+        if key == "document_type":
+            return self.classify_document_type("\n".join(lowered))
+
+        rule = next((r for r in self.rules if r.applies_to(key)), None)
+        if rule is None:
+            return None
+
+        label_tokens = self._label_tokens(key)
+        if not label_tokens:
+            return None
+
+        candidates = {}
+        for idx, line in enumerate(lowered):
+            confidence, end = self._label_confidence(label_tokens, line)
+            if confidence < self.min_confidence:
+                continue
+
+            # Value usually follows the label on the same line, else on the next one
+            value = rule.find_value(lines[idx][end:])
+            if value is None and idx + 1 < len(lines):
+                value = rule.find_value(lines[idx + 1])
+            if value is not None:
+                candidates[value] = max(confidence, candidates.get(value, 0.0))
+
+        if not candidates:
+            return None
+
+        # Conflicting readings are not confident: let the LLM decide
+        best = max(candidates.values())
+        top = [v for v, c in candidates.items() if c == best]
+        if len(top) > 1:
+            logger.debug(f"Ambiguous OCR values for '{key}': {top}")
+            return None
+        return top[0]
+
+    # -------------------------------------------------
+    # Label matching
+    # -------------------------------------------------
+    @staticmethod
+    def _label_tokens(key: str) -> List[str]:
+        return [t for t in TOKEN_SPLIT.split(key.lower()) if t and t not in LABEL_STOPWORDS]
+
+    @staticmethod
+    def _label_confidence(tokens: List[str], line: str) -> Tuple[float, int]:
+        """Return (fraction of label tokens found in line, end offset of the label)."""
+        hits, end = 0, 0
+        for token in tokens:
+            for variant in (token,) + LABEL_ALIASES.get(token, ()):
+                match = _word_pattern(variant).search(line)
+                if match:
+                    hits += 1
+                    end = max(end, match.end())
+                    break
+        return hits / len(tokens), end
+
+    # -------------------------------------------------
+    # Keyword document type
+    # -------------------------------------------------
+    @staticmethod
+    def keyword_scores(text: str) -> Dict[str, int]:
+        """Keyword hits per document type; whole words only ("paid" does not match "unpaid")."""
+        text = text.lower()
+        return {
+            doc_type: sum(1 for kw in keywords if _word_pattern(kw).search(text))
+            for doc_type, keywords in DOCUMENT_TYPE_KEYWORDS.items()
+        }
+
+    def classify_document_type(self, text: str) -> Optional[str]:
+        """Confident only when one type has >= 2 keyword hits and no tie."""
+        scores = self.keyword_scores(text)
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        (best_type, best), (_, second) = ranked[0], ranked[1]
+        if best >= 2 and best > second:
+            return best_type
+        return None
+
+
+@lru_cache(maxsize=512)
+def _word_pattern(word: str) -> re.Pattern:
+    return re.compile(r"(?<![a-z0-9])" + re.escape(word) + r"(?![a-z0-9])")
+
+
+def merge_predictions(base: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+    """Deep-merge extra into base (extra wins on leaf conflicts)."""
+    merged = dict(base) if isinstance(base, dict) else {}
+    for key, value in extra.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_predictions(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
@@ -1,5 +1,6 @@
 import streamlit as st
 import html
+from collections.abc import Mapping
 from streamlit.components.v1 import html as st_html
 
 def score_to_gradient(score: float) -> str:
@@ -54,7 +55,7 @@ def render_small_box(pred_text: str, score: float):
 def render_results(result_dict: dict):
     """Render results grouped by dotted keys with safe error handling."""
 
-    if not isinstance(result_dict, dict):
+    if not isinstance(result_dict, Mapping):
         st.error("Invalid result format: Expected a dictionary.")
         return
 
@@ -138,7 +139,7 @@ def render_results(result_dict: dict):
 def render_compact_boxes(result_dict: dict, container_width: int = 800):
     """Render LLM results compactly using Streamlit columns for proper display."""
     
-    if not isinstance(result_dict, dict):
+    if not isinstance(result_dict, Mapping):
         st.error("Invalid result format: Expected a dictionary.")
         return
 
@@ -228,7 +229,7 @@ def render_compact_boxes(result_dict: dict, container_width: int = 800):
 def render_boxes_component(result_dict: dict, container_width: int = 900, max_box_width: int = 300):
     """Render LLM results as colored boxes safely using st.components.v1.html"""
     
-    if not isinstance(result_dict, dict):
+    if not isinstance(result_dict, Mapping):
         st.error("Invalid result format: Expected a dictionary.")
         return
     
@@ -238,9 +239,12 @@ def render_boxes_component(result_dict: dict, container_width: int = 900, max_bo
             if not isinstance(info, dict):
                 continue
             text = info.get("gt_text")
-            score = float(info.get("score", 1))
-            bg = score_to_gradient(score)
-            safe_text = html.escape(text)
+            score = info.get("score", 1)
+            if text is None:
+                # Inference mode: no ground truth, show the prediction unscored
+                text = info.get("llm_text")
+            bg = score_to_gradient(float(score)) if score is not None else "rgb(229, 231, 235)"
+            safe_text = html.escape(str(text) if text is not None else "")
 
             box_html_list.append(f"""
                 <div style="
@@ -0,0 +1,211 @@
+import io
+import math
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+
+
+# -------------------------------------------------
+# Text-region bounds
+# -------------------------------------------------
+def text_bounds(boxes: Iterable[Optional[Box]], width: int, height: int, padding: int = 24) -> Optional[Box]:
+    """Union of OCR text boxes, padded and clamped to the image."""
+    boxes = [b for b in boxes if b]
+    if not boxes:
+        return None
+
+    x1 = min(b[0] for b in boxes) - padding
+    y1 = min(b[1] for b in boxes) - padding
+    x2 = max(b[2] for b in boxes) + padding
+    y2 = max(b[3] for b in boxes) + padding
+    return max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+
+
+def _encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def crop_to_text(image_bytes: bytes, boxes: Iterable[Optional[Box]], padding: int = 24,
+                 min_saving: float = 0.05, quality: int = 90) -> Tuple[bytes, Tuple[int, int]]:
+    """
+    Crop an image to the union of its text regions.
+
+    The original bytes are returned untouched when no boxes are known or the
+    crop would save less than `min_saving` of the area (re-encoding would
+    cost quality for nothing).
+
+    Returns:
+        (image bytes, (width, height))
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    width, height = img.size
+
+    bounds = text_bounds(boxes, width, height, padding)
+    if bounds is None:
+        return image_bytes, (width, height)
+
+    x1, y1, x2, y2 = bounds
+    area_ratio = ((x2 - x1) * (y2 - y1)) / float(width * height)
+    if area_ratio > 1.0 - min_saving:
+        return image_bytes, (width, height)
+
+    cropped = img.crop(bounds)
+    logger.debug(f"Cropped {width}x{height} → {cropped.size[0]}x{cropped.size[1]} ({area_ratio:.0%} of area)")
+    return _encode_jpeg(cropped, quality), cropped.size
+
+
+# -------------------------------------------------
+# Tiling for very tall pages
+# -------------------------------------------------
+def tile_image(image_bytes: bytes, max_aspect: float = 2.5, tile_aspect: float = 1.4,
+               overlap: int = 64, quality: int = 90) -> List[bytes]:
+    """
+    Split a tall image (height / width > max_aspect) into vertical tiles.
+
+    Tiles are `width * tile_aspect` high and overlap by `overlap` px so rows
+    on a boundary are fully visible in at least one tile.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    width, height = img.size
+    if height / float(width) <= max_aspect:
+        return [image_bytes]
+
+    tile_h = int(width * tile_aspect)
+    step = max(1, tile_h - overlap)
+
+    tiles = []
+    top = 0
+    while top < height:
+        bottom = min(height, top + tile_h)
+        tiles.append(_encode_jpeg(img.crop((0, top, width, bottom)), quality))
+        if bottom == height:
+            break
+        top += step
+    return tiles
+
+
+# -------------------------------------------------
+# Image token estimates (per provider pricing rules)
+# -------------------------------------------------
+def estimate_image_tokens(width: int, height: int, provider: str = "gemini") -> int:
+    """Approximate input tokens an image costs for the given provider."""
+    if provider == "openai":
+        # High detail: fit in 2048x2048, shortest side to 768, 170 tokens per 512px tile + 85 base
+        scale = min(1.0, 2048.0 / max(width, height))
+        w, h = width * scale, height * scale
+        scale = min(1.0, 768.0 / min(w, h))
+        w, h = w * scale, h * scale
+        return 85 + 170 * math.ceil(w / 512) * math.ceil(h / 512)
+
+    # Gemini: small images are a flat 258 tokens, larger ones are tiled at 768x768
+    if width <= 384 and height <= 384:
+        return 258
+    return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+
+
+# -------------------------------------------------
+# Display renditions (viewer)
+# -------------------------------------------------
+VIEWER_WIDTH = 900
+THUMB_WIDTH = 160
+
+
+def render(path, width: int, quality: int = 85) -> bytes:
+    """JPEG of the image at `path`, downscaled to at most `width` px wide (aspect kept)."""
+    with Image.open(path) as img:
+        if img.width > width:
+            size = (width, max(1, round(img.height * width / img.width)))
+            # JPEG: decode straight at 1/2, 1/4 or 1/8 scale instead of full resolution
+            img.draft("RGB", size)
+            img = img.resize(size, Image.Resampling.BICUBIC)
+        return _encode_jpeg(img, quality)
+
+
+class RenditionCache:
+    """
+    Process-wide LRU of display renditions keyed by (content digest, width),
+    bounded by `max_bytes` of encoded JPEG. Renditions are made on first
+    request; `prefetch` renders pages the user is likely to open next on
+    background threads. Works on upload handles (`["digest"]`, `.path`).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20, workers: int = 2):
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._items: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+        self._size = 0
+        self._pending: Dict[Tuple[str, int], Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="renditions")
+
+    def get(self, handle, width: int = VIEWER_WIDTH) -> bytes:
+        key = (handle["digest"], width)
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return data
+            future = self._pending.get(key)
+            if future is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if future is not None:
+            # Being prefetched: wait for it rather than render twice
+            return future.result()
+        return self._render(key, handle.path)
+
+    def prefetch(self, handles, width: int = VIEWER_WIDTH):
+        for handle in handles:
+            key = (handle["digest"], width)
+            with self._lock:
+                if key in self._items or key in self._pending:
+                    continue
+                self._pending[key] = self._executor.submit(self._render, key, handle.path)
+
+    def _render(self, key: Tuple[str, int], path) -> bytes:
+        try:
+            data = render(path, key[1])
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = data
+                self._size += len(data)
+                while self._size > self.max_bytes and len(self._items) > 1:
+                    _, evicted = self._items.popitem(last=False)
+                    self._size -= len(evicted)
+        return data
+
+    @property
+    def size(self) -> int:
+        """Bytes of renditions held."""
+        return self._size
+
+    def __len__(self):
+        return len(self._items)
+
+
+_renditions: Optional[RenditionCache] = None
+_renditions_lock = threading.Lock()
+
+
+def get_renditions() -> RenditionCache:
+    """Process-wide rendition cache (shared by Streamlit sessions)."""
+    global _renditions
+    with _renditions_lock:
+        if _renditions is None:
+            _renditions = RenditionCache()
+        return _renditions
@@ -1,5 +1,6 @@
 import json
 import os
+import time
 import base64
 import asyncio
 import logging
@@ -12,6 +13,8 @@ import sys
 
 import streamlit as st
 
+from src.services.prometheus_service import CACHE_HITS, IN_FLIGHT, RETRIES
+
 logger = logging.getLogger(__name__)
 
 
@@ -46,6 +49,19 @@ class LLMImageParser:
         "groq-0"
     ]
 
+    # USD per 1M (input, output) tokens, for cost estimates on the dashboard
+    PRICING = {
+        "gpt-3.5-turbo": (0.50, 1.50),
+        "gpt-4o-mini": (0.15, 0.60),
+        "gpt-4o": (2.50, 10.00),
+        "gemini-2.0-flash": (0.10, 0.40),
+    }
+
+    # Transient provider errors (rate limit, timeout, 5xx) are retried with exponential backoff
+    MAX_RETRIES = 3
+    RETRY_DELAY = 1.0
+    TRANSIENT_STATUS = (408, 429, 500, 502, 503, 504)
+
     def __init__(self, model: str):
         self.model = model
 
@@ -61,10 +77,20 @@ class LLMImageParser:
 
         # init correct client
         if self.provider == "openai":
-            self.client = OpenAI(api_key=api_key)
+            # Retries are ours (_with_retries), so each one is counted
+            self.client = OpenAI(api_key=api_key, max_retries=0)
         elif self.provider == "gemini":
             self.client = genai.Client(api_key=api_key)
 
+    # --------------------------------------------------------
+    @classmethod
+    def estimate_cost(cls, model: str, input_tokens: int, output_tokens: int):
+        """USD for the given token counts, None for models without a price."""
+        prices = cls.PRICING.get(model)
+        if prices is None:
+            return None
+        return (input_tokens * prices[0] + output_tokens * prices[1]) / 1_000_000
+
     # --------------------------------------------------------
     def _detect_provider(self, model: str) -> str:
         prefix = model.split("-")[0].lower()
@@ -85,6 +111,31 @@ class LLMImageParser:
             logger.warning(f"Failed to parse JSON: {e}")
             return {}
 
+    # --------------------------------------------------------
+    def _is_transient(self, error: Exception) -> bool:
+        """Rate limits, timeouts, server errors and dropped connections (both SDKs)."""
+        if isinstance(error, (TimeoutError, ConnectionError)):
+            return True
+        status = getattr(error, "status_code", None) or getattr(error, "code", None)
+        if status in self.TRANSIENT_STATUS:
+            return True
+        # openai.APIConnectionError / APITimeoutError carry no status
+        return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+    def _with_retries(self, request):
+        """Run `request()`, retrying transient errors up to MAX_RETRIES times."""
+        delay = self.RETRY_DELAY
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                return request()
+            except Exception as e:
+                if attempt == self.MAX_RETRIES or not self._is_transient(e):
+                    raise
+                RETRIES.labels(self.model).inc()
+                logger.warning(f"{self.model} request failed ({e}), retry {attempt + 1} in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
     # --------------------------------------------------------
     def _read_image_bytes(self, image_file):
         """Read bytes and detect MIME type from path or Streamlit UploadedFile."""
@@ -106,61 +157,94 @@ class LLMImageParser:
     # --------------------------------------------------------
     # Public method
     # --------------------------------------------------------
-    def parse_image(self, image_path: str, schema_description: str):
-        if self.provider == "openai":
-            return self._parse_openai(image_path, schema_description)
-        return self._parse_gemini(image_path, schema_description)
+    def parse_image(self, image_path, schema_description: str):
+        """
+        `image_path` is a single path or a tuple of paths (tiles of one page, in order).
+        Returns (prediction, usage): this call's token usage, {} when served from cache.
+        """
+        in_flight = IN_FLIGHT.labels("llm")
+        in_flight.inc()
+        try:
+            if self.provider == "openai":
+                return self._parse_openai(image_path, schema_description)
+            # _parse_gemini is st.cache_resource'd: a cached call never runs, so this call's
+            # own dict stays empty (unhashed `_call` argument, safe across concurrent calls)
+            call = {}
+            prediction = self._parse_gemini(image_path, schema_description, call)
+            if "usage" not in call:
+                CACHE_HITS.labels(self.model).inc()
+            return prediction, call.get("usage") or {}
+        finally:
+            in_flight.dec()
 
     # --------------------------------------------------------
     async def parse_image_async(self, image_path: str, schema_description: str):
-        """Async wrapper for non-blocking Streamlit calls."""
+        """Async wrapper for non-blocking Streamlit calls; returns (prediction, usage)."""
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, self.parse_image, image_path, schema_description)
 
     # --------------------------------------------------------
-    def _parse_openai(self, image_path, prompt: str):
-        with open(image_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode()
+    @staticmethod
+    def _as_paths(image_path):
+        return list(image_path) if isinstance(image_path, (list, tuple)) else [image_path]
 
-        response = self.client.chat.completions.create(
+    # --------------------------------------------------------
+    def _parse_openai(self, image_path, prompt: str):
+        content = [
+            {
+                "type": "text",
+                "text": prompt,
+            },
+        ]
+        for path in self._as_paths(image_path):
+            data, mime_type = self._read_image_bytes(path)
+            b64 = base64.b64encode(data).decode()
+            content.append({
+                "type": "image_url",
+                "image_url": f"data:{mime_type};base64,{b64}",
+            })
+
+        response = self._with_retries(lambda: self.client.chat.completions.create(
             model=self.model,
             messages=[
                 {
                     "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt,
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": f"data:image/jpeg;base64,{b64}",
-                        },
-                    ],
+                    "content": content,
                 }
             ],
-        )
-        return self._safe_json_load(response.choices[0].message["content"])
+        ))
+        usage = getattr(response, "usage", None)
+        usage = {} if usage is None else {"input_tokens": usage.prompt_tokens, "output_tokens": usage.completion_tokens}
+        return self._safe_json_load(response.choices[0].message["content"]), usage
 
     # --------------------------------------------------------
     @st.cache_resource
-    def _parse_gemini(_self, image_file, prompt: str):
-        """Parse an image using Google Gemini Vision and return structured JSON."""
+    def _parse_gemini(_self, image_file, prompt: str, _call: dict = None):
+        """
+        Parse an image using Google Gemini Vision and return structured JSON.
+        `_call` (not part of the cache key) receives this call's token usage.
+        """
+        _call = {} if _call is None else _call
         try:
-            # Read image bytes and MIME type
-            image_data, mime_type = _self._read_image_bytes(image_file)
+            # Read image bytes and MIME type (one part per tile)
+            parts = []
+            for path in _self._as_paths(image_file):
+                image_data, mime_type = _self._read_image_bytes(path)
+                parts.append(types.Part.from_bytes(data=image_data, mime_type=mime_type))
 
             # Prepare prompt
 
 
-            response = _self.client.models.generate_content(
+            response = _self._with_retries(lambda: _self.client.models.generate_content(
                 model=_self.model,
-                contents=[
-                    prompt,
-                    types.Part.from_bytes(data=image_data, mime_type=mime_type)
-                ],
+                contents=[prompt, *parts],
                 config=types.GenerateContentConfig(response_mime_type="application/json")
-            )
+            ))
+            usage = getattr(response, "usage_metadata", None)
+            _call["usage"] = {} if usage is None else {
+                "input_tokens": usage.prompt_token_count or 0,
+                "output_tokens": usage.candidates_token_count or 0,
+            }
 
             return _self._safe_json_load(response.text)
 
@@ -1,30 +1,231 @@
 import os
+import gzip
+import heapq
 import uuid
 import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
 from pathlib import Path
-from typing import Optional, List
+from typing import Any, Dict, Iterator, Optional, List, Tuple, Union
 import logging
 
+try:
+    import zstandard
+except ImportError:  # optional codec, gzip is always available
+    zstandard = None
+
 logger = logging.getLogger(__name__)
 
+BLOBS_SUBFOLDER = "blobs"
+INDEX_FILE = "index.db"
+
+# Blob suffix per codec (None = stored raw)
+CODECS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+DEFAULT_COMPRESSION = "zstd" if zstandard is not None else "gzip"
+
+# Entries per `list_page` call by default
+PAGE_SIZE = 1000
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def blob_digest(path: Path) -> str:
+    """Content hash of a blob path (name without codec suffix)."""
+    return Path(path).name.split(".")[0]
+
+
+def _compress(data: bytes, codec: Optional[str]) -> bytes:
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return data
+
+
+def _prefix_end(prefix: str) -> str:
+    """Smallest string greater than every string starting with `prefix`."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _decompress(data: bytes, path: Path) -> bytes:
+    if path.suffix == ".gz":
+        return gzip.decompress(data)
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
 
 class LocalStorage:
     """
     Industry-standard local storage service for storing uploaded files,
     intermediate results, OCR text, logs, etc.
+
+    With `content_addressed=True` artifacts are stored once per content:
+    blobs live under blobs/<sha[:2]>/<sha[2:4]>/<sha> (deduplicated on
+    write, JSON/text optionally gzip/zstd compressed) and a small SQLite
+    index maps logical names (subfolder + filename) to blobs. Reading and
+    listing work the same in both modes.
+
+    With `index_files=True` plain-mode writes are also recorded in the
+    index, so `list_page` / `iter_files` page through folders with
+    keyset queries instead of directory scans (`reindex` adopts files
+    written before the index was enabled).
     """
 
-    def __init__(self, base_dir: str = "storage"):
+    def __init__(self, base_dir: str = "storage", content_addressed: bool = False,
+                 compression: Optional[str] = None, index_files: bool = False):
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.content_addressed = content_addressed
+        self.index_files = index_files
+
+        if compression not in CODECS:
+            raise ValueError(f"Unknown compression: {compression} (options: gzip, zstd)")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard not installed, compressing with gzip instead")
+            compression = "gzip"
+        self.compression = compression
+
+        self._index: Optional[sqlite3.Connection] = None
+        self._index_lock = threading.Lock()
 
         logger.info(f"LocalStorage initialized at: {self.base_dir}")
 
+    # -------------------------------------------------
+    # Content-addressed blobs
+    # -------------------------------------------------
+    @property
+    def index(self) -> Optional[sqlite3.Connection]:
+        """Name → blob index; opened on first use (None in plain mode without an index)."""
+        if self._index is None:
+            path = self.base_dir / BLOBS_SUBFOLDER / INDEX_FILE
+            if not (self.content_addressed or self.index_files) and not path.exists():
+                return None
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS names (
+                    folder      TEXT NOT NULL,
+                    filename    TEXT NOT NULL,
+                    digest      TEXT NOT NULL,
+                    size        INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL,
+                    created_at  REAL NOT NULL,
+                    PRIMARY KEY (folder, filename)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_names_digest ON names(digest)")
+            # Plain files (index_files=True), keyed like names
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    folder      TEXT NOT NULL,
+                    filename    TEXT NOT NULL,
+                    size        INTEGER NOT NULL,
+                    mtime       REAL NOT NULL,
+                    PRIMARY KEY (folder, filename)
+                ) WITHOUT ROWID
+            """)
+            self._index = conn
+        return self._index
+
+    def blob_path(self, digest: str, codec: Optional[str] = None) -> Path:
+        return self.base_dir / BLOBS_SUBFOLDER / digest[:2] / digest[2:4] / f"{digest}{CODECS[codec]}"
+
+    def find_blob(self, digest: str) -> Optional[Path]:
+        """Stored blob for a content hash, whatever codec wrote it (at most 3 stats)."""
+        for codec in CODECS:
+            path = self.blob_path(digest, codec)
+            if path.exists():
+                return path
+        return None
+
+    def has_blob(self, digest: str) -> bool:
+        return self.find_blob(digest) is not None
+
+    def put_blob(self, data: bytes, compress: bool = False) -> Path:
+        """Store bytes once per content; returns the blob path (existing one on a dedup hit)."""
+        digest = sha256(data)
+        existing = self.find_blob(digest)
+        if existing is not None:
+            logger.debug(f"Blob dedup hit: {digest}")
+            return existing
+
+        codec = self.compression if compress else None
+        path = self.blob_path(digest, codec)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file and rename: readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_compress(data, codec))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return path
+
+    def get_blob(self, digest: str) -> bytes:
+        path = self.find_blob(digest)
+        if path is None:
+            raise FileNotFoundError(f"Blob not found: {digest}")
+        return self.read_bytes(path)
+
+    def _store(self, data: bytes, subfolder: str, filename: Optional[str], ext: str, compress: bool) -> Path:
+        """Content-addressed write of one logical artifact."""
+        path = self.put_blob(data, compress=compress)
+        digest = blob_digest(path)
+        filename = filename or f"{digest}{ext}"
+        with self._index_lock, self.index:
+            self.index.execute(
+                "INSERT OR REPLACE INTO names VALUES (?, ?, ?, ?, ?, ?)",
+                (subfolder, filename, digest, len(data), path.stat().st_size, time.time()),
+            )
+        logger.debug(f"Stored {subfolder}/{filename} → {digest}")
+        return path
+
+    def forget_blob(self, digest: str) -> int:
+        """Drop the index names of a blob that is gone (e.g. evicted); returns names removed."""
+        if self.index is None:
+            return 0
+        with self._index_lock, self.index:
+            return self.index.execute("DELETE FROM names WHERE digest = ?", (digest,)).rowcount
+
+    def _record_file(self, subfolder: str, path: Path):
+        """Plain-mode write → files index (index_files=True only)."""
+        if not self.index_files:
+            return
+        st = path.stat()
+        with self._index_lock, self.index:
+            self.index.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                               (subfolder, path.name, st.st_size, st.st_mtime))
+
+    def _indexed(self, sql: str, params=()) -> list:
+        if self.index is None:
+            return []
+        with self._index_lock:
+            return self.index.execute(sql, params).fetchall()
+
     # -------------------------------------------------
     # File Saving
     # -------------------------------------------------
     def save_file(self, file, subfolder: str = "uploads") -> Path:
         """Save an uploaded file to disk and return the saved path."""
+        if self.content_addressed:
+            # Images are already compressed: stored raw
+            return self._store(bytes(file.getbuffer()), subfolder, Path(file.name).name,
+                               Path(file.name).suffix or ".bin", compress=False)
+
         folder = self.base_dir / subfolder
         folder.mkdir(parents=True, exist_ok=True)
 
@@ -34,6 +235,7 @@ class LocalStorage:
 
         with open(file_path, "wb") as f:
             f.write(file.getbuffer())
+        self._record_file(subfolder, file_path)
 
         logger.debug(f"Saved file: {file_path}")
 
@@ -43,6 +245,9 @@ class LocalStorage:
     # Save arbitrary text
     # -------------------------------------------------
     def save_text(self, text: str, subfolder: str = "texts") -> Path:
+        if self.content_addressed:
+            return self._store(text.encode("utf-8"), subfolder, None, ".txt", compress=True)
+
         folder = self.base_dir / subfolder
         folder.mkdir(parents=True, exist_ok=True)
 
@@ -51,6 +256,7 @@ class LocalStorage:
 
         with open(path, "w", encoding="utf-8") as f:
             f.write(text)
+        self._record_file(subfolder, path)
 
         logger.debug(f"Saved text: {path}")
         return path
@@ -58,38 +264,228 @@ class LocalStorage:
     # -------------------------------------------------
     # Save JSON
     # -------------------------------------------------
-    def save_json(self, data: dict, subfolder: str = "json") -> Path:
+    def save_json(self, data: dict, subfolder: str = "json", filename: Optional[str] = None) -> Path:
+        if self.content_addressed:
+            # Compact, key-sorted: equal data → equal bytes → one blob
+            payload = json.dumps(data, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+            return self._store(payload.encode("utf-8"), subfolder, filename, ".json", compress=True)
+
         folder = self.base_dir / subfolder
         folder.mkdir(parents=True, exist_ok=True)
 
-        filename = f"{uuid.uuid4()}.json"
+        filename = filename or f"{uuid.uuid4()}.json"
         path = folder / filename
 
         with open(path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2)
+        self._record_file(subfolder, path)
 
         logger.debug(f"Saved JSON: {path}")
         return path
 
     # -------------------------------------------------
-    # Load JSON by path
+    # Load by path (plain files and blobs)
     # -------------------------------------------------
+    def read_bytes(self, file_path: Union[str, Path]) -> bytes:
+        file_path = Path(file_path)
+        with open(file_path, "rb") as f:
+            return _decompress(f.read(), file_path)
+
     def load_json(self, file_path: Path) -> dict:
         file_path = Path(file_path)
         if not file_path.exists():
             raise FileNotFoundError(f"JSON file not found: {file_path}")
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return json.loads(self.read_bytes(file_path))
 
     # -------------------------------------------------
     # List files
     # -------------------------------------------------
     def list_files(self, subfolder: str) -> List[Path]:
+        """Files of a logical folder, sorted by name (plain files and indexed blobs)."""
+        files = {}
+        folder = self.base_dir / subfolder
+        if not (self.index_files and self.index is not None) and folder.is_dir():
+            # d_type from the directory read: no stat per file
+            with os.scandir(folder) as it:
+                files = {item.name: folder / item.name for item in it if item.is_file()}
+        for table in ("files", "names"):
+            cursor = None
+            while True:
+                entries = self._index_page(table, subfolder, PAGE_SIZE, cursor, None, None, None, None, None)
+                files.update((entry["name"], entry["path"]) for entry in entries)
+                if len(entries) < PAGE_SIZE:
+                    break
+                cursor = entries[-1]["name"]
+        return [files[name] for name in sorted(files)]
+
+    def iter_files(self, subfolder: str, page_size: int = PAGE_SIZE, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a folder's entries (filters as in `list_page`) in constant memory:
+        one directory scan for plain files (directory order), then the
+        index page by page (name order).
+        """
+        filters = tuple(filters.get(k) for k in ("prefix", "since", "until", "min_size", "max_size"))
+        if not (self.index_files and self.index is not None):
+            for name, st in self._scan(subfolder, None, *filters):
+                yield {"name": name, "path": self.base_dir / subfolder / name, "size": st.st_size, "mtime": st.st_mtime}
+        for table in ("files", "names"):
+            cursor = None
+            while True:
+                entries = self._index_page(table, subfolder, page_size, cursor, *filters)
+                yield from entries
+                if len(entries) < page_size:
+                    break
+                cursor = entries[-1]["name"]
+
+    def list_page(self, subfolder: str, limit: int = PAGE_SIZE, cursor: Optional[str] = None,
+                  prefix: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+                  min_size: Optional[int] = None, max_size: Optional[int] = None
+                  ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of a folder's files, sorted by name. With the index this is
+        a primary-key range scan; without it, one directory scan per page.
+
+        Args:
+            cursor: `next_cursor` of the previous page (None = first page)
+            prefix: file names starting with this
+            since / until: modification (or index) time range, epoch seconds
+            min_size / max_size: size range in bytes (logical size for blobs)
+
+        Returns:
+            (entries, next_cursor): entries are {"name", "path", "size", "mtime"};
+            next_cursor is None on the last page.
+        """
+        filters = (prefix, since, until, min_size, max_size)
+        # limit + 1 per source tells whether another page follows
+        pages = {}
+        if not (self.index_files and self.index is not None):
+            for entry in self._scan_page(subfolder, limit + 1, cursor, *filters):
+                pages[entry["name"]] = entry
+        for table in ("files", "names"):
+            for entry in self._index_page(table, subfolder, limit + 1, cursor, *filters):
+                pages[entry["name"]] = entry  # indexed entries win, as in list_files
+
+        names = sorted(pages)
+        entries = [pages[name] for name in names[:limit]]
+        next_cursor = entries[-1]["name"] if len(names) > limit else None
+        return entries, next_cursor
+
+    def _scan(self, subfolder, cursor, prefix, since, until, min_size, max_size) -> Iterator[Tuple[str, os.stat_result]]:
+        """Matching (name, stat) of a directory's files after `cursor`, in directory order."""
+        folder = self.base_dir / subfolder
+        if not folder.is_dir():
+            return
+        with os.scandir(folder) as it:
+            for item in it:
+                name = item.name
+                if (cursor is not None and name <= cursor) or (prefix and not name.startswith(prefix)):
+                    continue
+                try:
+                    if not item.is_file():
+                        continue
+                    st = item.stat()
+                except FileNotFoundError:
+                    continue
+                if ((since is not None and st.st_mtime < since) or (until is not None and st.st_mtime >= until)
+                        or (min_size is not None and st.st_size < min_size)
+                        or (max_size is not None and st.st_size > max_size)):
+                    continue
+                yield name, st
+
+    def _scan_page(self, subfolder, limit, cursor, *filters) -> List[Dict[str, Any]]:
+        """First `limit` matching names after `cursor`: one scan, O(limit) memory."""
         folder = self.base_dir / subfolder
-        if not folder.exists():
+        return [{"name": name, "path": folder / name, "size": st.st_size, "mtime": st.st_mtime}
+                for name, st in heapq.nsmallest(limit, self._scan(subfolder, cursor, *filters), key=lambda item: item[0])]
+
+    def _index_page(self, table, subfolder, limit, cursor, prefix, since, until, min_size, max_size):
+        """Keyset page from the index: (folder, filename) primary-key range scan."""
+        if self.index is None:
             return []
-        return list(folder.glob("*"))
+        time_column = "mtime" if table == "files" else "created_at"
+        sql = f"SELECT filename, size, {time_column}{', digest' if table == 'names' else ''} FROM {table} WHERE folder = ?"
+        params: list = [subfolder]
+        if cursor is not None:
+            sql += " AND filename > ?"
+            params.append(cursor)
+        if prefix:
+            sql += " AND filename >= ? AND filename < ?"
+            params += [prefix, _prefix_end(prefix)]
+        for clause, value in ((f"{time_column} >= ?", since), (f"{time_column} < ?", until),
+                              ("size >= ?", min_size), ("size <= ?", max_size)):
+            if value is not None:
+                sql += f" AND {clause}"
+                params.append(value)
+        sql += " ORDER BY filename LIMIT ?"
+        params.append(limit)
+
+        entries = []
+        for row in self._indexed(sql, params):
+            if table == "files":
+                path = self.base_dir / subfolder / row[0]
+            else:
+                path = self.find_blob(row[3])
+                if path is None:
+                    continue
+            entries.append({"name": row[0], "path": path, "size": row[1], "mtime": row[2]})
+        return entries
+
+    def count_files(self, subfolder: str) -> int:
+        """Number of files in a logical folder, without building their paths."""
+        if self.index_files and self.index is not None:
+            plain = self._indexed("SELECT COUNT(*) FROM files WHERE folder = ?", (subfolder,))[0][0]
+        else:
+            folder = self.base_dir / subfolder
+            plain = 0
+            if folder.is_dir():
+                with os.scandir(folder) as it:
+                    plain = sum(1 for item in it if item.is_file())
+        indexed = self._indexed("SELECT COUNT(*) FROM names WHERE folder = ?", (subfolder,))
+        return plain + (indexed[0][0] if indexed else 0)
+
+    def reindex(self, subfolder: str) -> int:
+        """Record a folder's existing plain files in the index (index_files=True); returns files indexed."""
+        folder = self.base_dir / subfolder
+        if not self.index_files or not folder.is_dir():
+            return 0
+        count = 0
+        with os.scandir(folder) as it, self._index_lock, self.index:
+            self.index.execute("DELETE FROM files WHERE folder = ?", (subfolder,))
+            for item in it:
+                if item.is_file():
+                    st = item.stat()
+                    self.index.execute("INSERT INTO files VALUES (?, ?, ?, ?)",
+                                       (subfolder, item.name, st.st_size, st.st_mtime))
+                    count += 1
+        logger.info(f"Indexed {count} files of {subfolder}")
+        return count
+
+    def list_subfolders(self, subfolder: str) -> List[str]:
+        """Names of the folders directly under `subfolder` (plain and indexed)."""
+        names = set()
+        folder = self.base_dir / subfolder
+        if folder.exists():
+            names.update(p.name for p in folder.iterdir() if p.is_dir())
+        prefix = f"{subfolder.rstrip('/')}/"
+        # Range scan on the primary key instead of LIKE (no escaping, uses the index)
+        for (child,) in self._indexed(
+            "SELECT DISTINCT folder FROM names WHERE folder >= ? AND folder < ?", (prefix, prefix[:-1] + "0")
+        ):
+            names.add(child[len(prefix):].split("/")[0])
+        return sorted(names)
+
+    def disk_usage(self) -> dict:
+        """Logical vs stored bytes of the content-addressed artifacts."""
+        row = self._indexed("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM names")
+        names, logical = row[0] if row else (0, 0)
+        blobs = [p for p in (self.base_dir / BLOBS_SUBFOLDER).glob("??/??/*") if p.is_file()]
+        return {
+            "names": names,
+            "logical_bytes": logical,
+            "blobs": len(blobs),
+            "stored_bytes": sum(p.stat().st_size for p in blobs),
+        }
 
     # -------------------------------------------------
     # Clear folder
@@ -98,6 +494,16 @@ class LocalStorage:
         """Clear a subfolder or all folders."""
         target = self.base_dir if subfolder is None else self.base_dir / subfolder
 
+        if subfolder is not None and self.index is not None:
+            # Blobs stay (they may be shared); only this folder's names go
+            with self._index_lock, self.index:
+                for table in ("names", "files"):
+                    self.index.execute(f"DELETE FROM {table} WHERE folder = ? OR (folder >= ? AND folder < ?)",
+                                       (subfolder, f"{subfolder}/", f"{subfolder}0"))
+        elif subfolder is None and self._index is not None:
+            self._index.close()
+            self._index = None
+
         if not target.exists():
             return
 
@@ -1,7 +1,329 @@
+import math
+import itertools
+import threading
+import weakref
+from collections import Counter, deque
 import streamlit as st
-from typing import Dict, List
+from typing import Dict, Iterable, List
 from src.utils.json_checker import is_json
 
+
+# -------------------------------------------------
+# Streaming sketches (constant memory, mergeable)
+# -------------------------------------------------
+class LogHistogram:
+    """
+    Log-bucketed histogram (HDR / DDSketch style) for latencies.
+
+    Values land in buckets whose width grows geometrically, so any quantile
+    is within `relative_accuracy` of the true value. Memory is bounded by
+    `max_buckets` (lowest buckets are collapsed first), histograms with the
+    same accuracy merge exactly, and the state round-trips through
+    `to_dict` / `from_dict` (JSON friendly).
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048, min_value: float = 1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1):
+        if value <= self.min_value:
+            self.zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + count
+            if len(self.buckets) > self.max_buckets:
+                self._collapse()
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def extend(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def _collapse(self):
+        lowest, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge histograms with different relative accuracy.")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # Bucket midpoint (in relative terms), clamped to what was observed
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def percentiles(self, qs=(0.5, 0.95, 0.99)) -> Dict[str, float]:
+        return {f"p{round(q * 100)}": self.quantile(q) for q in qs}
+
+    def to_dict(self) -> Dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "min_value": self.min_value,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LogHistogram":
+        hist = cls(data["relative_accuracy"], data["max_buckets"], data["min_value"])
+        hist.buckets = {int(k): v for k, v in data["buckets"].items()}
+        hist.zero_count = data["zero_count"]
+        hist.count = data["count"]
+        hist.sum = data["sum"]
+        hist.min = data["min"] if data["min"] is not None else math.inf
+        hist.max = data["max"] if data["max"] is not None else -math.inf
+        return hist
+
+
+class RunningMoments:
+    """Count / mean / variance / min / max in O(1) memory (Welford; Chan et al. for merges)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        if not other.count:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RunningMoments":
+        moments = cls()
+        moments.count = data["count"]
+        moments.mean = data["mean"]
+        moments.m2 = data["m2"]
+        moments.min = data["min"] if data["min"] is not None else math.inf
+        moments.max = data["max"] if data["max"] is not None else -math.inf
+        return moments
+
+
+# -------------------------------------------------
+# Group-by aggregates (model × document type)
+# -------------------------------------------------
+def group_key(model, document_type) -> str:
+    """JSON-friendly key of a (model, document_type) group."""
+    return f"{model or 'unknown'}|{document_type or 'unknown'}"
+
+
+def split_group_key(key: str):
+    model, _, document_type = key.partition("|")
+    return model, document_type
+
+
+class GroupStats:
+    """
+    Running aggregates of one (model, document_type) group, updated as each
+    document completes: counts, token totals, a latency histogram and
+    accuracy moments. Mergeable and serializable like the sketches.
+    """
+
+    COUNTERS = ("documents", "llm_failures", "llm_skipped", "input_tokens", "output_tokens")
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.latency = LogHistogram()
+        self.accuracy = RunningMoments()
+
+    def add(self, elapsed: float, accuracy=None, llm_failed: bool = False, llm_skipped: bool = False,
+            input_tokens=None, output_tokens=None):
+        self.documents += 1
+        self.llm_failures += int(llm_failed)
+        self.llm_skipped += int(llm_skipped)
+        self.input_tokens += input_tokens or 0
+        self.output_tokens += output_tokens or 0
+        self.latency.add(elapsed)
+        if accuracy is not None:
+            self.accuracy.add(accuracy)
+
+    def merge(self, other: "GroupStats") -> "GroupStats":
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.latency.merge(other.latency)
+        self.accuracy.merge(other.accuracy)
+        return self
+
+    @property
+    def failure_rate(self) -> float:
+        return self.llm_failures / self.documents if self.documents else 0.0
+
+    def to_dict(self) -> Dict:
+        data = {name: getattr(self, name) for name in self.COUNTERS}
+        data["latency"] = self.latency.to_dict()
+        data["accuracy"] = self.accuracy.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "GroupStats":
+        stats = cls()
+        for name in cls.COUNTERS:
+            setattr(stats, name, data.get(name, 0))
+        stats.latency = LogHistogram.from_dict(data["latency"])
+        stats.accuracy = RunningMoments.from_dict(data["accuracy"])
+        return stats
+
+
+# -------------------------------------------------
+# Per-thread shards
+# -------------------------------------------------
+# Global order of recorded file names across shards (next() is atomic in CPython)
+_FILE_SEQUENCE = itertools.count()
+
+
+class _MetricsShard:
+    """
+    One writer thread's slice of a `Metrics`. Only its owner thread writes
+    to it; the lock is there for readers merging it, so it is uncontended
+    on the hot path. A shard without an owner (merged snapshots, retired
+    shards) is written by no thread.
+    """
+
+    def __init__(self, owner: threading.Thread = None):
+        self.lock = threading.Lock()
+        self._owner = None if owner is None else weakref.ref(owner)
+        self.reset()
+
+    @property
+    def orphaned(self) -> bool:
+        """Its owner thread has exited: nothing will write to it again."""
+        if self._owner is None:
+            return False
+        owner = self._owner()
+        return owner is None or not owner.is_alive()
+
+    def reset(self):
+        for name in Metrics.COUNTERS:
+            setattr(self, name, 0)
+        for name, sketch in Metrics.SKETCH_TYPES.items():
+            setattr(self, name, sketch())
+        self.llm_used: Counter = Counter()
+        # group_key(model, document_type) → GroupStats
+        self.groups: Dict[str, GroupStats] = {}
+        # (sequence, file name): shards interleave back in recording order
+        self.filename_parsed: deque = deque(maxlen=Metrics.RECENT_FILES)
+
+    def merge(self, other: "_MetricsShard") -> "_MetricsShard":
+        for name in Metrics.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in Metrics.SKETCHES:
+            getattr(self, name).merge(getattr(other, name))
+        self.llm_used.update(other.llm_used)
+        for key, stats in other.groups.items():
+            self.groups.setdefault(key, GroupStats()).merge(stats)
+        if other.filename_parsed:
+            self.filename_parsed = deque(
+                sorted([*self.filename_parsed, *other.filename_parsed]), maxlen=Metrics.RECENT_FILES
+            )
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            "total_docs": self.total_docs,
+            "correct_classification": self.correct_classification,
+            "incorrect_classification": self.incorrect_classification,
+            "correct_predictions": self.correct_predictions,
+            "incorrect_predictions": self.incorrect_predictions,
+            "llm_failures": self.llm_failures,
+            "llm_skipped": self.llm_skipped,
+            "classifier_correct": self.classifier_correct,
+            "classifier_incorrect": self.classifier_incorrect,
+            # Serializable sketch states: merge / query with LogHistogram / RunningMoments
+            "latency": self.latency.to_dict(),
+            "classifier_latency": self.classifier_latency.to_dict(),
+            "accuracy": self.accuracy.to_dict(),
+            "llm_used": dict(self.llm_used),
+            "groups": {key: stats.to_dict() for key, stats in self.groups.items()},
+        }
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["lock"], state["_owner"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+        self._owner = None
+
+
 class Metrics:
     """
     Industry-standard metrics tracker for monitoring:
@@ -9,88 +331,260 @@ class Metrics:
     - prediction correctness
     - OCR/LLM failures
     - processing time
-    """
-
-    def __init__(self):
-        self.reset()
 
+    Thread-safe: every writer thread updates its own shard, and reads
+    (`total_docs`, `latency`, `to_dict()`, ...) merge all shards. Concurrent
+    pipeline workers therefore never wait on a shared lock. Shards of exited
+    threads (Streamlit runs each rerun on a new thread) are retired: emptied
+    by `flush()`, or folded into one ownerless shard when a new thread
+    registers, so there is at most one shard per live writer thread plus one.
+    """
 
+    # Field score at or above which a field counts as correct
+    SCORE_THRESHOLD = 0.75
+
+    COUNTERS = (
+        "total_docs", "correct_classification", "incorrect_classification",
+        "correct_predictions", "incorrect_predictions", "llm_failures", "llm_skipped",
+        "classifier_correct", "classifier_incorrect",
+    )
+    SKETCHES = ("latency", "classifier_latency", "accuracy")
+    SKETCH_TYPES = {"latency": LogHistogram, "classifier_latency": LogHistogram, "accuracy": RunningMoments}
+    RECENT_FILES = 100
+    STATE = COUNTERS + SKETCHES + ("llm_used", "groups", "filename_parsed")
+
+    def __init__(self, score_threshold: float = SCORE_THRESHOLD):
+        self.score_threshold = score_threshold
+        self._local = threading.local()
+        self._shards: List[_MetricsShard] = []
+        self._shards_lock = threading.Lock()
 
+    # -------------------------------------------------
+    # Shards
+    # -------------------------------------------------
+    def _shard(self) -> _MetricsShard:
+        """The calling thread's shard (registered once, on its first write)."""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _MetricsShard(threading.current_thread())
+            with self._shards_lock:
+                self._retire_orphans()
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _retire_orphans(self):
+        """Fold the shards of exited threads into one ownerless shard (caller holds `_shards_lock`)."""
+        orphans = [shard for shard in self._shards if shard.orphaned]
+        if not orphans:
+            return
+        retired = next((shard for shard in self._shards if shard._owner is None), None)
+        if retired is None:
+            retired = _MetricsShard()
+            self._shards.append(retired)
+        with retired.lock:
+            for shard in orphans:
+                with shard.lock:
+                    retired.merge(shard)
+                    # Emptied too: a flush that listed it before this must not count it again
+                    shard.reset()
+        self._drop(orphans)
+
+    def _drop(self, shards: List[_MetricsShard]):
+        """Unregister emptied / merged shards (caller holds `_shards_lock`)."""
+        gone = {id(shard) for shard in shards}
+        self._shards = [shard for shard in self._shards if id(shard) not in gone]
+
+    def _all_shards(self) -> List[_MetricsShard]:
+        with self._shards_lock:
+            return list(self._shards)
+
+    def _merged(self) -> _MetricsShard:
+        """Snapshot of all shards merged into one."""
+        merged = _MetricsShard()
+        for shard in self._all_shards():
+            with shard.lock:
+                merged.merge(shard)
+        return merged
+
+    def _add(self, name: str, amount: int = 1):
+        shard = self._shard()
+        with shard.lock:
+            setattr(shard, name, getattr(shard, name) + amount)
+
+    def __getattr__(self, name):
+        """Read access to counters / sketches (`metrics.total_docs`, ...): merged over shards."""
+        if name not in Metrics.STATE:
+            raise AttributeError(name)
+        value = getattr(self._merged(), name)
+        if name == "filename_parsed":
+            return deque((file for _, file in value), maxlen=self.RECENT_FILES)
+        return value
+
+    def __getstate__(self):
+        # Locks and thread-locals do not pickle: ship one merged shard (rescore workers)
+        return {"score_threshold": self.score_threshold, "shard": self._merged()}
+
+    def __setstate__(self, state):
+        self.__init__(state["score_threshold"])
+        self._shards.append(state["shard"])
 
     # -------------------------------------------------
     # Reset all metrics
     # -------------------------------------------------
     def reset(self):
-        self.total_docs = 0
-        self.correct_classification = 0
-        self.incorrect_classification = 0
-        self.correct_predictions = 0
-        self.incorrect_predictions = 0
-        self.llm_failures = 0
-        self.accuracy_: List[float] = []
-        self.processing_times: List[float] = []
-        self.llm_used: List[str] = []
-        self.filename_parsed: List[str] = []
+        orphans = []
+        for shard in self._all_shards():
+            with shard.lock:
+                if shard.orphaned:
+                    orphans.append(shard)
+                shard.reset()
+        with self._shards_lock:
+            self._drop(orphans)
+
     # -------------------------------------------------
     # Add one processing record
     # -------------------------------------------------
     def record_processing(self, elapsed_time: float):
-        self.processing_times.append(elapsed_time)
+        shard = self._shard()
+        with shard.lock:
+            shard.latency.add(elapsed_time)
 
     def record_llm_used(self, llm: str):
-        self.llm_used.append(llm)        
+        shard = self._shard()
+        with shard.lock:
+            shard.llm_used[llm] += 1
 
     def record_filename_parsed(self, file: str):
-        self.filename_parsed.append(file)    
+        shard = self._shard()
+        with shard.lock:
+            shard.filename_parsed.append((next(_FILE_SEQUENCE), file))
 
     # -------------------------------------------------
     # Increment document count
     # -------------------------------------------------
     def add_document(self):
-        self.total_docs += 1
+        self._add("total_docs")
 
     # -------------------------------------------------
     # Prediction tracking
     # -------------------------------------------------
     def mark_correct(self):
-        self.correct_predictions += 1
+        self._add("correct_predictions")
 
     def mark_incorrect(self):
-        self.incorrect_predictions += 1
+        self._add("incorrect_predictions")
 
     # -------------------------------------------------
     # Classification tracking
     # -------------------------------------------------
     def mark_classification_correct(self):
-        self.correct_classification += 1
+        self._add("correct_classification")
 
     def mark_classification_incorrect(self):
-        self.incorrect_classification += 1
+        self._add("incorrect_classification")
 
     # -------------------------------------------------
     # LLM failure tracking
     # -------------------------------------------------
     def mark_llm_failure(self):
-        self.llm_failures += 1
+        self._add("llm_failures")
+
+    def mark_llm_skipped(self):
+        """Document fully answered by the OCR fast path."""
+        self._add("llm_skipped")
 
     def record_accuracy(self, accuracy: float):
-        self.accuracy_.append(accuracy)
+        shard = self._shard()
+        with shard.lock:
+            shard.accuracy.add(accuracy)
+
+    def record_group(self, model, document_type, elapsed_time: float, accuracy=None,
+                     llm_failed: bool = False, llm_skipped: bool = False,
+                     input_tokens=None, output_tokens=None):
+        """Fold one completed document into its (model, document_type) aggregates."""
+        shard = self._shard()
+        with shard.lock:
+            stats = shard.groups.get(group_key(model, document_type))
+            if stats is None:
+                stats = shard.groups[group_key(model, document_type)] = GroupStats()
+            stats.add(elapsed_time, accuracy, llm_failed, llm_skipped, input_tokens, output_tokens)
+
+    def merge(self, other: "Metrics"):
+        """Add another tracker's counts and samples (e.g. from a worker process)."""
+        snapshot = other._merged()
+        shard = self._shard()
+        with shard.lock:
+            shard.merge(snapshot)
+        return self
+
+    # -------------------------------------------------
+    # Delta protocol (per-document updates into session state)
+    # -------------------------------------------------
+    def flush(self) -> Dict:
+        """Metrics recorded since the last flush, as a `to_dict()` delta; starts a new delta."""
+        delta, orphans = _MetricsShard(), []
+        for shard in self._all_shards():
+            # Take and clear each shard atomically: concurrent writes land in the next delta
+            with shard.lock:
+                # Owner already exited before the take: nothing can land in it afterwards
+                if shard.orphaned:
+                    orphans.append(shard)
+                delta.merge(shard)
+                shard.reset()
+        # Emptied shards of exited threads are dropped, not merged again on every read
+        with self._shards_lock:
+            self._drop(orphans)
+        return delta.to_dict()
+
+    @classmethod
+    def fold(cls, total: Dict, delta: Dict) -> Dict:
+        """
+        Fold a delta (`flush()`) into accumulated metrics, in place.
+        Counters add, sketches merge, per-key counts add. Cost does not
+        depend on how many documents `total` already covers.
+        """
+        for key, value in delta.items():
+            current = total.get(key)
+            if current is None:
+                total[key] = dict(value) if isinstance(value, dict) else value
+            elif key == "groups":
+                for group, state in value.items():
+                    if group in current:
+                        state = GroupStats.from_dict(current[group]).merge(GroupStats.from_dict(state)).to_dict()
+                    current[group] = state
+            elif key in cls.SKETCH_TYPES:
+                sketch = cls.SKETCH_TYPES[key]
+                total[key] = sketch.from_dict(current).merge(sketch.from_dict(value)).to_dict()
+            elif isinstance(value, dict) and isinstance(current, dict):
+                for name, count in value.items():
+                    current[name] = current.get(name, 0) + count
+            elif isinstance(value, (int, float)) and isinstance(current, (int, float)):
+                total[key] = current + value
+            else:
+                total[key] = value
+        return total
+
+    # -------------------------------------------------
+    # Local pre-classifier tracking
+    # -------------------------------------------------
+    def record_classification(self, predicted, actual, elapsed_time: float):
+        """Pre-classifier result vs ground-truth document_type, plus time the stage added."""
+        shard = self._shard()
+        with shard.lock:
+            shard.classifier_latency.add(elapsed_time)
+            if actual is None:
+                return
+            if predicted is not None and str(predicted).upper() == str(actual).upper():
+                shard.classifier_correct += 1
+            else:
+                shard.classifier_incorrect += 1
 
     # -------------------------------------------------
     # Export as a dictionary (for Streamlit dashboard)
     # -------------------------------------------------
     def to_dict(self) -> Dict:
-        return {
-            "total_docs": self.total_docs,
-            "correct_classification": self.correct_classification,
-            "incorrect_classification": self.incorrect_classification,
-            "correct_predictions": self.correct_predictions,
-            "incorrect_predictions": self.incorrect_predictions,
-            "llm_failures": self.llm_failures,
-            "accuracy": self.accuracy_,
-            "processing_times": self.processing_times
-
-        }
+        return self._merged().to_dict()
     
 
     # def time_data(self, res) -> Dict:
@@ -124,8 +618,8 @@ class Metrics:
     def mark_by_score(self, res):
         """
         Evaluate each field individually by its 'score'.
-        score >= 0.9 → mark as correct
-        score < 0.9  → mark as incorrect
+        score >= score_threshold → mark as correct
+        score < score_threshold  → mark as incorrect
 
         Marks overall correctness based on % of correct fields.
         """
@@ -144,20 +638,23 @@ class Metrics:
             score = obj.get("score")
             if isinstance(score, (int, float)):
                 total += 1
-                if score >= 0.75:
+                if score >= self.score_threshold:
                     correct += 1
-                    self.mark_correct()
-                else:
-                    self.mark_incorrect()
 
         # # No scores found → incorrect
         # if total == 0:
         #     self.mark_correct()
         #     return
 
-        accuracy = correct / total
+        accuracy = correct / total if total else 0.0
 
-        self.record_accuracy(accuracy)
+        # One shard update per document instead of one per field
+        shard = self._shard()
+        with shard.lock:
+            shard.correct_predictions += correct
+            shard.incorrect_predictions += total - correct
+            shard.accuracy.add(accuracy)
+        return accuracy
 
 
         #st.write(f"Field accuracy: {accuracy:.2%}")
@@ -167,7 +664,7 @@ class Metrics:
 
     def update_metrics(self, pred, res):
         if not is_json(pred):
-            self.mark_llm_failure
+            self.mark_llm_failure()
 
         # st.write(pred)
         # if res["document_type"]["score"] > 0.8:
@@ -182,8 +679,12 @@ class Metrics:
 
 
         #st.write(res)
-        self.mark_by_score(res)    
+        return self.mark_by_score(res)
         #self.record_processing(res["processing_time"])
 
 
-
+    def record_inference(self, pred):
+        """Inference mode (no ground truth): only counts and LLM failures."""
+        if not pred or not is_json(pred):
+            self.mark_llm_failure()
+        self.add_document()
@@ -0,0 +1,401 @@
+import json
+import math
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.services.metrics_service import Metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "storage/metrics.db"
+
+STAGES = ("ocr", "classify", "llm", "evaluate")
+
+# Rollup bucket widths (seconds)
+GRANULARITIES = {"minute": 60, "hour": 3600, "day": 86400}
+
+# Upper bound on points per series returned to charts
+MAX_POINTS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    started_at  REAL NOT NULL,
+    model       TEXT,
+    mode        TEXT,
+    settings    TEXT
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id              INTEGER PRIMARY KEY,
+    run_id          TEXT NOT NULL,
+    file_name       TEXT,
+    model           TEXT,
+    document_type   TEXT,
+    created_at      REAL NOT NULL,
+    total_time      REAL,
+    ocr_time        REAL,
+    classify_time   REAL,
+    llm_time        REAL,
+    evaluate_time   REAL,
+    input_tokens    INTEGER,
+    output_tokens   INTEGER,
+    image_tokens    INTEGER,
+    fields          INTEGER,
+    correct_fields  INTEGER,
+    accuracy        REAL,
+    llm_failed      INTEGER NOT NULL DEFAULT 0,
+    llm_skipped     INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS field_scores (
+    document_id INTEGER NOT NULL,
+    path        TEXT NOT NULL,
+    score       REAL
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    granularity     TEXT NOT NULL,
+    bucket          INTEGER NOT NULL,
+    model           TEXT NOT NULL,
+    document_type   TEXT NOT NULL,
+    documents       INTEGER NOT NULL,
+    latency_sum     REAL NOT NULL,
+    latency_max     REAL,
+    accuracy_sum    REAL NOT NULL,
+    accuracy_count  INTEGER NOT NULL,
+    llm_failures    INTEGER NOT NULL,
+    PRIMARY KEY (granularity, bucket, model, document_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_documents_created ON documents(created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_model ON documents(model, created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_type ON documents(document_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_run ON documents(run_id);
+CREATE INDEX IF NOT EXISTS idx_field_scores_document ON field_scores(document_id);
+"""
+
+DOCUMENT_COLUMNS = (
+    "run_id", "file_name", "model", "document_type", "created_at", "total_time",
+    "ocr_time", "classify_time", "llm_time", "evaluate_time",
+    "input_tokens", "output_tokens", "image_tokens",
+    "fields", "correct_fields", "accuracy", "llm_failed", "llm_skipped",
+)
+
+ROLLUP_UPSERT = """
+INSERT INTO rollups (granularity, bucket, model, document_type, documents, latency_sum, latency_max,
+                     accuracy_sum, accuracy_count, llm_failures)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (granularity, bucket, model, document_type) DO UPDATE SET
+    documents = documents + excluded.documents,
+    latency_sum = latency_sum + excluded.latency_sum,
+    latency_max = MAX(COALESCE(latency_max, excluded.latency_max), excluded.latency_max),
+    accuracy_sum = accuracy_sum + excluded.accuracy_sum,
+    accuracy_count = accuracy_count + excluded.accuracy_count,
+    llm_failures = llm_failures + excluded.llm_failures
+"""
+
+
+class MetricsStore:
+    """
+    Durable metrics and run history on local SQLite.
+
+    Documents are recorded one at a time but written in batches (one
+    transaction per `batch_size` documents, or on `flush`). Dashboard
+    queries are indexed aggregates with optional filters on date range,
+    model and document type.
+
+    Each batch also updates minute / hour / day rollups, so time-series
+    charts read a bounded number of pre-aggregated rows instead of raw
+    documents.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, batch_size: int = 50):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self._pending: List[Tuple[tuple, List[Tuple[str, Optional[float]]]]] = []
+        self._lock = threading.Lock()
+
+        # Streamlit reruns on different threads: one shared connection, guarded by the lock
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._backfill_rollups()
+        logger.info(f"MetricsStore initialized at: {self.db_path}")
+
+    # -------------------------------------------------
+    # Writing
+    # -------------------------------------------------
+    def start_run(self, run_id: str, model: Optional[str] = None, mode: Optional[str] = None,
+                  settings: Optional[Dict[str, Any]] = None):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, started_at, model, mode, settings) VALUES (?, ?, ?, ?, ?)",
+                (run_id, time.time(), model, mode, json.dumps(settings or {})),
+            )
+
+    def record_document(self, run_id: str, model: Optional[str], res: Dict[str, Any],
+                        threshold: float = Metrics.SCORE_THRESHOLD, created_at: Optional[float] = None):
+        """Queue one pipeline result (`Pipeline.process_document` output) for writing."""
+        result = res.get("result") or {}
+        scores = []
+        for path, info in result.items():
+            if isinstance(info, dict):
+                scores.append((path, info.get("score")))
+
+        scored = [s for _, s in scores if s is not None]
+        correct = sum(1 for s in scored if s >= threshold)
+        stage_times = res.get("stage_times") or {}
+
+        row = (
+            run_id, res.get("file_name"), model, res.get("document_type"), created_at or time.time(),
+            res.get("processing_time"),
+            *(stage_times.get(stage) for stage in STAGES),
+            res.get("input_tokens"), res.get("output_tokens"), res.get("image_tokens"),
+            len(scored), correct, correct / len(scored) if scored else None,
+            int(bool(res.get("llm_failed"))), int(bool(res.get("llm_skipped"))),
+        )
+
+        with self._lock:
+            self._pending.append((row, scores))
+            if len(self._pending) >= self.batch_size:
+                self._write_pending()
+
+    def flush(self):
+        with self._lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        placeholders = ", ".join("?" for _ in DOCUMENT_COLUMNS)
+        with self.conn:  # one transaction for the whole batch
+            for row, scores in self._pending:
+                cur = self.conn.execute(
+                    f"INSERT INTO documents ({', '.join(DOCUMENT_COLUMNS)}) VALUES ({placeholders})", row
+                )
+                document_id = cur.lastrowid
+                self.conn.executemany(
+                    "INSERT INTO field_scores (document_id, path, score) VALUES (?, ?, ?)",
+                    [(document_id, path, score) for path, score in scores],
+                )
+            self.conn.executemany(ROLLUP_UPSERT, self._rollup_rows(row for row, _ in self._pending))
+        logger.debug(f"MetricsStore wrote {len(self._pending)} documents")
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    # -------------------------------------------------
+    # Rollups (time series)
+    # -------------------------------------------------
+    @staticmethod
+    def _rollup_rows(rows) -> List[tuple]:
+        """Pre-aggregate a batch of document rows per (granularity, bucket, model, type)."""
+        i_model, i_type, i_created, i_time = (DOCUMENT_COLUMNS.index(c) for c in
+                                              ("model", "document_type", "created_at", "total_time"))
+        i_accuracy, i_failed = DOCUMENT_COLUMNS.index("accuracy"), DOCUMENT_COLUMNS.index("llm_failed")
+
+        buckets: Dict[tuple, list] = {}
+        for row in rows:
+            latency, accuracy = row[i_time] or 0.0, row[i_accuracy]
+            for granularity, width in GRANULARITIES.items():
+                key = (granularity, int(row[i_created] // width * width), row[i_model] or "", row[i_type] or "")
+                agg = buckets.get(key)
+                if agg is None:
+                    agg = buckets[key] = [0, 0.0, None, 0.0, 0, 0]
+                agg[0] += 1
+                agg[1] += latency
+                agg[2] = latency if agg[2] is None else max(agg[2], latency)
+                if accuracy is not None:
+                    agg[3] += accuracy
+                    agg[4] += 1
+                agg[5] += row[i_failed]
+        return [(*key, *agg) for key, agg in buckets.items()]
+
+    def _backfill_rollups(self):
+        """Build rollups once for databases written before they existed."""
+        with self._lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone():
+                return
+            if not self.conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone():
+                return
+            for granularity, width in GRANULARITIES.items():
+                self.conn.execute("""
+                    INSERT INTO rollups
+                    SELECT ?, CAST(created_at / ? AS INTEGER) * ?, COALESCE(model, ''), COALESCE(document_type, ''),
+                           COUNT(*), COALESCE(SUM(total_time), 0), MAX(total_time),
+                           COALESCE(SUM(accuracy), 0), COUNT(accuracy), SUM(llm_failed)
+                    FROM documents GROUP BY 2, 3, 4
+                """, (granularity, width, width))
+        logger.info("MetricsStore: rollups rebuilt from documents")
+
+    # -------------------------------------------------
+    # Queries (dashboard)
+    # -------------------------------------------------
+    @staticmethod
+    def _where(start: Optional[float] = None, end: Optional[float] = None,
+               models: Optional[Sequence[str]] = None,
+               document_types: Optional[Sequence[str]] = None, alias: str = "",
+               time_column: str = "created_at") -> Tuple[str, list]:
+        """WHERE clause over `documents` (`alias` prefixes column names, e.g. "d.")."""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{alias}{time_column} >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append(f"{alias}{time_column} < ?")
+            params.append(end)
+        if models:
+            clauses.append(f"{alias}model IN ({', '.join('?' for _ in models)})")
+            params.extend(models)
+        if document_types:
+            clauses.append(f"{alias}document_type IN ({', '.join('?' for _ in document_types)})")
+            params.extend(document_types)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            self.conn.row_factory = sqlite3.Row
+            try:
+                return self.conn.execute(sql, params).fetchall()
+            finally:
+                self.conn.row_factory = None
+
+    def summary(self, **filters) -> Dict[str, Any]:
+        """Headline aggregates over the filtered documents."""
+        where, params = self._where(**filters)
+        row = self._query(f"""
+            SELECT COUNT(*) AS documents,
+                   COUNT(DISTINCT run_id) AS runs,
+                   AVG(accuracy) AS avg_accuracy,
+                   SUM(correct_fields) AS correct_fields,
+                   SUM(fields) AS fields,
+                   AVG(total_time) AS avg_time,
+                   SUM(llm_failed) AS llm_failures,
+                   SUM(llm_skipped) AS llm_skipped,
+                   SUM(input_tokens) AS input_tokens,
+                   SUM(output_tokens) AS output_tokens,
+                   SUM(image_tokens) AS image_tokens
+            FROM documents{where}
+        """, params)[0]
+        return dict(row)
+
+    def stage_timings(self, **filters) -> Dict[str, Optional[float]]:
+        """Average seconds spent per pipeline stage."""
+        where, params = self._where(**filters)
+        columns = ", ".join(f"AVG({stage}_time) AS {stage}" for stage in STAGES)
+        return dict(self._query(f"SELECT {columns} FROM documents{where}", params)[0])
+
+    def runs(self, limit: int = 50, **filters) -> List[Dict[str, Any]]:
+        """Most recent runs with per-run aggregates."""
+        where, params = self._where(alias="d.", **filters)
+        rows = self._query(f"""
+            SELECT d.run_id, r.started_at, d.model, COUNT(*) AS documents,
+                   AVG(d.accuracy) AS avg_accuracy, AVG(d.total_time) AS avg_time,
+                   SUM(d.llm_failed) AS llm_failures,
+                   SUM(COALESCE(d.input_tokens, 0) + COALESCE(d.output_tokens, 0)) AS tokens
+            FROM documents d LEFT JOIN runs r ON r.run_id = d.run_id
+            {where}
+            GROUP BY d.run_id
+            ORDER BY MAX(d.created_at) DESC
+            LIMIT ?
+        """, [*params, limit])
+        return [dict(r) for r in rows]
+
+    def distinct(self, column: str) -> List[str]:
+        """Filter options: distinct models or document types."""
+        if column not in ("model", "document_type"):
+            raise ValueError(f"Unsupported column: {column}")
+        rows = self._query(f"SELECT DISTINCT {column} FROM documents WHERE {column} IS NOT NULL ORDER BY 1")
+        return [r[0] for r in rows]
+
+    @staticmethod
+    def pick_granularity(start: float, end: float, max_points: int = MAX_POINTS) -> str:
+        """Finest rollup granularity that covers [start, end) in at most `max_points` buckets."""
+        for granularity, width in GRANULARITIES.items():
+            if (end - start) / width <= max_points:
+                return granularity
+        return "day"
+
+    def timeseries(self, granularity: Optional[str] = None, max_points: int = MAX_POINTS,
+                   **filters) -> List[Dict[str, Any]]:
+        """
+        Latency / accuracy / volume per time bucket and model, from the rollups.
+
+        Downsampled in SQL: adjacent buckets are merged (counts add, means
+        re-weighted, max of max) so each model's series has at most
+        `max_points` points, however long the history.
+        """
+        start, end = filters.get("start"), filters.get("end")
+        if start is None or end is None:
+            bounds = self._query("SELECT MIN(created_at) AS lo, MAX(created_at) AS hi FROM documents")[0]
+            if bounds["lo"] is None:
+                return []
+            start = bounds["lo"] if start is None else start
+            end = bounds["hi"] + 1 if end is None else end
+
+        granularity = granularity or self.pick_granularity(start, end, max_points)
+        width = GRANULARITIES[granularity]
+        # Widen buckets (a multiple of the rollup width) until the series fits
+        width *= max(1, math.ceil((end - start) / width / max_points))
+
+        filters = {**filters, "start": start // GRANULARITIES[granularity] * GRANULARITIES[granularity], "end": end}
+        where, params = self._where(time_column="bucket", **filters)
+        where = (where + " AND" if where else " WHERE") + " granularity = ?"
+        rows = self._query(f"""
+            SELECT CAST(bucket / ? AS INTEGER) * ? AS bucket, model,
+                   SUM(documents) AS documents,
+                   SUM(latency_sum) / SUM(documents) AS avg_time,
+                   MAX(latency_max) AS max_time,
+                   SUM(accuracy_sum) / NULLIF(SUM(accuracy_count), 0) AS avg_accuracy,
+                   SUM(llm_failures) AS llm_failures
+            FROM rollups{where}
+            GROUP BY 1, 2
+            ORDER BY 1
+        """, [width, width, *params, granularity])
+        return [dict(r) for r in rows]
+
+    def run_timeseries(self, run_id: str, max_points: int = MAX_POINTS) -> List[Dict[str, Any]]:
+        """Latency / accuracy over one run (raw documents, downsampled to `max_points`)."""
+        bounds = self._query(
+            "SELECT MIN(created_at) AS lo, MAX(created_at) AS hi FROM documents WHERE run_id = ?", (run_id,)
+        )[0]
+        if bounds["lo"] is None:
+            return []
+        width = max((bounds["hi"] - bounds["lo"]) / max_points, 1e-9)
+        rows = self._query("""
+            SELECT MIN(created_at) AS time, COUNT(*) AS documents,
+                   AVG(total_time) AS avg_time, MAX(total_time) AS max_time,
+                   AVG(accuracy) AS avg_accuracy, SUM(llm_failed) AS llm_failures
+            FROM documents WHERE run_id = ?
+            GROUP BY CAST((created_at - ?) / ? AS INTEGER)
+            ORDER BY 1
+        """, (run_id, bounds["lo"], width))
+        return [dict(r) for r in rows]
+
+    def field_scores(self, run_id: str) -> List[Dict[str, Any]]:
+        """Per-field average score of one run."""
+        rows = self._query("""
+            SELECT f.path, AVG(f.score) AS avg_score, COUNT(*) AS documents
+            FROM field_scores f JOIN documents d ON d.id = f.document_id
+            WHERE d.run_id = ?
+            GROUP BY f.path
+            ORDER BY avg_score
+        """, (run_id,))
+        return [dict(r) for r in rows]
+
+
+_stores: Dict[str, MetricsStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_path: str = DEFAULT_DB_PATH) -> MetricsStore:
+    """Process-wide store per database file (shared by Streamlit sessions)."""
+    with _stores_lock:
+        if db_path not in _stores:
+            _stores[db_path] = MetricsStore(db_path)
+        return _stores[db_path]
@@ -1,39 +1,206 @@
 from paddleocr import PaddleOCR
 from PIL import Image
 import io
+import logging
 import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import pytesseract
+except ImportError:  # optional backend
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+
+class OCRLine:
+    """One recognized text line with its box (x1, y1, x2, y2) and confidence."""
+
+    __slots__ = ("text", "box", "score")
+
+    def __init__(self, text: str, box: Optional[Tuple[int, int, int, int]] = None, score: float = 1.0):
+        self.text = text
+        self.box = box
+        self.score = score
+
+    def __repr__(self):
+        return f"OCRLine({self.text!r}, box={self.box}, score={self.score:.2f})"
+
+
+# -------------------------------------------------
+# Engine interface
+# -------------------------------------------------
+class OCREngine:
+    """Base class for OCR backends. Subclasses implement `recognize`."""
+
+    name = "base"
+
+    def recognize(self, img_array: np.ndarray) -> List[OCRLine]:
+        raise NotImplementedError
+
+
+class PaddleOCREngine(OCREngine):
+    """Default PaddleOCR pipeline (server detection/recognition models)."""
+
+    name = "paddle"
 
-class OCRProcessor:
     def __init__(self, use_doc_orientation_classify=False,
                        use_doc_unwarping=False,
-                       use_textline_orientation=False):
+                       use_textline_orientation=False,
+                       **model_kwargs):
         self.ocr = PaddleOCR(
             use_doc_orientation_classify=use_doc_orientation_classify,
             use_doc_unwarping=use_doc_unwarping,
-            use_textline_orientation=use_textline_orientation
+            use_textline_orientation=use_textline_orientation,
+            **model_kwargs
         )
 
-    def run(self, input_bytes):
-        """
-        Run OCR on image bytes.
+    def recognize(self, img_array):
+        # PaddleOCR can process NumPy arrays
+        result = self.ocr.predict(img_array)
+        page = result[0]
 
-        Args:
-            input_bytes (bytes): Image in bytes format.
-        """
+        texts = page["rec_texts"]
+        boxes = page.get("rec_boxes")
+        scores = page.get("rec_scores")
+
+        lines = []
+        for i, text in enumerate(texts):
+            box = tuple(int(v) for v in boxes[i]) if boxes is not None and len(boxes) > i else None
+            score = float(scores[i]) if scores is not None and len(scores) > i else 1.0
+            lines.append(OCRLine(text, box, score))
+        return lines
+
+
+class PaddleOCRMobileEngine(PaddleOCREngine):
+    """PaddleOCR with the mobile (lite) detection/recognition models for CPU-only nodes."""
+
+    name = "paddle-mobile"
+
+    DET_MODEL = "PP-OCRv5_mobile_det"
+    REC_MODEL = "PP-OCRv5_mobile_rec"
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("text_detection_model_name", self.DET_MODEL)
+        kwargs.setdefault("text_recognition_model_name", self.REC_MODEL)
+        # Smaller detection input keeps CPU latency predictable on large scans
+        kwargs.setdefault("text_det_limit_side_len", 960)
+        super().__init__(**kwargs)
+
+
+class TesseractEngine(OCREngine):
+    """Tesseract backend via pytesseract (optional dependency)."""
+
+    name = "tesseract"
+
+    def __init__(self, lang: str = "eng", config: str = "--oem 1 --psm 3"):
+        if pytesseract is None:
+            raise ImportError("pytesseract is not installed; install it to use the Tesseract OCR tier.")
+        self.lang = lang
+        self.config = config
+
+    def recognize(self, img_array):
+        data = pytesseract.image_to_data(
+            img_array, lang=self.lang, config=self.config, output_type=pytesseract.Output.DICT
+        )
+
+        # Group words into lines (block, paragraph, line)
+        grouped: Dict[Tuple[int, int, int], list] = {}
+        for i, word in enumerate(data["text"]):
+            if not word or not word.strip():
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            grouped.setdefault(key, []).append(i)
+
+        lines = []
+        for key in sorted(grouped):
+            idx = grouped[key]
+            x1 = min(data["left"][i] for i in idx)
+            y1 = min(data["top"][i] for i in idx)
+            x2 = max(data["left"][i] + data["width"][i] for i in idx)
+            y2 = max(data["top"][i] + data["height"][i] for i in idx)
+            confs = [float(data["conf"][i]) for i in idx if float(data["conf"][i]) >= 0]
+            score = (sum(confs) / len(confs) / 100.0) if confs else 0.0
+            text = " ".join(data["text"][i] for i in idx)
+            lines.append(OCRLine(text, (x1, y1, x2, y2), score))
+        return lines
+
+
+# -------------------------------------------------
+# Speed / accuracy tiers
+# -------------------------------------------------
+OCR_TIERS = {
+    "accurate": PaddleOCREngine,     # default PaddleOCR server models
+    "fast": PaddleOCRMobileEngine,   # mobile models, CPU friendly
+    "fastest": TesseractEngine,      # optional, lowest latency
+}
+
+DEFAULT_TIER = "accurate"
+
+
+def available_tiers() -> List[str]:
+    """Tiers whose backend can be constructed in this environment."""
+    return [t for t in OCR_TIERS if t != "fastest" or pytesseract is not None]
+
+
+class OCRProcessor:
+    """
+    OCR front-end used by the pipeline.
+
+    Engines are created lazily per tier and reused, so a request can pick
+    its tier without paying model load time for tiers it never uses.
+    """
+
+    def __init__(self, use_doc_orientation_classify=False,
+                       use_doc_unwarping=False,
+                       use_textline_orientation=False,
+                       tier: str = DEFAULT_TIER):
+        if tier not in OCR_TIERS:
+            raise ValueError(f"Unknown OCR tier: {tier}. Options: {list(OCR_TIERS)}")
+
+        self.tier = tier
+        self.paddle_options = {
+            "use_doc_orientation_classify": use_doc_orientation_classify,
+            "use_doc_unwarping": use_doc_unwarping,
+            "use_textline_orientation": use_textline_orientation,
+        }
+        self._engines: Dict[str, OCREngine] = {}
+
+    def get_engine(self, tier: Optional[str] = None) -> OCREngine:
+        tier = tier or self.tier
+        if tier not in OCR_TIERS:
+            raise ValueError(f"Unknown OCR tier: {tier}. Options: {list(OCR_TIERS)}")
+
+        if tier not in self._engines:
+            engine_cls = OCR_TIERS[tier]
+            if issubclass(engine_cls, PaddleOCREngine):
+                self._engines[tier] = engine_cls(**self.paddle_options)
+            else:
+                self._engines[tier] = engine_cls()
+            logger.info(f"OCR engine loaded: {engine_cls.name} (tier={tier})")
+        return self._engines[tier]
+
+    def run_lines(self, input_bytes, tier: Optional[str] = None) -> Optional[List[OCRLine]]:
+        """Run OCR on image bytes and return recognized lines with boxes (None on failure)."""
         try:
             # Convert bytes → PIL → NumPy array
             img = Image.open(io.BytesIO(input_bytes)).convert("RGB")
             img_array = np.array(img)
-
-            # PaddleOCR can process NumPy arrays
-            result = self.ocr.predict(img_array)
-
-            # # Process results
-            # for line in result:
-            #     print(line)
-            ocr_text = "\n".join(result[0]["rec_texts"])
-            return ocr_text
+            return self.get_engine(tier).recognize(img_array)
 
         except Exception as e:
             print(f"[OCR ERROR]: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def run(self, input_bytes, tier: Optional[str] = None):
+        """
+        Run OCR on image bytes.
+
+        Args:
+            input_bytes (bytes): Image in bytes format.
+            tier (str): OCR tier for this request (defaults to the processor tier).
+        """
+        lines = self.run_lines(input_bytes, tier)
+        if lines is None:
+            return None
+        return "\n".join(line.text for line in lines)
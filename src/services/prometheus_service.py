@@ -0,0 +1,291 @@
+import os
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+PORT_ENV = "PROMETHEUS_PORT"
+
+# Seconds; covers OCR/evaluation (ms) up to slow LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# -------------------------------------------------
+# Metric types
+# -------------------------------------------------
+class _Metric:
+    """
+    Base for labelled metrics. `labels(...)` returns the child for one label
+    combination; children are created once and cached, so the hot path is a
+    dict lookup plus one short lock per update.
+    """
+
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+
+class Counter(_Metric):
+    """Monotonic counter (`name_total`)."""
+
+    TYPE = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only increase.")
+        self._children[()].inc(amount)
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(c.value)}"
+                for k, c in list(self._children.items())]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (e.g. requests in flight)."""
+
+    TYPE = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._children[()].dec(amount)
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+    _samples = Counter._samples
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; p95 etc. come from `histogram_quantile` on the server side."""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def _samples(self):
+        lines = []
+        for key, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# -------------------------------------------------
+# Registry
+# -------------------------------------------------
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# Pipeline metrics (updated from Pipeline / LLMImageParser / cli.py)
+DOCUMENTS = REGISTRY.counter(
+    "llm_parser_documents_total", "Documents processed.", ("model", "status"))
+LLM_FAILURES = REGISTRY.counter(
+    "llm_parser_llm_failures_total", "LLM responses that were empty or not valid JSON.", ("model",))
+CACHE_HITS = REGISTRY.counter(
+    "llm_parser_cache_hits_total", "LLM calls answered from the response cache.", ("model",))
+RETRIES = REGISTRY.counter(
+    "llm_parser_retries_total", "Retried LLM requests.", ("model",))
+STAGE_LATENCY = REGISTRY.histogram(
+    "llm_parser_stage_seconds", "Time spent per pipeline stage.", ("stage", "model"))
+DOCUMENT_LATENCY = REGISTRY.histogram(
+    "llm_parser_document_seconds", "End-to-end processing time per document.", ("model",))
+IN_FLIGHT = REGISTRY.gauge(
+    "llm_parser_in_flight", "Documents / LLM requests currently being processed.", ("stage",))
+
+
+# -------------------------------------------------
+# HTTP exporter
+# -------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"exporter: {format % args}")
+
+
+_servers: Dict[int, ThreadingHTTPServer] = {}
+_servers_lock = threading.Lock()
+
+
+def start_exporter(port: Optional[int] = None, addr: str = "127.0.0.1",
+                   registry: Registry = REGISTRY) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve `registry` at http://addr:port/metrics from a daemon thread.
+
+    `port` defaults to $PROMETHEUS_PORT; without either nothing is started.
+    Safe to call on every Streamlit rerun: one server per port and process.
+    """
+    if port is None:
+        port = os.environ.get(PORT_ENV)
+        if not port:
+            return None
+    port = int(port)
+
+    with _servers_lock:
+        if port in _servers:
+            return _servers[port]
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        try:
+            server = ThreadingHTTPServer((addr, port), handler)
+        except OSError as e:
+            logger.warning(f"Prometheus exporter not started on {addr}:{port}: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name=f"prometheus-{port}", daemon=True).start()
+        _servers[port] = server
+        logger.info(f"Prometheus exporter on http://{addr}:{port}/metrics")
+        return server
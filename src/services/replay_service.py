@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.services.evaluation_service import Evaluator
+from src.services.localstorage_service import LocalStorage, blob_digest
+from src.services.metrics_service import Metrics
+
+logger = logging.getLogger(__name__)
+
+RUNS_SUBFOLDER = "runs"
+
+# Reference to a content-addressed blob inside a stored record
+BLOB_REF = "$blob"
+
+
+def new_run_id(model: Optional[str] = None) -> str:
+    """Sortable run id, e.g. 20250101-120000-gpt-4o."""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return f"{stamp}-{model}" if model else stamp
+
+
+class RunStore:
+    """
+    Raw predictions of one processing run, one JSON per document under
+    storage/runs/<run_id>/, next to the ground truth they were scored against.
+    Stored runs can be re-scored later without calling the LLM again.
+
+    On content-addressed storage the prediction and ground truth are stored
+    as their own blobs and referenced, so re-running the same dataset (and
+    cached LLM answers) does not store them again.
+    """
+
+    def __init__(self, storage: LocalStorage, run_id: Optional[str] = None, model: Optional[str] = None):
+        self.storage = storage
+        self.model = model
+        self.run_id = run_id or new_run_id(model)
+
+    def record(self, file_name: str, prediction: Any, ground_truth: Optional[dict] = None, **extra) -> Path:
+        """
+        Persist one document's raw prediction (ground_truth None = inference).
+        Named after the full upload name (a.jpg.json), so a.jpg and a.png don't overwrite each other.
+        """
+        data = {
+            "file_name": file_name,
+            "model": self.model,
+            "prediction": self._blob_ref(prediction),
+            "ground_truth": self._blob_ref(ground_truth),
+            **extra,
+        }
+        return self.storage.save_json(
+            data, subfolder=f"{RUNS_SUBFOLDER}/{self.run_id}", filename=f"{Path(file_name).name}.json"
+        )
+
+    def _blob_ref(self, value: Any) -> Any:
+        """Content-addressed storage: replace a large value by a reference to its blob."""
+        if value is None or not self.storage.content_addressed:
+            return value
+        payload = json.dumps(value, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+        return {BLOB_REF: blob_digest(self.storage.put_blob(payload.encode("utf-8"), compress=True))}
+
+    # -------------------------------------------------
+    # Reading stored runs
+    # -------------------------------------------------
+    @staticmethod
+    def list_runs(storage: LocalStorage) -> List[str]:
+        """Run ids, newest first."""
+        return sorted(storage.list_subfolders(RUNS_SUBFOLDER), reverse=True)
+
+    @staticmethod
+    def load(storage: LocalStorage, run_id: str) -> List[dict]:
+        paths = storage.list_files(f"{RUNS_SUBFOLDER}/{run_id}")
+        if not paths:
+            raise FileNotFoundError(f"Run not found: {run_id}")
+
+        records = []
+        for path in paths:
+            rec = storage.load_json(path)
+            try:
+                for key in ("prediction", "ground_truth"):
+                    value = rec.get(key)
+                    if isinstance(value, dict) and set(value) == {BLOB_REF}:
+                        rec[key] = json.loads(storage.get_blob(value[BLOB_REF]))
+            except FileNotFoundError:
+                # Referenced blob removed by retention: the record can't be re-scored
+                logger.warning(f"Skipping {path.name} of run {run_id}: {BLOB_REF} no longer stored")
+                continue
+            records.append(rec)
+        return records
+
+
+# -------------------------------------------------
+# Re-scoring
+# -------------------------------------------------
+def _rescore_chunk(args) -> Tuple[Metrics, List[dict]]:
+    """Worker: replay Evaluator.evaluate + Metrics.update_metrics over stored records."""
+    records, threshold, evaluator_options = args
+    evaluator = Evaluator(**evaluator_options)
+    metrics = Metrics(score_threshold=threshold)
+
+    rows = []
+    for rec in records:
+        prediction, ground_truth = rec.get("prediction"), rec.get("ground_truth")
+        if ground_truth is None:
+            metrics.record_inference(prediction)
+            continue
+
+        result = evaluator.evaluate(ground_truth, prediction if prediction is not None else {})
+        metrics.update_metrics(prediction, result)
+
+        scores = [v["score"] for v in result.values() if isinstance(v, dict) and v.get("score") is not None]
+        correct = sum(1 for s in scores if s >= threshold)
+        rows.append({
+            "file_name": rec.get("file_name"),
+            "model": rec.get("model"),
+            "document_type": rec.get("document_type"),
+            "fields": len(scores),
+            "correct_fields": correct,
+            "accuracy": round(correct / len(scores), 4) if scores else 0.0,
+        })
+    return metrics, rows
+
+
+def rescore(records: List[dict], threshold: float = Metrics.SCORE_THRESHOLD, workers: Optional[int] = None,
+            evaluator_options: Optional[Dict[str, Any]] = None) -> Tuple[Metrics, List[dict]]:
+    """
+    Re-evaluate stored predictions against their ground truths.
+
+    Records are split into chunks and scored on all cores (ProcessPoolExecutor);
+    per-worker metrics are merged. Returns (metrics, per-document rows).
+    """
+    evaluator_options = evaluator_options or {}
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    if workers == 1 or len(records) < 2 * workers:
+        metrics, rows = _rescore_chunk((records, threshold, evaluator_options))
+    else:
+        n_chunks = workers * 4
+        chunks = [records[i::n_chunks] for i in range(n_chunks)]
+        metrics, rows = Metrics(score_threshold=threshold), []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_metrics, chunk_rows in pool.map(
+                _rescore_chunk, [(c, threshold, evaluator_options) for c in chunks if c]
+            ):
+                metrics.merge(chunk_metrics)
+                rows.extend(chunk_rows)
+
+    rows.sort(key=lambda r: r["file_name"] or "")
+
+    logger.info(f"Re-scored {len(records)} documents in {time.perf_counter() - start:.2f}s")
+    return metrics, rows
+
+
+def rescore_run(storage: LocalStorage, run_id: str, **kwargs) -> Tuple[Metrics, List[dict]]:
+    return rescore(RunStore.load(storage, run_id), **kwargs)
+
+
+def summarize(metrics: Metrics) -> Dict[str, Any]:
+    """Headline numbers of a (re-)scored run."""
+    judged = metrics.correct_predictions + metrics.incorrect_predictions
+    return {
+        "documents": metrics.total_docs,
+        "llm_failures": metrics.llm_failures,
+        "correct_fields": metrics.correct_predictions,
+        "incorrect_fields": metrics.incorrect_predictions,
+        "field_accuracy": round(metrics.correct_predictions / judged, 4) if judged else 0.0,
+        "avg_document_accuracy": round(metrics.accuracy.mean, 4),
+    }
+
@@ -0,0 +1,355 @@
+import io
+import os
+import json
+import time
+import tempfile
+import logging
+import operator
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+except ImportError:  # optional: without pyarrow results stay in JSONL segments
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+RESULTS_SUBFOLDER = "results"
+
+# One row per evaluated field
+COLUMNS = ("run_id", "date", "file_name", "model", "document_type", "field",
+           "gt_text", "llm_text", "score", "latency", "created_at")
+PARTITION_COLUMNS = ("run_id", "date")
+
+SEGMENT_ROWS = 50_000
+
+# CSV exports stay in memory up to this size, then spill to a temporary file
+SPOOL_BYTES = 8 * 2**20
+
+OPERATORS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+    ">": operator.gt, ">=": operator.ge, "in": lambda a, b: a in b,
+}
+
+Filter = Tuple[str, str, Any]
+
+
+def _text(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _read_segment(path: Path) -> Iterator[Dict[str, Any]]:
+    """Rows of a JSONL segment; lines that don't decode (a write cut short by a crash) are skipped."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping undecodable line {n} of {path}")
+
+
+def _matches(row: Dict[str, Any], filters: Sequence[Filter], keep_nulls: Sequence[str] = ()) -> bool:
+    """Python-side filter with Parquet semantics: a null never matches (unless its column is in `keep_nulls`)."""
+    for col, op, val in filters:
+        value = row.get(col)
+        if value is None:
+            if col in keep_nulls:
+                continue
+            return False
+        if not OPERATORS[op](value, val):
+            return False
+    return True
+
+
+class ResultsStore:
+    """
+    Append-only store of per-field evaluation results.
+
+    Rows are appended to JSONL segments under
+    results/run_id=<run>/date=<YYYY-MM-DD>/ and `compact` turns a run's
+    segments into Parquet (hive partitioning). Queries read only the
+    requested columns; filters prune partitions and are pushed down into
+    Parquet row groups (pyarrow). Uncompacted segments are streamed and
+    filtered line by line, so results are queryable as soon as they are written.
+    """
+
+    def __init__(self, base_dir: str = "storage", segment_rows: int = SEGMENT_ROWS):
+        self.root = Path(base_dir) / RESULTS_SUBFOLDER
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_rows = segment_rows
+        self._lock = threading.Lock()
+        self._segments: Dict[Path, List[Any]] = {}  # partition → [path, rows written]
+
+    # -------------------------------------------------
+    # Writing
+    # -------------------------------------------------
+    def _partition(self, run_id: str, day: str) -> Path:
+        return self.root / f"run_id={run_id}" / f"date={day}"
+
+    def _segment(self, partition: Path) -> List[Any]:
+        """Current JSONL segment of a partition; rolls over every `segment_rows` rows."""
+        segment = self._segments.get(partition)
+        if segment is None or segment[1] >= self.segment_rows:
+            partition.mkdir(parents=True, exist_ok=True)
+            n = len(list(partition.glob("segment-*.jsonl"))) + len(list(partition.glob("part-*.parquet")))
+            segment = self._segments[partition] = [partition / f"segment-{n:05d}-{int(time.time() * 1000)}.jsonl", 0]
+        return segment
+
+    def append(self, run_id: str, model: Optional[str], res: Dict[str, Any]) -> Optional[Path]:
+        """
+        Append one pipeline result (`Pipeline.process_document` output).
+        Returns the segment written to (None if the result had no fields),
+        so `BackgroundWriter` fsyncs it with the rest of its batch.
+        A failed write is rolled back, so `BackgroundWriter` can retry it.
+        """
+        now = time.time()
+        day = date.fromtimestamp(now).isoformat()
+        base = {
+            "file_name": res.get("file_name"),
+            "model": model,
+            "document_type": res.get("document_type"),
+            "latency": res.get("processing_time"),
+            "created_at": now,
+        }
+        lines = []
+        for field, info in (res.get("result") or {}).items():
+            info = info if isinstance(info, dict) else {}
+            score = info.get("score")
+            lines.append(json.dumps({
+                **base,
+                "field": field,
+                "gt_text": _text(info.get("gt_text")),
+                "llm_text": _text(info.get("llm_text")),
+                "score": float(score) if isinstance(score, (int, float)) else None,
+            }, ensure_ascii=False))
+        if not lines:
+            return None
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+
+        with self._lock:
+            segment = self._segment(self._partition(run_id, day))
+            fd = os.open(segment[0], os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                try:
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(fd, view):]
+                except OSError:
+                    # e.g. ENOSPC mid-write: drop the partial lines, or the retry would follow half a row
+                    os.ftruncate(fd, size)
+                    raise
+            finally:
+                os.close(fd)
+            segment[1] += len(lines)
+            return segment[0]
+
+    def compact(self, run_id: str) -> int:
+        """Convert a run's JSONL segments to Parquet (one file per partition); returns rows compacted."""
+        if pa is None:
+            logger.info("pyarrow not installed: results stay in JSONL segments")
+            return 0
+
+        total = 0
+        with self._lock:
+            for partition in sorted((self.root / f"run_id={run_id}").glob("date=*")):
+                segments = sorted(partition.glob("segment-*.jsonl"))
+                if not segments:
+                    continue
+                n = len(list(partition.glob("part-*.parquet")))
+                target = partition / f"part-{n:05d}.parquet"
+                tmp = target.with_suffix(".tmp")
+                # One row group per segment: memory stays bounded by `segment_rows`
+                with pq.ParquetWriter(tmp, self.schema(), compression="zstd") as writer:
+                    for seg in segments:
+                        rows = list(_read_segment(seg))
+                        writer.write_table(pa.Table.from_pylist(rows, schema=self.schema()))
+                        total += len(rows)
+                # Durable before the segments it replaces are deleted
+                with open(tmp, "rb") as f:
+                    os.fsync(f.fileno())
+                tmp.replace(target)
+                # Parquet is in place before the segments go: a crash in between only duplicates rows
+                for seg in segments:
+                    seg.unlink()
+                self._segments.pop(partition, None)
+        logger.info(f"Compacted {total} result rows of run {run_id}")
+        return total
+
+    @staticmethod
+    def schema():
+        # Partition columns live in the directory names, not in the files
+        return pa.schema([
+            ("file_name", pa.string()), ("model", pa.string()), ("document_type", pa.string()),
+            ("field", pa.string()), ("gt_text", pa.string()), ("llm_text", pa.string()),
+            ("score", pa.float64()), ("latency", pa.float64()), ("created_at", pa.float64()),
+        ])
+
+    # -------------------------------------------------
+    # Queries
+    # -------------------------------------------------
+    def runs(self) -> List[str]:
+        return sorted((p.name.split("=", 1)[1] for p in self.root.glob("run_id=*")), reverse=True)
+
+    def _partitions(self, filters: Sequence[Filter]) -> List[Path]:
+        """Partition directories that can match the run_id / date filters."""
+        partitions = []
+        for path in self.root.glob("run_id=*/date=*"):
+            values = {"run_id": path.parent.name.split("=", 1)[1], "date": path.name.split("=", 1)[1]}
+            if all(OPERATORS[op](values[col], val) for col, op, val in filters if col in values):
+                partitions.append(path)
+        return sorted(partitions)
+
+    @staticmethod
+    def _expression(filters: Sequence[Filter], keep_nulls: Sequence[str] = ()):
+        expr = None
+        for col, op, val in filters:
+            field = pads.field(col)
+            term = field.isin(list(val)) if op == "in" else OPERATORS[op](field, val)
+            if col in keep_nulls:
+                term = term | field.is_null()
+            expr = term if expr is None else expr & term
+        return expr
+
+    def iter_batches(self, columns: Optional[Sequence[str]] = None, filters: Sequence[Filter] = (),
+                     batch_size: int = 65_536, limit: Optional[int] = None,
+                     keep_nulls: Sequence[str] = ()) -> Iterator[pd.DataFrame]:
+        """
+        Stream matching rows as DataFrames of at most `batch_size` rows.
+
+        Args:
+            columns: columns to read (default: all of COLUMNS)
+            filters: (column, op, value) triples, ANDed; op in ==, !=, <, <=, >, >=, in
+            limit: stop scanning once this many rows were yielded
+            keep_nulls: columns whose filters also let null values through
+                (e.g. "score", which is null for inference runs)
+        """
+        columns = list(columns or COLUMNS)
+        filters = list(filters)
+        for col, op, _ in filters:
+            if col not in COLUMNS or op not in OPERATORS:
+                raise ValueError(f"Unsupported filter: {col} {op}")
+        if limit is not None:
+            # Early stop: the scan (and the files it would still open) ends with the last row needed
+            if limit <= 0:
+                return
+            for batch in self.iter_batches(columns, filters, min(batch_size, limit), keep_nulls=keep_nulls):
+                yield batch.head(limit)
+                limit -= len(batch)
+                if limit <= 0:
+                    return
+            return
+        partitions = self._partitions(filters)
+
+        # Parquet: projection + predicate pushdown over the pruned partitions
+        parquet = [str(p) for part in partitions for p in part.glob("part-*.parquet")]
+        if parquet and pa is not None:
+            dataset = pads.dataset(parquet, schema=self.schema().append(pa.field("run_id", pa.string()))
+                                   .append(pa.field("date", pa.string())),
+                                   format="parquet", partitioning="hive", partition_base_dir=str(self.root))
+            scanner = dataset.scanner(columns=columns, filter=self._expression(filters, keep_nulls),
+                                      batch_size=batch_size)
+            for batch in scanner.to_batches():
+                if batch.num_rows:
+                    yield batch.to_pandas()
+
+        # Uncompacted JSONL segments: line by line
+        rows = []
+        for part in partitions:
+            keys = {"run_id": part.parent.name.split("=", 1)[1], "date": part.name.split("=", 1)[1]}
+            for seg in sorted(part.glob("segment-*.jsonl")):
+                for row in _read_segment(seg):
+                    row = {**row, **keys}
+                    if _matches(row, filters, keep_nulls):
+                        rows.append({c: row.get(c) for c in columns})
+                        if len(rows) >= batch_size:
+                            yield pd.DataFrame(rows, columns=columns)
+                            rows = []
+        if rows:
+            yield pd.DataFrame(rows, columns=columns)
+
+    def query(self, columns: Optional[Sequence[str]] = None, filters: Sequence[Filter] = ()) -> pd.DataFrame:
+        """Matching rows as one DataFrame (see `iter_batches`)."""
+        batches = list(self.iter_batches(columns, filters))
+        if not batches:
+            return pd.DataFrame(columns=list(columns or COLUMNS))
+        return pd.concat(batches, ignore_index=True)
+
+    def smallest(self, by: str, n: int, columns: Optional[Sequence[str]] = None, filters: Sequence[Filter] = (),
+                 keep_nulls: Sequence[str] = ()) -> Tuple[pd.DataFrame, int]:
+        """
+        The `n` matching rows with the lowest `by` (nulls last) and the number
+        of matching rows. Sorted batch by batch: memory is bounded by `n` plus
+        one batch, never the whole run.
+        """
+        columns = list(columns or COLUMNS)
+        best, total = pd.DataFrame(columns=columns), 0
+        for batch in self.iter_batches(columns, filters, keep_nulls=keep_nulls):
+            total += len(batch)
+            merged = batch if best.empty else pd.concat([best, batch], ignore_index=True)
+            best = merged.sort_values(by, kind="stable", na_position="last").head(n)
+        return best.reset_index(drop=True), total
+
+    def to_csv(self, columns: Optional[Sequence[str]] = None, filters: Sequence[Filter] = (),
+               path_or_buf=None, keep_nulls: Sequence[str] = ()) -> Optional[str]:
+        """CSV export, written batch by batch to `path_or_buf` (a path or text file); returns a str without one."""
+        if path_or_buf is None:
+            buffer = io.StringIO()
+            self.to_csv(columns, filters, buffer, keep_nulls)
+            return buffer.getvalue()
+        if isinstance(path_or_buf, (str, Path)):
+            with open(path_or_buf, "w", encoding="utf-8", newline="") as f:
+                return self.to_csv(columns, filters, f, keep_nulls)
+
+        header = True
+        for batch in self.iter_batches(columns, filters, keep_nulls=keep_nulls):
+            batch.to_csv(path_or_buf, index=False, header=header)
+            header = False
+        if header:
+            pd.DataFrame(columns=list(columns or COLUMNS)).to_csv(path_or_buf, index=False)
+        return None
+
+    def csv_file(self, columns: Optional[Sequence[str]] = None, filters: Sequence[Filter] = (),
+                 keep_nulls: Sequence[str] = ()) -> BinaryIO:
+        """
+        CSV export as a rewound binary file (in memory up to SPOOL_BYTES, then
+        on disk), for `st.download_button(data=lambda: ...)`: the CSV is only
+        built when the button is clicked, and streamed batch by batch.
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        text = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        self.to_csv(columns, filters, text, keep_nulls)
+        text.flush()
+        text.detach()
+        spool.seek(0)
+        return spool
+
+    def field_accuracy(self, run_id: str, threshold: float) -> Dict[str, Any]:
+        """Re-threshold a run from its stored scores (no re-evaluation), streaming two columns."""
+        # Per-document (correct, judged) counts, combined batch by batch
+        per_document = None
+        for batch in self.iter_batches(["file_name", "score"], [("run_id", "==", run_id)]):
+            batch = batch.dropna(subset=["score"])
+            grouped = (batch["score"] >= threshold).groupby(batch["file_name"]).agg(["sum", "count"])
+            per_document = grouped if per_document is None else per_document.add(grouped, fill_value=0)
+
+        if per_document is None or per_document.empty:
+            return {"documents": 0, "correct_fields": 0, "incorrect_fields": 0,
+                    "field_accuracy": 0.0, "avg_document_accuracy": 0.0}
+        correct, judged = int(per_document["sum"].sum()), int(per_document["count"].sum())
+        return {
+            "documents": len(per_document),
+            "correct_fields": correct,
+            "incorrect_fields": judged - correct,
+            "field_accuracy": round(correct / judged, 4) if judged else 0.0,
+            "avg_document_accuracy": round(float((per_document["sum"] / per_document["count"]).mean()), 4),
+        }
@@ -0,0 +1,270 @@
+import os
+import time
+import atexit
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.services.localstorage_service import BLOBS_SUBFOLDER, LocalStorage, blob_digest
+from src.services.prometheus_service import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Per-document scratch files of the pipeline (image sent to the LLM, crop tiles)
+SCRATCH_DIR = Path(tempfile.gettempdir()) / "llm-parsing-images"
+
+# Never evicted: live databases and their WAL / shared-memory files
+PROTECTED_SUFFIXES = (".db", ".db-wal", ".db-shm", ".db-journal")
+
+# Over quota, evict down to this fraction of it (no eviction on every tick)
+LOW_WATERMARK = 0.9
+
+DAY = 86400
+
+STORAGE_BYTES = REGISTRY.gauge(
+    "llm_parser_storage_bytes", "Bytes on disk per retention target.", ["target"])
+RECLAIMED_BYTES = REGISTRY.counter(
+    "llm_parser_retention_reclaimed_bytes_total", "Bytes freed by the retention manager.", ["target", "reason"])
+EVICTED_FILES = REGISTRY.counter(
+    "llm_parser_retention_evicted_files_total", "Files removed by the retention manager.", ["target", "reason"])
+
+
+class Policy:
+    """Retention of one directory tree: byte quota and/or maximum age (seconds), LRU order."""
+
+    def __init__(self, path, max_bytes: Optional[int] = None, max_age: Optional[float] = None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def __repr__(self):
+        return f"Policy({self.path}, max_bytes={self.max_bytes}, max_age={self.max_age})"
+
+
+def default_policies(base_dir: str = "storage") -> Dict[str, Policy]:
+    """Targets of the app; quotas and ages come from the environment (GB / days, 0 = unbounded)."""
+    def env(name, default, scale):
+        value = float(os.getenv(name, default))
+        return value * scale if value > 0 else None
+
+    base = Path(base_dir)
+    return {
+        "scratch": Policy(SCRATCH_DIR, max_bytes=env("RETENTION_SCRATCH_GB", 1, 1e9), max_age=3600),
+        "blobs": Policy(base / BLOBS_SUBFOLDER, max_bytes=env("RETENTION_BLOBS_GB", 20, 1e9),
+                        max_age=env("RETENTION_BLOBS_DAYS", 90, DAY)),
+        "results": Policy(base / "results", max_bytes=env("RETENTION_RESULTS_GB", 5, 1e9),
+                          max_age=env("RETENTION_RESULTS_DAYS", 180, DAY)),
+    }
+
+
+class _Directory:
+    """Catalog entry of one directory: its mtime when listed and its files."""
+
+    __slots__ = ("mtime_ns", "files", "subdirs")
+
+    def __init__(self):
+        self.mtime_ns = -1
+        self.files: Dict[str, Tuple[int, float]] = {}  # name → (size, last used)
+        self.subdirs: List[str] = []
+
+
+class RetentionManager:
+    """
+    Keeps storage bounded: per-target byte quotas and maximum age, with
+    least-recently-used eviction.
+
+    Each target's tree is cataloged in memory (file sizes and last use =
+    max(atime, mtime)). A pass stats every directory but only re-lists
+    the ones whose mtime changed since the last pass, so steady-state
+    passes cost one stat per directory instead of one per file.
+    Candidates are re-stated just before eviction: a file read since it
+    was cataloged (newer atime) is kept.
+
+    Blobs evicted from content-addressed storage also lose their index
+    names, so listings never point at missing files.
+    """
+
+    def __init__(self, policies: Dict[str, Policy], storage: Optional[LocalStorage] = None):
+        self.policies = policies
+        self.storage = storage
+        self._catalogs: Dict[str, Dict[str, _Directory]] = {name: {} for name in policies}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------------------------------------
+    # Catalog
+    # -------------------------------------------------
+    @staticmethod
+    def _last_used(st: os.stat_result) -> float:
+        return max(st.st_atime, st.st_mtime)
+
+    def _refresh(self, name: str) -> int:
+        """Bring a target's catalog up to date; returns directories re-listed."""
+        catalog = self._catalogs[name]
+        root = str(self.policies[name].path)
+        seen, relisted, stack = set(), 0, [root]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            seen.add(path)
+            entry = catalog.get(path)
+            if entry is None:
+                entry = catalog[path] = _Directory()
+            if entry.mtime_ns != mtime_ns:
+                self._list(path, entry)
+                entry.mtime_ns = mtime_ns
+                relisted += 1
+            stack.extend(os.path.join(path, d) for d in entry.subdirs)
+
+        for path in [p for p in catalog if p not in seen]:
+            del catalog[path]
+        return relisted
+
+    @staticmethod
+    def _list(path: str, entry: _Directory):
+        files, subdirs = {}, []
+        try:
+            with os.scandir(path) as it:
+                for item in it:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            subdirs.append(item.name)
+                        elif item.is_file(follow_symlinks=False) and not item.name.endswith(PROTECTED_SUFFIXES):
+                            st = item.stat(follow_symlinks=False)
+                            files[item.name] = (st.st_size, max(st.st_atime, st.st_mtime))
+                    except FileNotFoundError:
+                        continue
+        except FileNotFoundError:
+            pass
+        entry.files, entry.subdirs = files, subdirs
+
+    def usage(self, name: str) -> Tuple[int, int]:
+        """(files, bytes) of a target according to its catalog."""
+        entries = self._catalogs[name].values()
+        return sum(len(e.files) for e in entries), sum(s for e in entries for s, _ in e.files.values())
+
+    # -------------------------------------------------
+    # Eviction
+    # -------------------------------------------------
+    def _remove(self, name: str, path: str) -> bool:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            logger.warning(f"Retention: could not remove {path}: {e}")
+            return False
+        if self.storage is not None and self.policies[name].path == self.storage.base_dir / BLOBS_SUBFOLDER:
+            self.storage.forget_blob(blob_digest(Path(path)))
+        return True
+
+    def _evict(self, name: str, candidates, reason: str, report: Dict[str, Any], budget: Optional[int] = None):
+        """
+        Remove `candidates` ((last used, size, dir, file) tuples, oldest first)
+        until `budget` bytes are freed (all of them when None).
+        """
+        catalog, freed = self._catalogs[name], 0
+        for last_used, size, directory, filename in candidates:
+            if budget is not None and freed >= budget:
+                break
+            path = os.path.join(directory, filename)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                catalog[directory].files.pop(filename, None)
+                continue
+            if self._last_used(st) > last_used:
+                # Used since it was cataloged: not an LRU victim after all
+                catalog[directory].files[filename] = (st.st_size, self._last_used(st))
+                continue
+            if self._remove(name, path):
+                catalog[directory].files.pop(filename, None)
+                freed += st.st_size
+                report["evicted"] += 1
+                report["reclaimed_bytes"] += st.st_size
+                EVICTED_FILES.labels(name, reason).inc()
+                RECLAIMED_BYTES.labels(name, reason).inc(st.st_size)
+        return freed
+
+    def _enforce(self, name: str, now: float) -> Dict[str, Any]:
+        policy = self.policies[name]
+        report = {"relisted_dirs": self._refresh(name), "evicted": 0, "reclaimed_bytes": 0}
+        catalog = self._catalogs[name]
+
+        if policy.max_age is not None:
+            cutoff = now - policy.max_age
+            expired = sorted(
+                (used, size, d, f) for d, e in catalog.items() for f, (size, used) in e.files.items() if used < cutoff
+            )
+            self._evict(name, expired, "age", report)
+
+        files, total = self.usage(name)
+        if policy.max_bytes is not None and total > policy.max_bytes:
+            lru = sorted((used, size, d, f) for d, e in catalog.items() for f, (size, used) in e.files.items())
+            self._evict(name, lru, "quota", report, budget=total - int(policy.max_bytes * LOW_WATERMARK))
+            files, total = self.usage(name)
+
+        STORAGE_BYTES.labels(name).set(total)
+        report.update(files=files, bytes=total)
+        return report
+
+    def run_once(self) -> Dict[str, Dict[str, Any]]:
+        """One pass over every target; returns per-target usage and what was reclaimed."""
+        now = time.time()
+        with self._lock:
+            reports = {name: self._enforce(name, now) for name in self.policies}
+        reclaimed = sum(r["reclaimed_bytes"] for r in reports.values())
+        if reclaimed:
+            logger.info(f"Retention reclaimed {reclaimed / 1e6:.1f} MB "
+                        f"({sum(r['evicted'] for r in reports.values())} files)")
+        return reports
+
+    # -------------------------------------------------
+    # Background
+    # -------------------------------------------------
+    def start(self, interval: float = 300.0):
+        """Run a pass every `interval` seconds on a daemon thread (idempotent)."""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.run_once()
+                except Exception:
+                    logger.exception("Retention pass failed")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_manager: Optional[RetentionManager] = None
+_manager_lock = threading.Lock()
+
+
+def start_retention(base_dir: str = "storage", interval: Optional[float] = None) -> Optional[RetentionManager]:
+    """Process-wide background retention of the app's storage (interval: $RETENTION_INTERVAL, 0 = off)."""
+    global _manager
+    interval = float(os.getenv("RETENTION_INTERVAL", 300)) if interval is None else interval
+    if interval <= 0:
+        return None
+    with _manager_lock:
+        if _manager is None:
+            storage = LocalStorage(base_dir, content_addressed=True)
+            _manager = RetentionManager(default_policies(base_dir), storage=storage)
+            _manager.start(interval)
+            atexit.register(_manager.stop)
+        return _manager
@@ -1,4 +1,9 @@
 import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 def extract_schema_from_gt(gt_list):
     """
@@ -23,3 +28,90 @@ def extract_schema_from_gt(gt_list):
             return "string"  # default placeholder for value
 
     return [_extract_schema(item) for item in gt_list]
+
+
+def merge_schemas(a, b):
+    """Union of two schemas (keys from both, nested dicts merged)."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        merged = dict(a)
+        for k, v in b.items():
+            merged[k] = merge_schemas(merged[k], v) if k in merged else v
+        return merged
+    if isinstance(a, list) and isinstance(b, list):
+        if a and b:
+            return [merge_schemas(a[0], b[0])]
+        return a or b
+    return a
+
+
+# -------------------------------------------------
+# Per-document-type schema / prompt registry
+# -------------------------------------------------
+TYPE_PROMPT_TEMPLATE = (
+    "You are an expert {doc_type} extractor.\n"
+    "Extract the fields of this {doc_type} according to the schema.\n"
+    "Use the OCR text for cross checking (ignore if empty): {ocr}\n"
+    "Return ONLY valid JSON.\n\nSchema Description:\n{schema}\n"
+)
+
+
+class SchemaRegistry:
+    """
+    Stores one schema (and prompt template) per document type.
+
+    Persisted as a single JSON file so the inference path can pick a schema
+    without any ground truth.
+    """
+
+    def __init__(self, path: str = "storage/schemas/registry.json"):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not load schema registry: {e}")
+
+    def __contains__(self, doc_type):
+        return doc_type in self.entries
+
+    def document_types(self):
+        return sorted(self.entries)
+
+    def register(self, doc_type: str, schema: Dict[str, Any], prompt: Optional[str] = None) -> bool:
+        """Add or widen the schema of a document type. Returns True if anything changed."""
+        entry = self.entries.get(doc_type, {})
+        merged = merge_schemas(entry.get("schema", {}), schema)
+        new_prompt = prompt or entry.get("prompt") or TYPE_PROMPT_TEMPLATE
+
+        changed = merged != entry.get("schema") or new_prompt != entry.get("prompt")
+        if changed:
+            self.entries[doc_type] = {"schema": merged, "prompt": new_prompt}
+        return changed
+
+    def register_from_ground_truth(self, gt_list) -> bool:
+        """Derive per-type schemas from ground-truth JSONs (grouped by document_type)."""
+        changed = False
+        for gt, schema in zip(gt_list, extract_schema_from_gt(gt_list)):
+            doc_type = gt.get("document_type") if isinstance(gt, dict) else None
+            if doc_type:
+                changed |= self.register(doc_type, schema)
+        return changed
+
+    def get(self, doc_type: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        entry = self.entries.get(doc_type)
+        if entry is None:
+            return None, None
+        return entry["schema"], entry.get("prompt", TYPE_PROMPT_TEMPLATE)
+
+    def build_prompt(self, doc_type: str, schema_description: str, ocr: str = "") -> str:
+        _, template = self.get(doc_type)
+        return (template or TYPE_PROMPT_TEMPLATE).format(doc_type=doc_type, schema=schema_description, ocr=ocr)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        logger.info(f"Schema registry saved: {self.path}")
@@ -0,0 +1,172 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from PIL import Image
+
+from src.services.localstorage_service import LocalStorage, blob_digest
+
+logger = logging.getLogger(__name__)
+
+# Spilled uploads remembered per Streamlit file_id (a rerun re-renders every uploader)
+MAX_SPILLED = 10_000
+
+
+class UploadHandle(dict):
+    """
+    Session-state handle of an upload spilled to the blob store: holds
+    only {"name", "digest", "size"}. The content is read on demand with
+    `read()` (or opened with `image()`) and never kept. Equal content and
+    name → equal handles, and Streamlit's cache hashes the three fields,
+    not the bytes.
+    """
+
+    def __init__(self, name: str, digest: str, size: int, path: Path):
+        super().__init__(name=name, digest=digest, size=size)
+        self.path = Path(path)
+
+    def read(self) -> bytes:
+        """File content, read from the blob (a fresh copy on every call: read once per use)."""
+        return self.path.read_bytes()
+
+    def image(self) -> Image.Image:
+        """PIL image opened from the blob; pixels are decoded only when used."""
+        return Image.open(self.path)
+
+    @classmethod
+    def from_bytes(cls, name: str, data, storage: LocalStorage) -> "UploadHandle":
+        """Store `data` (bytes or buffer) once per content and return its handle."""
+        path = storage.put_blob(data)
+        return cls(name, blob_digest(path), len(data), path)
+
+
+_storage: Optional[LocalStorage] = None
+_spilled: "OrderedDict[str, UploadHandle]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _default_storage() -> LocalStorage:
+    global _storage
+    if _storage is None:
+        _storage = LocalStorage(content_addressed=True)
+    return _storage
+
+
+def spill(uploaded, storage: Optional[LocalStorage] = None) -> UploadHandle:
+    """
+    Spill a Streamlit UploadedFile to the blob store (once per file_id)
+    and return its handle. The upload is hashed from its buffer, no copy.
+    """
+    file_id = getattr(uploaded, "file_id", None)
+    with _lock:
+        if file_id is not None and file_id in _spilled:
+            _spilled.move_to_end(file_id)
+            return _spilled[file_id]
+
+    handle = UploadHandle.from_bytes(uploaded.name, uploaded.getbuffer(), storage or _default_storage())
+    logger.debug(f"Spilled {handle['name']} ({handle['size']} bytes) → {handle['digest']}")
+
+    if file_id is not None:
+        with _lock:
+            _spilled[file_id] = handle
+            while len(_spilled) > MAX_SPILLED:
+                _spilled.popitem(last=False)
+    return handle
+
+
+class UploadRegistry:
+    """
+    A session's uploads, indexed by name and by content digest.
+
+    Membership is a dict lookup on (name, digest), never a comparison of
+    bytes; `ingest` only does work for handles it has not seen; JPG ↔
+    ground-truth pairing (by file stem) is updated on every add, so
+    `ground_truth_for` and `unpaired` never rescan the uploads.
+    A re-upload under the same name with new content replaces the old
+    version in place.
+    """
+
+    def __init__(self):
+        self._order: List[str] = []                      # image names, upload order
+        self.images: Dict[str, UploadHandle] = {}        # name → handle
+        self.ground_truths: Dict[str, UploadHandle] = {}  # stem → handle
+        self._by_digest: Dict[str, Set[str]] = {}        # digest → image names
+        self._stems: Dict[str, Set[str]] = {}            # stem → image names
+        self._unpaired: Set[str] = set()                 # image names without ground truth
+        self._parsed: Dict[str, Any] = {}                # ground-truth digest → parsed JSON
+
+    # -------------------------------------------------
+    # Adding
+    # -------------------------------------------------
+    def ingest(self, handles: Iterable[UploadHandle], ground_truth: bool = False) -> int:
+        """Add the handles not registered yet; returns how many were added."""
+        add = self.add_ground_truth if ground_truth else self.add_image
+        return sum(add(handle) for handle in handles if handle is not None)
+
+    def add_image(self, handle: UploadHandle) -> bool:
+        name, stem = handle["name"], os.path.splitext(handle["name"])[0]
+        previous = self.images.get(name)
+        if previous == handle:
+            return False
+        if previous is None:
+            self._order.append(name)
+        else:
+            self._by_digest[previous["digest"]].discard(name)
+        self.images[name] = handle
+        self._by_digest.setdefault(handle["digest"], set()).add(name)
+        self._stems.setdefault(stem, set()).add(name)
+        if stem not in self.ground_truths:
+            self._unpaired.add(name)
+        return True
+
+    def add_ground_truth(self, handle: UploadHandle) -> bool:
+        stem = os.path.splitext(handle["name"])[0]
+        if self.ground_truths.get(stem) == handle:
+            return False
+        self.ground_truths[stem] = handle
+        self._unpaired.difference_update(self._stems.get(stem, ()))
+        return True
+
+    # -------------------------------------------------
+    # Lookups
+    # -------------------------------------------------
+    def __contains__(self, handle) -> bool:
+        name = handle["name"]
+        return self.images.get(name) == handle or self.ground_truths.get(os.path.splitext(name)[0]) == handle
+
+    def __len__(self):
+        return len(self._order)
+
+    def has_content(self, digest: str) -> bool:
+        """Whether an image with this content was uploaded (under any name)."""
+        return bool(self._by_digest.get(digest))
+
+    def image_at(self, index: int) -> UploadHandle:
+        return self.images[self._order[index]]
+
+    def image_list(self) -> List[UploadHandle]:
+        return [self.images[name] for name in self._order]
+
+    def ground_truth_for(self, image_name: str) -> Optional[UploadHandle]:
+        return self.ground_truths.get(os.path.splitext(image_name)[0])
+
+    def ground_truth(self, image_name: str) -> Optional[Any]:
+        """Parsed ground-truth JSON of an image (parsed once per content)."""
+        handle = self.ground_truth_for(image_name)
+        if handle is None:
+            return None
+        if handle["digest"] not in self._parsed:
+            self._parsed[handle["digest"]] = json.loads(handle.read().decode("utf-8"))
+        return self._parsed[handle["digest"]]
+
+    def unpaired(self) -> List[str]:
+        """Image names without a ground-truth JSON, in upload order."""
+        return [name for name in self._order if name in self._unpaired] if self._unpaired else []
+
+    def paired(self) -> List[UploadHandle]:
+        """Images with a ground-truth JSON, in upload order."""
+        return [self.images[name] for name in self._order if name not in self._unpaired]
@@ -0,0 +1,159 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+from src.services.prometheus_service import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    "llm_parser_write_queue_depth", "Storage writes waiting in the write-behind queue.")
+WRITE_RETRIES = REGISTRY.counter(
+    "llm_parser_write_retries_total", "Storage writes retried after an OS error (slow / full disk).")
+WRITE_FAILURES = REGISTRY.counter(
+    "llm_parser_write_failures_total", "Storage writes dropped after exhausting retries.")
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    """
+    Write-behind persistence: callers `submit` storage writes and return
+    immediately; one daemon thread runs them in order, in batches, and
+    fsyncs the files they return (Path or list of Paths) once per batch.
+
+    The queue is bounded: when the disk falls behind, `submit` blocks
+    (backpressure) instead of letting memory grow. Writes failing with an
+    OSError (e.g. disk briefly full) are retried with exponential backoff
+    for up to `retry_timeout` seconds before being dropped, so submitted
+    writes must be safe to re-run (overwrite, or roll back a partial append).
+    `close` (also run at interpreter exit) drains the queue.
+    """
+
+    def __init__(self, max_queue: int = 1000, batch_size: int = 64, fsync: bool = True,
+                 retry_timeout: float = 60.0, retry_delay: float = 0.1, max_retry_delay: float = 5.0):
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.retry_timeout = retry_timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="background-writer", daemon=True)
+        self._thread.start()
+
+    # -------------------------------------------------
+    # Producer side
+    # -------------------------------------------------
+    def submit(self, fn: Callable, *args, **kwargs):
+        """Queue `fn(*args, **kwargs)`; blocks only while the queue is full."""
+        if self._closed:
+            raise RuntimeError("BackgroundWriter is closed")
+        self._queue.put((fn, args, kwargs))
+        QUEUE_DEPTH.set(self._queue.qsize())
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until every write submitted so far has run."""
+        self._queue.join()
+
+    def close(self):
+        """Drain the queue and stop the thread (idempotent)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    # -------------------------------------------------
+    # Writer thread
+    # -------------------------------------------------
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Whatever else is already queued joins the batch (no waiting)
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            written: List[Path] = []
+            stop = False
+            for task in batch:
+                if task is _STOP:
+                    stop = True
+                    continue
+                written.extend(self._execute(*task))
+            if self.fsync and written:
+                self._fsync(written)
+
+            for _ in batch:
+                self._queue.task_done()
+            QUEUE_DEPTH.set(self._queue.qsize())
+            if stop:
+                return
+
+    def _execute(self, fn: Callable, args: tuple, kwargs: dict) -> List[Path]:
+        delay, deadline = self.retry_delay, time.monotonic() + self.retry_timeout
+        while True:
+            try:
+                out = fn(*args, **kwargs)
+                break
+            except OSError as e:
+                if time.monotonic() + delay > deadline:
+                    WRITE_FAILURES.inc()
+                    logger.error(f"Dropping write {getattr(fn, '__qualname__', fn)} after {self.retry_timeout}s: {e}")
+                    return []
+                WRITE_RETRIES.inc()
+                logger.warning(f"Write failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+            except Exception:
+                WRITE_FAILURES.inc()
+                logger.exception(f"Write {getattr(fn, '__qualname__', fn)} failed")
+                return []
+
+        if isinstance(out, (str, Path)):
+            return [Path(out)]
+        if isinstance(out, (list, tuple)):
+            return [Path(p) for p in out if isinstance(p, (str, Path))]
+        return []
+
+    @staticmethod
+    def _fsync(paths: List[Path]):
+        """One fsync per written file and per parent directory (new names) in the batch."""
+        targets = set(paths) | {p.parent for p in paths}
+        for path in targets:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass  # directories can't be fsynced on every platform
+            finally:
+                os.close(fd)
+
+
+_writer: Optional[BackgroundWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> BackgroundWriter:
+    """Process-wide writer (shared by Streamlit sessions), drained at exit."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BackgroundWriter()
+            atexit.register(_writer.close)
+        return _writer
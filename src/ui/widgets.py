@@ -1,5 +1,7 @@
 import streamlit as st
 
+from src.services.upload_service import spill
+
 class FileUploadWidget:
     def __init__(self, label, key, type=["jpg", "jpeg", "png"]):
         self.label = label
@@ -16,13 +18,13 @@ class FileUploadWidget:
         )
 
         if uploaded:
+            names = {fi["name"] for fi in self.files_}
             for f in uploaded:
                 # Avoid duplicates inside this widget
-                if f.name not in [fi["name"] for fi in self.files_]:
-                    self.files_.append({
-                        "name": f.name,
-                        "bytes": f.getvalue()
-                    })
+                if f.name not in names:
+                    names.add(f.name)
+                    # Spilled to the blob store once; only a handle (name, digest, size) is kept
+                    self.files_.append(spill(f))
 
         return self.files_
 
@@ -2,6 +2,8 @@ import os
 import pandas as pd
 import streamlit as st
 
+from src.services.evaluation_service import EvaluationResult
+
 def sort_gt_files_by_jpg(uploaded_jpgs, uploaded_jsons):
     """
     Sort JSON ground truth files to match the order of JPG files based on filenames.
@@ -27,13 +29,25 @@ def sort_gt_files_by_jpg(uploaded_jpgs, uploaded_jsons):
     return sorted_jsons
 
 
-@st.cache_data
+RESULT_COLUMNS = ["📄 Field", "✅ Ground Truth", "🤖 LLM Text", "🎯 Match Score"]
+
+
+# Columnar results are hashed by content (their pickled state), as Streamlit can't hash them itself
+@st.cache_data(hash_funcs={EvaluationResult: EvaluationResult.__getstate__})
 def convert_json_list_to_dataframes(json_list):
     dfs = []
 
     for item in json_list:
 
         result = item.get("result", {})
+
+        # Columnar results (EvaluationResult) convert without re-walking every field
+        if hasattr(result, "to_dataframe"):
+            df = result.to_dataframe(missing="")
+            df.columns = RESULT_COLUMNS
+            dfs.append(df)
+            continue
+
         rows = []
 
         for field, data in result.items():
@@ -54,7 +68,7 @@ def convert_json_list_to_dataframes(json_list):
                 })
 
         df = pd.DataFrame(rows, columns=["field", "gt_text", "llm_text", "score"])
-        df.columns = ["📄 Field", "✅ Ground Truth", "🤖 LLM Text", "🎯 Match Score"]
+        df.columns = RESULT_COLUMNS
         dfs.append(df)
 
     return dfs
\ No newline at end of file